@@ -1,9 +1,19 @@
 import sys
 import os
-import re
-import requests
-import webbrowser
+import threading
+import time
+
+# Taken before the heavier imports below; --startup-profile measures from here
+STARTUP_STARTED = time.perf_counter()
+
+# Only what the window needs to be built is imported here; the rename pipeline (renamer_core,
+# the journal, scanner, watcher and so on) is imported by the methods that use it, after the
+# window is on screen
 from PyQt5 import QtCore, QtGui, QtWidgets
+from event_log import DEBUG, EventLog, JsonlSink
+from resolver_chain import API_PRIORITIES
+
+IMPORTS_FINISHED = time.perf_counter()
 
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller."""
@@ -13,113 +23,663 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-# Allowed file extensions
-ALLOWED_EXTENSIONS = (".webm", ".mp4", ".mkv", ".avi")
+# Worker output is handed to the GUI in batches at most this often
+OUTPUT_FLUSH_INTERVAL_MS = 75
+
+# Older lines are dropped so big runs don't grow the log views without bound
+LOG_MAX_LINES = 5000
+PREVIEW_MAX_LINES = 20000
+
+# Width and height the mascot images are shown at
+MASCOT_SIZE = 150
+
+# How often a watched folder is checked for files that finished arriving
+WATCH_POLL_INTERVAL_MS = 1000
+
+# Most folders the job queue works on at the same time; they share the API rate limits
+MAX_CONCURRENT_JOBS = 4
+
+# Theme stylesheets, built once. The window's sheet is set before its widgets are created, so
+# each widget is styled once as it is first shown rather than restyled after the fact.
+THEMES = {}
+THEMES["Dark"] = {
+    "window": """
+            QMainWindow { background-color: #1e1e1e; }
+            QWidget { background-color: #1e1e1e; color: white; font-family: 'AtkinsonHyperlegibleMono-Bold'; font-size: 18px; }
+            QLabel { color: white; font-size: 18px; font-weight: bold; }
+            QPushButton { background-color: #007acc; color: white; border-radius: 12px; padding: 14px; font-size: 18px; font-weight: bold; }
+            QPushButton:hover { background-color: #005f99; }
+            QComboBox { background-color: #333; color: white; border-radius: 8px; padding: 10px; font-size: 18px; }
+            QTextEdit, QPlainTextEdit { background-color: #252526; color: white; border-radius: 8px; padding: 12px; font-size: 18px; }
+            QScrollBar:vertical { background-color: #333; width: 10px; margin: 0; border: none; border-radius: 5px; }
+            QScrollBar::handle:vertical { background-color: #007acc; min-height: 20px; border-radius: 5px; }
+            QScrollBar::handle:vertical:hover { background-color: #005f99; }
+            QScrollBar:horizontal { background-color: #333; height: 10px; margin: 0; border: none; border-radius: 5px; }
+            QScrollBar::handle:horizontal { background-color: #007acc; min-width: 20px; border-radius: 5px; }
+            QScrollBar::handle:horizontal:hover { background-color: #005f99; }
+        """,
+    "header": "color: white;",
+    "folder": "background-color: #333; padding: 12px; border-radius: 10px; border: 2px solid #555; min-width: 500px; color: white;",
+    "progress": (
+        "QProgressBar { background-color: #333; border: 2px solid #555; border-radius: 10px; text-align: center; color: white; }"
+        "QProgressBar::chunk { background-color: #FF6433; border-radius: 8px; }"
+    ),
+    "log": "border: 2px solid #555; padding: 12px; background-color: #252526; color: white;",
+}
+THEMES["Light"] = {
+    "window": """
+            QMainWindow { background-color: #ffffff; }
+            QWidget { background-color: #ffffff; color: #000000; font-family: 'AtkinsonHyperlegibleMono-Bold'; font-size: 18px; }
+            QLabel { color: #000000; font-size: 18px; font-weight: bold; }
+            QPushButton { background-color: #007acc; color: white; border-radius: 12px; padding: 14px; font-size: 18px; font-weight: bold; }
+            QPushButton:hover { background-color: #005f99; }
+            QComboBox { background-color: #f0f0f0; color: black; border-radius: 8px; padding: 10px; font-size: 18px; }
+            QTextEdit, QPlainTextEdit { background-color: #f5f5f5; color: black; border-radius: 8px; padding: 12px; font-size: 18px; }
+            QScrollBar:vertical { background-color: #f0f0f0; width: 10px; margin: 0; border: none; border-radius: 5px; }
+            QScrollBar::handle:vertical { background-color: #007acc; min-height: 20px; border-radius: 5px; }
+            QScrollBar::handle:vertical:hover { background-color: #005f99; }
+            QScrollBar:horizontal { background-color: #f0f0f0; height: 10px; margin: 0; border: none; border-radius: 5px; }
+            QScrollBar::handle:horizontal { background-color: #007acc; min-width: 20px; border-radius: 5px; }
+            QScrollBar::handle:horizontal:hover { background-color: #005f99; }
+        """,
+    "header": "color: black;",
+    "folder": "background-color: #e0e0e0; padding: 12px; border-radius: 10px; border: 2px solid #ccc; min-width: 500px; color: black;",
+    "progress": (
+        "QProgressBar { background-color: #e0e0e0; border: 2px solid #ccc; border-radius: 10px; text-align: center; color: black; }"
+        "QProgressBar::chunk { background-color: #FF6433; border-radius: 8px; }"
+    ),
+    "log": "border: 2px solid #ccc; padding: 12px; background-color: #f5f5f5; color: black;",
+}
+
+def mascotPixmap(imagePath, size=MASCOT_SIZE):
+    """The image at `imagePath` scaled to `size`, decoded and scaled once, or None if it is missing."""
+    key = f"mascot:{size}:{imagePath}"
+    pixmap = QtGui.QPixmapCache.find(key)
+    if pixmap is None or pixmap.isNull():
+        pixmap = QtGui.QPixmap(imagePath)
+        if pixmap.isNull():
+            return None
+        pixmap = pixmap.scaled(size, size, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+        QtGui.QPixmapCache.insert(key, pixmap)
+    return pixmap
 
 # -------------------- Worker Thread --------------------
 class RenameWorker(QtCore.QThread):
+    # logSignal may carry several lines at once; both signals fire from the GUI thread
+    # on a timer, so per-file output never floods the event loop
     logSignal = QtCore.pyqtSignal(str)
     progressSignal = QtCore.pyqtSignal(int)
     finishedSignal = QtCore.pyqtSignal()
 
-    def __init__(self, folder, title_preference, functions, previewMode=False, parent=None):
+    # Every worker renames through the same journal, so only one batch renames at a time
+    journalLock = threading.Lock()
+
+    def __init__(self, folder, title_preference, resolver, previewMode=False, scanOptions=None, plan=None, sinks=(),
+                 reportPath="", profilePath="", journalAction=None, files=None, processedIndex=None, probe=None, hashIndex=None,
+                 checkpointed=True, journalSince=None, trackResolver=True, parent=None):
+        from renamer_core import default_journal_path
         super().__init__(parent)
         self.folder = folder
         self.title_preference = title_preference
         self.previewMode = previewMode
-        # functions: dict with keys 'anilist', 'mal', 'title_case', 'expand_season', 'format_mal'
-        self.get_anime_title_anilist = functions['anilist']
-        self.get_anime_title_mal = functions['mal']
-        self.format_title_case = functions['title_case']
-        self.expand_season_format = functions['expand_season']
-        self.format_for_mal_search = functions['format_mal']
+        self.resolver = resolver
+        self.scanOptions = scanOptions or {}
+        # plan: entries from an earlier preview, renamed as-is without any lookups.
+        # A preview run fills it in for the "Apply Plan" action.
+        self.plan = plan
+        # Extra event sinks (e.g. the JSONL file) that also get this run's records
+        self.sinks = sinks
+        # Optional run report (.prom or JSON) and cProfile output, written when the run ends
+        self.reportPath = reportPath
+        self.profilePath = profilePath
+        # journalAction: "resume" the interrupted run (its journal, then its checkpoint) or
+        # "undo" the renames recorded in the journal, instead of a new run
+        self.journalAction = journalAction
+        self.stopEvent = threading.Event()
+        # Cleared while paused; planning waits for it between files
+        self.unpausedEvent = threading.Event()
+        self.unpausedEvent.set()
+        # Whether a full run keeps the run checkpoint for Resume; queued jobs leave it to the main run
+        self.checkpointed = checkpointed
+        # MetadataProbe for files the filename pattern misses, or None to leave them alone
+        self.probe = probe
+        # HashIndex to leave copies of earlier files alone with, or None to plan them too
+        self.hashIndex = hashIndex
+        self.journalPath = default_journal_path()
+        # Add the renames to the journal as one more batch if it was started since this time
+        self.journalSince = journalSince
+        # Whether the report includes the resolver's counters; queued jobs share one resolver,
+        # so the queue reports those for all of its jobs instead
+        self.trackResolver = trackResolver
+        # files: only these paths (relative to folder) instead of a scan; a watched folder's
+        # outcomes are recorded in processedIndex
+        self.files = files
+        self.processedIndex = processedIndex
+        self.stats = None
+
+        self.outputLock = threading.Lock()
+        self.pendingLines = []
+        self.pendingProgress = None
+        # The QThread object lives in the GUI thread, so this timer fires there
+        self.flushTimer = QtCore.QTimer(self)
+        self.flushTimer.setInterval(OUTPUT_FLUSH_INTERVAL_MS)
+        self.flushTimer.timeout.connect(self.flushOutput)
+        self.started.connect(self.flushTimer.start)
+        self.finished.connect(self.onThreadFinished)
+
+    def log(self, message):
+        with self.outputLock:
+            self.pendingLines.append(message)
+
+    def logRecord(self, record):
+        self.log(record.message)
+
+    def setProgress(self, value):
+        with self.outputLock:
+            self.pendingProgress = value
+
+    def flushOutput(self):
+        with self.outputLock:
+            lines, self.pendingLines = self.pendingLines, []
+            progress, self.pendingProgress = self.pendingProgress, None
+        if lines:
+            self.logSignal.emit("\n".join(lines))
+        if progress is not None:
+            self.progressSignal.emit(progress)
+
+    def onThreadFinished(self):
+        self.flushTimer.stop()
+        self.flushOutput()
+        self.finishedSignal.emit()
 
     def run(self):
-        files = [f for f in os.listdir(self.folder) if f.lower().endswith(ALLOWED_EXTENSIONS)]
-        total = len(files)
-        if total == 0:
-            self.logSignal.emit(self.tr("⚠️ No supported files found in this folder. Nothing to process."))
-            self.finishedSignal.emit()
+        from run_stats import RunStats, run_profiled, write_report
+        events = EventLog()
+        events.subscribe(self.logRecord)
+        for sink in self.sinks:
+            events.subscribe(sink, DEBUG)
+        self.stats = RunStats()
+        if self.trackResolver:
+            self.stats.track(self.resolver.stats)
+        try:
+            run_profiled(self.profilePath, self.process, events, self.stats)
+        finally:
+            self.stats.finish()
+            for line in self.stats.report_lines():
+                events.info(line)
+            if self.reportPath:
+                try:
+                    write_report(self.reportPath, self.stats)
+                except OSError as e:
+                    events.error(self.tr("❌ Could not write run report: ") + str(e))
+
+    def cancel(self):
+        # Checked between files and lookups; whatever is under way finishes first
+        self.stopEvent.set()
+        self.unpausedEvent.set()
+
+    def setPaused(self, paused):
+        if paused:
+            self.unpausedEvent.clear()
+        else:
+            self.unpausedEvent.set()
+
+    def isPaused(self):
+        return not self.unpausedEvent.is_set()
+
+    def waitWhilePaused(self):
+        # The scan stops too once its read-ahead queue is full
+        self.unpausedEvent.wait()
+
+    def process(self, events, stats):
+        from rename_journal import resume_journal, undo_journal, unfinished_journal
+        from renamer_core import default_checkpoint_path
+        from run_checkpoint import RunCheckpoint, unfinished_checkpoint
+        if self.journalAction == "undo":
+            try:
+                with RenameWorker.journalLock:
+                    undo_journal(self.journalPath, events, stats)
+            except (OSError, ValueError) as e:
+                events.error(self.tr("❌ Could not read the rename journal: ") + str(e))
             return
 
-        for idx, filename in enumerate(files):
-            file_root, file_ext = os.path.splitext(filename)
-            match = re.match(r"^(.*?)[-\s]+(?:OP\d*|Opening|ED\d*|Ending)", file_root, re.IGNORECASE)
-            if not match:
-                self.progressSignal.emit(idx + 1)
-                continue
-
-            anime_title = match.group(1).strip()
-            new_anime_name = self.get_anime_title_anilist(anime_title)
-            if not new_anime_name:
-                new_anime_name = self.get_anime_title_mal(anime_title)
-                if new_anime_name:
-                    second_attempt = self.get_anime_title_anilist(new_anime_name)
-                    if second_attempt:
-                        new_anime_name = second_attempt
-            if not new_anime_name:
-                self.progressSignal.emit(idx + 1)
-                continue
-
-            if self.title_preference == "english":
-                new_anime_name = self.format_title_case(new_anime_name)
-
-            new_filename = new_anime_name + file_root[len(anime_title):]
-            invalid_chars = r'[\/:*?"<>|]'
-            new_filename = re.sub(invalid_chars, '', new_filename)
-            new_filename = re.sub(r'\bOP(\d+)\b', self.tr("Opening \\1"), new_filename, flags=re.IGNORECASE)
-            new_filename = re.sub(r'\bED(\d+)\b', self.tr("Ending \\1"), new_filename, flags=re.IGNORECASE)
-            new_filename = self.expand_season_format(new_filename)
-            new_filename = re.sub(r'(\w)(Opening|Ending)', r'\1 - \2', new_filename)
-            new_filename = re.sub(r'(\S)-(\S)', r'\1 - \2', new_filename)
-            new_filename = re.sub(r'(Opening \d+|Ending \d+).*', r'\1', new_filename, flags=re.IGNORECASE)
-            new_filename += file_ext
-
-            if self.previewMode:
-                self.logSignal.emit(f"{filename} ➡️ {new_filename}")
-            else:
-                new_path = os.path.join(self.folder, new_filename)
+        checkpoint = None
+        if self.journalAction == "resume":
+            # Renames that were under way first, then the files the run had not got to
+            if unfinished_journal(self.journalPath):
                 try:
-                    os.rename(os.path.join(self.folder, filename), new_path)
-                    self.logSignal.emit(self.tr("✅ Renamed: ") + f"{filename} → {new_filename}")
-                except Exception as e:
-                    self.logSignal.emit(self.tr("❌ Error renaming ") + f"{filename}: {e}")
-
-            self.progressSignal.emit(idx + 1)
-
-        self.finishedSignal.emit()
+                    with RenameWorker.journalLock:
+                        resume_journal(self.journalPath, events, stats, progress=self.setProgress, stop=self.stopEvent)
+                except (OSError, ValueError) as e:
+                    events.error(self.tr("❌ Could not read the rename journal: ") + str(e))
+                    return
+            checkpoint = unfinished_checkpoint(default_checkpoint_path())
+            if checkpoint is None or self.stopEvent.is_set():
+                self.reportCancelled(events)
+                return
+            self.folder = checkpoint.folder
+            self.title_preference = checkpoint.title_preference
+            self.scanOptions = checkpoint.scan_options
+            checkpoint.reopen()
+            events.info(self.tr("↩️ Resuming the run in folder: ") + self.folder)
+        elif self.checkpointed and not self.previewMode and self.plan is None and self.files is None:
+            checkpoint = RunCheckpoint(default_checkpoint_path())
+            checkpoint.start(self.folder, self.title_preference, self.scanOptions)
+        try:
+            self.planAndRename(events, stats, checkpoint)
+        finally:
+            if checkpoint is not None:
+                if not self.stopEvent.is_set():
+                    checkpoint.finish()
+                checkpoint.close()
+        self.reportCancelled(events)
+
+    def reportCancelled(self, events):
+        if self.stopEvent.is_set():
+            events.warning(self.tr("⏹️ Cancelled. Use Resume to pick up where it stopped."))
+
+    def recordRenamed(self, entry):
+        # Recorded right away, so a watch never hands a file renamed by this run back as new
+        self.processedIndex.record(self.folder, [entry])
+
+    def planAndRename(self, events, stats, checkpoint):
+        from rename_journal import execute_plan, unfinished_journal
+        from renamer_core import iter_rename_plan
+        if self.plan is not None:
+            entries = self.plan
+        else:
+            # Files are planned while the folder scan is still running
+            entries = iter_rename_plan(
+                self.folder, self.title_preference, self.resolver, log=events, files=self.files,
+                scan_options=self.scanOptions, stats=stats, checkpoint=checkpoint, stop=self.stopEvent,
+                probe=self.probe, hash_index=self.hashIndex
+            )
+        preview = [] if self.previewMode else None
+        renames = []
+        handled = []
+        total = 0
+        for idx, entry in enumerate(entries):
+            self.waitWhilePaused()
+            if self.stopEvent.is_set():
+                break
+            total = idx + 1
+            if self.processedIndex is not None:
+                handled.append(entry)
+            if self.plan is not None:
+                stats.count("files")
+            if entry["target"]:
+                if self.previewMode:
+                    events.info(f"{entry['source']} ➡️ {entry['target']}", file=entry["source"])
+                    preview.append(entry)
+                else:
+                    renames.append(entry)
+
+            # A plan's progress is counted by execute_plan as its files are renamed
+            if self.plan is None:
+                self.setProgress(idx + 1)
+
+        self.waitWhilePaused()
+        if self.previewMode:
+            self.plan = preview
+        elif renames and not self.stopEvent.is_set():
+            # Renamed as one journaled batch once the whole plan is known, so clashing names are caught
+            with RenameWorker.journalLock:
+                if unfinished_journal(self.journalPath):
+                    events.error(self.tr("❌ The last run was interrupted. Resume or undo it under Settings → Last Run first."))
+                    return
+                execute_plan(self.folder, renames, self.journalPath, events, stats, progress=self.setProgress,
+                             stop=self.stopEvent, renamed=self.recordRenamed if self.processedIndex is not None else None,
+                             append_since=self.journalSince)
+        if self.processedIndex is not None and not self.previewMode:
+            # Renamed files were recorded as they were renamed
+            self.processedIndex.record(self.folder, [entry for entry in handled if entry["status"] != "renamed"])
+
+        if total == 0 and checkpoint is None:
+            events.warning(self.tr("⚠️ No supported files found in this folder. Nothing to process."))
+
+# -------------------- Watched Folder --------------------
+class QtChangeSource(QtCore.QObject):
+    """FolderWatcher change source backed by QFileSystemWatcher; wait() never blocks."""
+
+    def __init__(self, folder, scanOptions, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self.scanOptions = scanOptions
+        self.fsWatcher = QtCore.QFileSystemWatcher(self)
+        self.fsWatcher.directoryChanged.connect(self.onDirectoryChanged)
+        # Everything counts as changed once, so files already there are looked at too
+        self.changed = self.addFolders("")
+
+    def addFolders(self, start, maxDepth=None):
+        from folder_scanner import scan_subfolders
+        from folder_watcher import folder_options
+        options = folder_options(self.scanOptions)
+        if maxDepth is not None and options.get("recursive"):
+            options["max_depth"] = min(maxDepth, options.get("max_depth") or maxDepth)
+        watched = {os.path.normpath(path) for path in self.fsWatcher.directories()}
+        added = set()
+        for relativeDir in scan_subfolders(self.folder, start=start, **options):
+            path = os.path.normpath(os.path.join(self.folder, relativeDir))
+            if path not in watched:
+                self.fsWatcher.addPath(path)
+                added.add(relativeDir)
+        return added
+
+    def onDirectoryChanged(self, path):
+        from folder_scanner import folder_depth
+        relativeDir = os.path.relpath(path, self.folder)
+        relativeDir = "" if relativeDir == os.curdir else relativeDir
+        self.changed.add(relativeDir)
+        # Subfolders that just appeared need watches of their own, as do the folders inside them
+        for subfolder in self.addFolders(relativeDir, folder_depth(relativeDir) + 1):
+            self.changed |= self.addFolders(subfolder) | {subfolder}
+
+    def wait(self, timeout):
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def close(self):
+        if self.fsWatcher.directories():
+            self.fsWatcher.removePaths(self.fsWatcher.directories())
 
 # -------------------- Preview Dialog --------------------
 class PreviewDialog(QtWidgets.QDialog):
+    applyRequested = QtCore.pyqtSignal()
+    saveRequested = QtCore.pyqtSignal()
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle(self.tr("Filename Preview"))
         self.resize(950, 600)
         layout = QtWidgets.QVBoxLayout(self)
-        self.textArea = QtWidgets.QTextEdit()
+        self.textArea = QtWidgets.QPlainTextEdit()
         self.textArea.setReadOnly(True)
+        self.textArea.setMaximumBlockCount(PREVIEW_MAX_LINES)
         self.textArea.setAccessibleName(self.tr("Preview Text Area"))
         self.textArea.setAccessibleDescription(self.tr("Displays a preview of the new filenames"))
         layout.addWidget(self.textArea)
+        buttonLayout = QtWidgets.QHBoxLayout()
+        buttonLayout.addStretch()
+        self.saveBtn = QtWidgets.QPushButton(self.tr("Save Plan..."))
+        self.saveBtn.setToolTip(self.tr("Save these renames as a plan file"))
+        self.saveBtn.setAccessibleName(self.tr("Save Plan Button"))
+        self.saveBtn.clicked.connect(self.saveRequested.emit)
+        buttonLayout.addWidget(self.saveBtn)
+        self.applyBtn = QtWidgets.QPushButton(self.tr("Apply Plan"))
+        self.applyBtn.setToolTip(self.tr("Rename exactly as previewed, without looking titles up again"))
+        self.applyBtn.setAccessibleName(self.tr("Apply Plan Button"))
+        self.applyBtn.clicked.connect(self.applyRequested.emit)
+        buttonLayout.addWidget(self.applyBtn)
         closeBtn = QtWidgets.QPushButton(self.tr("Close"))
         closeBtn.clicked.connect(self.close)
         closeBtn.setAccessibleName(self.tr("Close Button"))
-        layout.addWidget(closeBtn, alignment=QtCore.Qt.AlignRight)
+        buttonLayout.addWidget(closeBtn)
+        layout.addLayout(buttonLayout)
+        self.setPlanReady(False)
 
     def appendText(self, text):
-        self.textArea.append(text)
+        self.textArea.appendPlainText(text)
+
+    def setPlanReady(self, ready):
+        self.saveBtn.setEnabled(ready)
+        self.applyBtn.setEnabled(ready)
+
+# -------------------- Job Queue --------------------
+class RenameJob:
+    """One queued folder: its worker once started and what the queue shows about it."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.status = "queued"
+        self.worker = None
+        self.paused = False
+        self.processed = 0
+
+
+class JobQueueDialog(QtWidgets.QDialog):
+    """Folders renamed one after another, up to `concurrency` at a time.
+
+    createWorker(folder) returns an unstarted RenameWorker; every job's worker shares the
+    window's resolver, so titles looked up for one folder come from the cache for the next.
+    Its lookups are counted for the queue as a whole, from a job starting on an idle queue
+    until no job is left to run, and the jobs' renames go into one journal over that time.
+    """
+    # Emitted with (folder, lines) whenever a job logs
+    logRequested = QtCore.pyqtSignal(str, str)
+    # Emitted with lines about the queue as a whole
+    summaryRequested = QtCore.pyqtSignal(str)
+
+    def __init__(self, createWorker, settings, parent=None):
+        super().__init__(parent)
+        self.createWorker = createWorker
+        self.settings = settings
+        self.jobs = []
+        self.running = False
+        # Set while jobs run: the shared resolver's counters, and when the journal was started
+        self.lookupStats = None
+        self.journalSince = None
+        self.setWindowTitle(self.tr("Job Queue"))
+        self.resize(1000, 500)
+        self.setAcceptDrops(True)
+        layout = QtWidgets.QVBoxLayout(self)
+
+        self.table = QtWidgets.QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels([self.tr("Folder"), self.tr("Status"), self.tr("Files")])
+        self.table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setAccessibleName(self.tr("Job Queue Table"))
+        layout.addWidget(self.table)
+
+        buttonLayout = QtWidgets.QHBoxLayout()
+        addBtn = QtWidgets.QPushButton(self.tr("Add Folder..."))
+        addBtn.setToolTip(self.tr("Queue a folder; you can also drop folders here"))
+        addBtn.clicked.connect(self.browseFolder)
+        buttonLayout.addWidget(addBtn)
+        addSubfoldersBtn = QtWidgets.QPushButton(self.tr("Add Subfolders..."))
+        addSubfoldersBtn.setToolTip(self.tr("Queue every folder inside a folder, e.g. a whole season"))
+        addSubfoldersBtn.clicked.connect(self.browseSubfolders)
+        buttonLayout.addWidget(addSubfoldersBtn)
+        self.pauseBtn = QtWidgets.QPushButton(self.tr("Pause / Continue"))
+        self.pauseBtn.setToolTip(self.tr("Pause the selected jobs, or let paused ones carry on"))
+        self.pauseBtn.clicked.connect(self.togglePauseSelected)
+        buttonLayout.addWidget(self.pauseBtn)
+        cancelBtn = QtWidgets.QPushButton(self.tr("Cancel"))
+        cancelBtn.setToolTip(self.tr("Stop the selected jobs after the files under way"))
+        cancelBtn.clicked.connect(self.cancelSelected)
+        buttonLayout.addWidget(cancelBtn)
+        removeBtn = QtWidgets.QPushButton(self.tr("Remove"))
+        removeBtn.setToolTip(self.tr("Take the selected jobs that are not running off the list"))
+        removeBtn.clicked.connect(self.removeSelected)
+        buttonLayout.addWidget(removeBtn)
+        buttonLayout.addStretch()
+        buttonLayout.addWidget(QtWidgets.QLabel(self.tr("At Once:")))
+        self.concurrencySpin = QtWidgets.QSpinBox()
+        self.concurrencySpin.setRange(1, MAX_CONCURRENT_JOBS)
+        self.concurrencySpin.setValue(settings.value("queue_concurrency", 2, type=int))
+        self.concurrencySpin.setToolTip(self.tr("How many folders are worked on at the same time"))
+        self.concurrencySpin.valueChanged.connect(self.setConcurrency)
+        buttonLayout.addWidget(self.concurrencySpin)
+        self.startBtn = QtWidgets.QPushButton(self.tr("Start Queue"))
+        self.startBtn.clicked.connect(self.startQueue)
+        buttonLayout.addWidget(self.startBtn)
+        closeBtn = QtWidgets.QPushButton(self.tr("Close"))
+        closeBtn.setToolTip(self.tr("Hide the queue; its jobs keep running"))
+        closeBtn.clicked.connect(self.close)
+        buttonLayout.addWidget(closeBtn)
+        layout.addLayout(buttonLayout)
+
+    def statusText(self, job):
+        labels = {
+            "queued": self.tr("Queued"),
+            "running": self.tr("Running"),
+            "cancelling": self.tr("Cancelling..."),
+            "done": self.tr("Done"),
+            "cancelled": self.tr("Cancelled"),
+        }
+        text = labels[job.status]
+        if job.paused and job.status in ("queued", "running"):
+            text += self.tr(" (Paused)")
+        return text
+
+    def updateRow(self, job):
+        row = self.jobs.index(job)
+        self.table.setItem(row, 0, QtWidgets.QTableWidgetItem(job.folder))
+        self.table.setItem(row, 1, QtWidgets.QTableWidgetItem(self.statusText(job)))
+        self.table.setItem(row, 2, QtWidgets.QTableWidgetItem(str(job.processed)))
+
+    def addFolders(self, folders):
+        queued = {job.folder for job in self.jobs if job.status in ("queued", "running")}
+        for folder in folders:
+            folder = os.path.normpath(folder)
+            if folder in queued or not os.path.isdir(folder):
+                continue
+            queued.add(folder)
+            job = RenameJob(folder)
+            self.jobs.append(job)
+            self.table.insertRow(self.table.rowCount())
+            self.updateRow(job)
+        self.schedule()
+
+    def browseFolder(self):
+        folder = QtWidgets.QFileDialog.getExistingDirectory(self, self.tr("Select Folder"))
+        if folder:
+            self.addFolders([folder])
+
+    def browseSubfolders(self):
+        folder = QtWidgets.QFileDialog.getExistingDirectory(self, self.tr("Select Folder"))
+        if folder:
+            with os.scandir(folder) as entries:
+                subfolders = sorted(entry.path for entry in entries if entry.is_dir())
+            self.addFolders(subfolders)
+
+    def dragEnterEvent(self, event):
+        if droppedFolders(event.mimeData()):
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        self.addFolders(droppedFolders(event.mimeData()))
+        event.acceptProposedAction()
+
+    def selectedJobs(self):
+        return [self.jobs[index.row()] for index in self.table.selectionModel().selectedRows()]
+
+    def togglePauseSelected(self):
+        for job in self.selectedJobs():
+            if job.status not in ("queued", "running"):
+                continue
+            job.paused = not job.paused
+            if job.worker is not None:
+                job.worker.setPaused(job.paused)
+            self.updateRow(job)
+        self.schedule()
+
+    def cancelSelected(self):
+        for job in self.selectedJobs():
+            if job.status == "queued":
+                job.status = "cancelled"
+            elif job.status == "running":
+                job.status = "cancelling"
+                job.worker.cancel()
+            self.updateRow(job)
+        self.schedule()
+
+    def removeSelected(self):
+        for row in sorted((index.row() for index in self.table.selectionModel().selectedRows()), reverse=True):
+            if self.jobs[row].status in ("running", "cancelling"):
+                continue
+            del self.jobs[row]
+            self.table.removeRow(row)
+
+    def setConcurrency(self, value):
+        self.settings.setValue("queue_concurrency", value)
+        self.schedule()
+
+    def startQueue(self):
+        # From now on folders start as soon as they are added
+        self.running = True
+        self.schedule()
+
+    def isBusy(self):
+        return any(job.status in ("running", "cancelling") for job in self.jobs)
+
+    def schedule(self):
+        if not self.running:
+            return
+        # A paused job keeps its slot, so pausing frees up the API quota rather than handing it on
+        active = sum(job.status in ("running", "cancelling") for job in self.jobs)
+        for job in self.jobs:
+            if active >= self.concurrencySpin.value():
+                break
+            if job.status == "queued" and not job.paused:
+                self.startJob(job)
+                active += 1
+
+    def startJob(self, job):
+        from run_stats import RunStats
+        job.status = "running"
+        job.worker = self.createWorker(job.folder)
+        if self.lookupStats is None:
+            self.lookupStats = RunStats()
+            self.lookupStats.track(job.worker.resolver.stats)
+            self.journalSince = time.time()
+        job.worker.journalSince = self.journalSince
+        job.worker.logSignal.connect(lambda lines, folder=job.folder: self.logRequested.emit(folder, lines))
+        job.worker.progressSignal.connect(lambda value, job=job: self.onJobProgress(job, value))
+        job.worker.finishedSignal.connect(lambda job=job: self.onJobFinished(job))
+        job.worker.start()
+        self.updateRow(job)
+
+    def onJobProgress(self, job, value):
+        job.processed = value
+        if job in self.jobs:
+            self.updateRow(job)
+
+    def onJobFinished(self, job):
+        job.status = "cancelled" if job.worker.stopEvent.is_set() else "done"
+        job.paused = False
+        if job in self.jobs:
+            self.updateRow(job)
+        self.schedule()
+        # Paused jobs still to run keep the queue's journal and counters going
+        if self.lookupStats is not None and not any(job.status in ("queued", "running", "cancelling") for job in self.jobs):
+            stats, self.lookupStats = self.lookupStats.finish(), None
+            counters = ", ".join(f"{name} {value}" for name, value in sorted(stats.counters.items()))
+            self.summaryRequested.emit(self.tr("📊 Lookups for the whole queue: ") + (counters or self.tr("none")))
+
+    def cancelAll(self):
+        self.running = False
+        for job in self.jobs:
+            if job.status == "queued":
+                job.status = "cancelled"
+            elif job.worker is not None and job.worker.isRunning():
+                job.worker.cancel()
+                job.worker.wait()
+
+
+def droppedFolders(mimeData):
+    if not mimeData.hasUrls():
+        return []
+    return [url.toLocalFile() for url in mimeData.urls() if url.isLocalFile() and os.path.isdir(url.toLocalFile())]
 
 # -------------------- Settings Dialog --------------------
 class SettingsDialog(QtWidgets.QDialog):
+    clearCacheRequested = QtCore.pyqtSignal()
+    importIndexRequested = QtCore.pyqtSignal()
+    resumeRunRequested = QtCore.pyqtSignal()
+    undoRunRequested = QtCore.pyqtSignal()
+
     def __init__(self, current_settings, parent=None):
+        from folder_scanner import SYMLINK_POLICIES
         super().__init__(parent)
         self.setWindowTitle(self.tr("Preferences"))
         self.resize(400, 200)
         layout = QtWidgets.QFormLayout(self)
 
         self.apiPriorityCombo = QtWidgets.QComboBox()
-        self.apiPriorityCombo.addItems([self.tr("AniList"), self.tr("MAL"), self.tr("Auto")])
-        self.apiPriorityCombo.setCurrentText(current_settings.get("api_priority", self.tr("Auto")))
+        for priority, label in zip(API_PRIORITIES, [self.tr("Auto"), self.tr("AniList"), self.tr("MAL")]):
+            self.apiPriorityCombo.addItem(label, priority)
+        self.apiPriorityCombo.setCurrentIndex(max(0, self.apiPriorityCombo.findData(current_settings.get("api_priority", "auto"))))
         layout.addRow(self.tr("API Priority:"), self.apiPriorityCombo)
 
         self.themeCombo = QtWidgets.QComboBox()
@@ -128,6 +688,75 @@ class SettingsDialog(QtWidgets.QDialog):
         self.themeCombo.setCurrentText(current_theme)
         layout.addRow(self.tr("Theme:"), self.themeCombo)
 
+        self.maxDepthSpin = QtWidgets.QSpinBox()
+        self.maxDepthSpin.setRange(0, 99)
+        self.maxDepthSpin.setSpecialValueText(self.tr("Unlimited"))
+        self.maxDepthSpin.setValue(current_settings.get("scan_max_depth", 0))
+        self.maxDepthSpin.setToolTip(self.tr("How many subfolder levels to scan when subfolders are included"))
+        layout.addRow(self.tr("Subfolder Depth:"), self.maxDepthSpin)
+
+        self.includeEdit = QtWidgets.QLineEdit(current_settings.get("scan_include", ""))
+        self.includeEdit.setPlaceholderText(self.tr("e.g. *OP*; *ED*"))
+        self.includeEdit.setToolTip(self.tr("Only rename files matching one of these patterns (separated by ;)"))
+        layout.addRow(self.tr("Include Patterns:"), self.includeEdit)
+
+        self.excludeEdit = QtWidgets.QLineEdit(current_settings.get("scan_exclude", ""))
+        self.excludeEdit.setPlaceholderText(self.tr("e.g. Extras; *.part"))
+        self.excludeEdit.setToolTip(self.tr("Skip files and folders matching one of these patterns (separated by ;)"))
+        layout.addRow(self.tr("Exclude Patterns:"), self.excludeEdit)
+
+        self.symlinkCombo = QtWidgets.QComboBox()
+        for policy, label in zip(SYMLINK_POLICIES, [self.tr("Skip"), self.tr("Files Only"), self.tr("Follow")]):
+            self.symlinkCombo.addItem(label, policy)
+        self.symlinkCombo.setCurrentIndex(max(0, self.symlinkCombo.findData(current_settings.get("scan_symlinks", "files"))))
+        layout.addRow(self.tr("Symlinks:"), self.symlinkCombo)
+
+        self.readMetadataCheck = QtWidgets.QCheckBox(self.tr("Read titles from video metadata"))
+        self.readMetadataCheck.setChecked(current_settings.get("read_metadata", True))
+        self.readMetadataCheck.setToolTip(self.tr("Name files without OP/ED in their name after the title stored in the video"))
+        layout.addRow(self.tr("File Metadata:"), self.readMetadataCheck)
+
+        self.checkDuplicatesCheck = QtWidgets.QCheckBox(self.tr("Leave duplicate copies alone"))
+        self.checkDuplicatesCheck.setChecked(current_settings.get("check_duplicates", True))
+        self.checkDuplicatesCheck.setToolTip(self.tr("Files with the same contents as one found earlier are reported instead of looked up"))
+        layout.addRow(self.tr("Duplicates:"), self.checkDuplicatesCheck)
+
+        self.clearCacheButton = QtWidgets.QPushButton(self.tr("Clear Title Cache"))
+        self.clearCacheButton.setToolTip(self.tr("Forget every title looked up on AniList/MAL so far"))
+        self.clearCacheButton.clicked.connect(self.clearCacheRequested.emit)
+        layout.addRow(self.tr("Title Cache:"), self.clearCacheButton)
+
+        self.importIndexButton = QtWidgets.QPushButton(self.tr("Import Title Dump..."))
+        self.importIndexButton.setToolTip(self.tr("Build an offline title index from a JSON/CSV dump of AniList/MAL entries"))
+        self.importIndexButton.clicked.connect(self.importIndexRequested.emit)
+        layout.addRow(self.tr("Offline Titles:"), self.importIndexButton)
+
+        journalLayout = QtWidgets.QHBoxLayout()
+        self.resumeRunButton = QtWidgets.QPushButton(self.tr("Resume"))
+        self.resumeRunButton.setToolTip(self.tr("Finish the renames of a run that was interrupted"))
+        self.resumeRunButton.clicked.connect(self.resumeRunRequested.emit)
+        journalLayout.addWidget(self.resumeRunButton)
+        self.undoRunButton = QtWidgets.QPushButton(self.tr("Undo"))
+        self.undoRunButton.setToolTip(self.tr("Give every file the last run renamed its old name back"))
+        self.undoRunButton.clicked.connect(self.undoRunRequested.emit)
+        journalLayout.addWidget(self.undoRunButton)
+        layout.addRow(self.tr("Last Run:"), journalLayout)
+
+        self.eventLogEdit = QtWidgets.QLineEdit(current_settings.get("event_log_path", ""))
+        self.eventLogEdit.setPlaceholderText(self.tr("Off"))
+        self.eventLogEdit.setToolTip(self.tr("Also write every log record to this file as JSON lines"))
+        layout.addRow(self.tr("Event Log File:"), self.eventLogEdit)
+
+        self.reportEdit = QtWidgets.QLineEdit(current_settings.get("run_report_path", ""))
+        self.reportEdit.setPlaceholderText(self.tr("Off"))
+        self.reportEdit.setToolTip(self.tr("Write each run's timings and counters here: Prometheus textfile for .prom, JSON otherwise"))
+        layout.addRow(self.tr("Run Report File:"), self.reportEdit)
+
+        self.profileEdit = QtWidgets.QLineEdit(current_settings.get("profile_path", ""))
+        self.profileEdit.setPlaceholderText(self.tr("Off"))
+        self.profileEdit.setToolTip(self.tr("Profile each run with cProfile and save the stats here"))
+        layout.addRow(self.tr("Profile Output:"), self.profileEdit)
+
         buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
         buttonBox.accepted.connect(self.accept)
         buttonBox.rejected.connect(self.reject)
@@ -135,12 +764,39 @@ class SettingsDialog(QtWidgets.QDialog):
 
     def getSettings(self):
         return {
-            "api_priority": self.apiPriorityCombo.currentText(),
-            "theme_mode": self.themeCombo.currentText()
+            "api_priority": self.apiPriorityCombo.currentData(),
+            "theme_mode": self.themeCombo.currentText(),
+            "scan_max_depth": self.maxDepthSpin.value(),
+            "scan_include": self.includeEdit.text().strip(),
+            "scan_exclude": self.excludeEdit.text().strip(),
+            "scan_symlinks": self.symlinkCombo.currentData(),
+            "read_metadata": self.readMetadataCheck.isChecked(),
+            "check_duplicates": self.checkDuplicatesCheck.isChecked(),
+            "event_log_path": self.eventLogEdit.text().strip(),
+            "run_report_path": self.reportEdit.text().strip(),
+            "profile_path": self.profileEdit.text().strip()
         }
 
 # -------------------- Main Window --------------------
+class FirstPaintFilter(QtCore.QObject):
+    """Calls `callback` once, after the first paint of the widget it is installed on."""
+
+    def __init__(self, callback, parent=None):
+        super().__init__(parent)
+        self.callback = callback
+
+    def eventFilter(self, watched, event):
+        if event.type() == QtCore.QEvent.Paint:
+            watched.removeEventFilter(self)
+            # Called once the paint has finished
+            QtCore.QTimer.singleShot(0, self.callback)
+        return False
+
 class AnimeRenamerWindow(QtWidgets.QMainWindow):
+    # Lookups made for a run log through that run's worker; anything else the resolver logs,
+    # from whichever thread, is handed to the GUI thread by this signal
+    resolverLogSignal = QtCore.pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle(self.tr("Anime Openings & Endings Batch Renamer"))
@@ -156,20 +812,96 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         # QSettings for preferences
         self.settings = QtCore.QSettings("MyOrganization", "AnimeRenamer")
         self.loadSettings()
-        self.apiPriority = self.settings.value("api_priority", "Auto")
+        self.apiPriority = self.storedApiPriority()
         self.theme_mode = self.settings.value("theme_mode", "Dark")
 
         self.darkMode = (self.theme_mode == "Dark")
 
+        # Resolver records outside a run go to the log box and, when one is set up, the JSONL event log
+        self.events = EventLog()
+        self.events.subscribe(lambda record: self.resolverLogSignal.emit(record.message))
+        self.eventLogFile = None
+        self.openEventLogFile(self.settings.value("event_log_path", ""))
+
+        # The resolver, metadata probe and hash index each open a SQLite database, so they are
+        # set up the first time a run needs them rather than before the window is painted
+        self._resolver = None
+        self._metadataProbe = None
+        self._hashIndex = None
+        # Dialogs are built the first time they are opened
+        self.previewDialog = None
+        self.jobQueue = None
+        self.setAcceptDrops(True)
+
+        self.setStyleSheet(THEMES["Dark" if self.darkMode else "Light"]["window"])
         self.setupUI()
-        if self.darkMode:
-            self.applyDarkStyle()
-        else:
-            self.applyLightStyle()
 
         self.worker = None
+        self.processedCount = 0
+        self.previewPlan = None
+        self.folderWatcher = None
+        self.processedIndex = None
+        self.watchQueue = []
+        self.watchTimer = QtCore.QTimer(self)
+        self.watchTimer.setInterval(WATCH_POLL_INTERVAL_MS)
+        self.watchTimer.timeout.connect(self.pollWatchedFolder)
+        self.resolverLogSignal.connect(self.appendLog)
+        # (window started, window built) when --startup-profile is given
+        self.startupTimes = None
+        self.firstPaintFilter = FirstPaintFilter(self.onFirstPaint, self)
+        self.installEventFilter(self.firstPaintFilter)
+
+    @property
+    def resolver(self):
+        if self._resolver is None:
+            from renamer_core import create_resolver, default_cache_path
+            self._resolver = create_resolver(
+                default_cache_path(),
+                log=self.events,
+                pool_size=self.settings.value("http_pool_size", 10, type=int),
+                connect_timeout=self.settings.value("http_connect_timeout", 5.0, type=float),
+                read_timeout=self.settings.value("http_read_timeout", 20.0, type=float),
+                retries=self.settings.value("http_retries", 3, type=int),
+                priority=self.apiPriority,
+            )
+        return self._resolver
+
+    @property
+    def metadataProbe(self):
+        if self._metadataProbe is None:
+            from renamer_core import create_metadata_probe
+            self._metadataProbe = create_metadata_probe()
+        return self._metadataProbe
+
+    @property
+    def hashIndex(self):
+        if self._hashIndex is None:
+            from duplicate_finder import HashIndex
+            from renamer_core import default_hashes_path
+            self._hashIndex = HashIndex(default_hashes_path())
+        return self._hashIndex
+
+    def onFirstPaint(self):
+        if self.startupTimes is not None:
+            self.logStartupTimes(*self.startupTimes)
+        # Left until the window is up; an interrupted run's journal and checkpoint are read in full
+        self.checkLastRun()
+
+    def checkLastRun(self):
+        from rename_journal import unfinished_journal
+        from renamer_core import default_checkpoint_path, default_journal_path
+        from run_checkpoint import unfinished_checkpoint
+        if unfinished_journal(default_journal_path()):
+            self.logTextEdit.appendPlainText(
+                self.tr("⚠️ The last run was interrupted. Resume or undo it under Settings → Last Run.")
+            )
+        elif unfinished_checkpoint(default_checkpoint_path()) is not None:
+            self.logTextEdit.appendPlainText(
+                self.tr("⚠️ The last run stopped before it was done. Resume it under Settings → Last Run.")
+            )
 
     def setupUI(self):
+        theme = THEMES["Dark" if self.darkMode else "Light"]
         mainLayout = QtWidgets.QVBoxLayout()
         centralWidget = QtWidgets.QWidget()
         self.setCentralWidget(centralWidget)
@@ -182,6 +914,7 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         self.headerLabel = QtWidgets.QLabel(self.tr("Anime Openings & Endings Batch Renamer"))
         self.headerLabel.setFont(QtGui.QFont("AtkinsonHyperlegibleMono-Bold", 24))
         self.headerLabel.setAlignment(QtCore.Qt.AlignLeft)
+        self.headerLabel.setStyleSheet(theme["header"])
         self.versionLabel = QtWidgets.QLabel(self.tr("Version 1.10"))
         self.versionLabel.setFont(QtGui.QFont("AtkinsonHyperlegibleMono-Bold", 14))
         self.versionLabel.setStyleSheet("color: #888;")
@@ -195,16 +928,20 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         folderLayout = QtWidgets.QHBoxLayout()
         self.folderDisplay = QtWidgets.QLabel(self.tr("No folder selected"))
         self.folderDisplay.setFont(self.appFont)
-        self.folderDisplay.setStyleSheet(
-            "background-color: #333; padding: 12px; border-radius: 10px; border: 2px solid #555; min-width: 500px; color: white;"
-        )
+        self.folderDisplay.setStyleSheet(theme["folder"])
         browseBtn = QtWidgets.QPushButton(self.tr("Select Folder"))
         browseBtn.setFixedSize(200, 65)
         browseBtn.setFont(self.appFont)
         browseBtn.setToolTip(self.tr("Select a folder containing your anime files"))
         browseBtn.clicked.connect(self.browseFolder)
+        queueBtn = QtWidgets.QPushButton(self.tr("Job Queue"))
+        queueBtn.setFixedSize(200, 65)
+        queueBtn.setFont(self.appFont)
+        queueBtn.setToolTip(self.tr("Rename many folders one after another; you can also drop folders on this window"))
+        queueBtn.clicked.connect(self.showJobQueue)
         folderLayout.addWidget(self.folderDisplay)
         folderLayout.addWidget(browseBtn)
+        folderLayout.addWidget(queueBtn)
         mainLayout.addLayout(folderLayout)
 
         # Title language row
@@ -218,10 +955,23 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         self.languageCombo.setStyleSheet("border: 2px solid #555; padding: 10px;")
         languageLayout.addWidget(languageLabel)
         languageLayout.addWidget(self.languageCombo)
+        languageLayout.addSpacing(40)
+        self.recursiveCheck = QtWidgets.QCheckBox(self.tr("Include Subfolders"))
+        self.recursiveCheck.setFont(self.appFont)
+        self.recursiveCheck.setToolTip(self.tr("Also rename files in season folders and other subfolders"))
+        self.recursiveCheck.setChecked(self.settings.value("scan_recursive", False, type=bool))
+        self.recursiveCheck.toggled.connect(lambda checked: self.settings.setValue("scan_recursive", checked))
+        languageLayout.addWidget(self.recursiveCheck)
+        languageLayout.addSpacing(40)
+        self.watchCheck = QtWidgets.QCheckBox(self.tr("Watch Folder"))
+        self.watchCheck.setFont(self.appFont)
+        self.watchCheck.setToolTip(self.tr("Keep renaming new files as they finish arriving in the folder"))
+        self.watchCheck.toggled.connect(self.setWatching)
+        languageLayout.addWidget(self.watchCheck)
         languageLayout.addStretch()
         mainLayout.addLayout(languageLayout)
 
-        # Bottom buttons row: Preview, Start, Settings, Ko‑fi
+        # Bottom buttons row: Preview, Start, Cancel, Settings, Ko‑fi
         bottomButtonLayout = QtWidgets.QHBoxLayout()
         self.previewButton = QtWidgets.QPushButton(self.tr("Preview Filenames"))
         self.previewButton.setFixedSize(260, 65)
@@ -238,6 +988,14 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         self.startBtn.clicked.connect(self.startRenaming)
         bottomButtonLayout.addWidget(self.startBtn)
 
+        self.cancelBtn = QtWidgets.QPushButton(self.tr("Cancel"))
+        self.cancelBtn.setFixedSize(120, 65)
+        self.cancelBtn.setFont(self.appFont)
+        self.cancelBtn.setToolTip(self.tr("Stop after the files under way; Resume picks up the rest"))
+        self.cancelBtn.setEnabled(False)
+        self.cancelBtn.clicked.connect(self.cancelRun)
+        bottomButtonLayout.addWidget(self.cancelBtn)
+
         self.settingsButton = QtWidgets.QPushButton(self.tr("Settings"))
         self.settingsButton.setFixedSize(180, 65)
         self.settingsButton.setFont(self.appFont)
@@ -266,7 +1024,7 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         else:
             self.koFiButton.setText("☕")
         self.koFiButton.setStyleSheet("QToolButton { background: transparent; border: none; }")
-        self.koFiButton.clicked.connect(lambda: webbrowser.open("https://ko-fi.com/yuhgirlbrittney"))
+        self.koFiButton.clicked.connect(self.openKoFi)
         bottomButtonLayout.addWidget(self.koFiButton)
 
         bottomButtonLayout.addStretch()
@@ -276,10 +1034,7 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         self.progressBar = QtWidgets.QProgressBar()
         self.progressBar.setFixedHeight(30)
         self.progressBar.setValue(0)
-        self.progressBar.setStyleSheet(
-            "QProgressBar { background-color: #333; border: 2px solid #555; border-radius: 10px; text-align: center; color: white; }"
-            "QProgressBar::chunk { background-color: #FF6433; border-radius: 8px; }"
-        )
+        self.progressBar.setStyleSheet(theme["progress"])
         mainLayout.addWidget(self.progressBar)
 
         # Final row: Log box on left and Mascot Interaction Panel on right
@@ -288,10 +1043,11 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         finalRowLayout.setContentsMargins(0, 0, 0, 0)
 
         # Left: Log text edit
-        self.logTextEdit = QtWidgets.QTextEdit()
+        self.logTextEdit = QtWidgets.QPlainTextEdit()
         self.logTextEdit.setReadOnly(True)
+        self.logTextEdit.setMaximumBlockCount(LOG_MAX_LINES)
         self.logTextEdit.setFont(self.appFont)
-        self.logTextEdit.setStyleSheet("border: 2px solid #555; padding: 12px; background-color: #252526; color: white;")
+        self.logTextEdit.setStyleSheet(theme["log"])
         finalRowLayout.addWidget(self.logTextEdit, stretch=3)
 
         # Right: Mascot Interaction Panel
@@ -301,11 +1057,8 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         rightPanelLayout.setSpacing(20)
 
         self.mascotDisplay = QtWidgets.QLabel()
-        if os.path.exists(resource_path("mascot.png")):
-            pixmap = QtGui.QPixmap(resource_path("mascot.png"))
-            scaled_pixmap = pixmap.scaled(150, 150, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
-            self.mascotDisplay.setPixmap(scaled_pixmap)
-        self.mascotDisplay.setFixedSize(150, 150)
+        self.restoreMascot()
+        self.mascotDisplay.setFixedSize(MASCOT_SIZE, MASCOT_SIZE)
         rightPanelLayout.addWidget(self.mascotDisplay, alignment=QtCore.Qt.AlignCenter)
 
         buttonSize = QtCore.QSize(180, 50)
@@ -330,105 +1083,37 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         mainLayout.addWidget(finalRowWidget, stretch=1)
 
     def changeMascot(self, imagePath):
-        if os.path.exists(imagePath):
-            pixmap = QtGui.QPixmap(imagePath)
-            scaled_pixmap = pixmap.scaled(150, 150, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
-            self.mascotDisplay.setPixmap(scaled_pixmap)
+        pixmap = mascotPixmap(imagePath)
+        if pixmap is not None:
+            self.mascotDisplay.setPixmap(pixmap)
             QtCore.QTimer.singleShot(1000, self.restoreMascot)
 
     def restoreMascot(self):
-        if os.path.exists(resource_path("mascot.png")):
-            pixmap = QtGui.QPixmap(resource_path("mascot.png"))
-            scaled_pixmap = pixmap.scaled(150, 150, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
-            self.mascotDisplay.setPixmap(scaled_pixmap)
+        pixmap = mascotPixmap(resource_path("mascot.png"))
+        if pixmap is not None:
+            self.mascotDisplay.setPixmap(pixmap)
 
-    def loadSettings(self):
-        font_size = self.settings.value("font_size", 18, type=int)
-        self.appFont.setPointSize(font_size)
-        self.setFont(self.appFont)
-        self.apiPriority = self.settings.value("api_priority", "Auto")
-        self.interface_language = self.settings.value("interface_language", "English")
-        self.theme_mode = self.settings.value("theme_mode", "Dark")
-
-    def openSettings(self):
-        current = {
-            "api_priority": self.apiPriority,
-            "interface_language": self.interface_language,
-            "theme_mode": self.theme_mode
-        }
-        dlg = SettingsDialog(current, self)
-        if dlg.exec_() == QtWidgets.QDialog.Accepted:
-            new_settings = dlg.getSettings()
-            self.settings.setValue("api_priority", new_settings["api_priority"])
-            self.settings.setValue("theme_mode", new_settings.get("theme_mode", "Dark"))
-            self.apiPriority = new_settings["api_priority"]
-            self.theme_mode = new_settings["theme_mode"]
-            if self.theme_mode == "Dark":
-                self.darkMode = True
-                self.applyDarkStyle()
-            else:
-                self.darkMode = False
-                self.applyLightStyle()
+    def openKoFi(self):
+        # Only needed when clicked, so it stays out of startup
+        import webbrowser
+        webbrowser.open("https://ko-fi.com/yuhgirlbrittney")
 
     def toggleTheme(self):
         # Not used since theme is set in settings.
         pass
 
-    def applyDarkStyle(self):
-        self.headerLabel.setStyleSheet("color: white;")
-        self.folderDisplay.setStyleSheet(
-            "background-color: #333; padding: 12px; border-radius: 10px; border: 2px solid #555; min-width: 500px; color: white;"
-        )
-        self.progressBar.setStyleSheet(
-            "QProgressBar { background-color: #333; border: 2px solid #555; border-radius: 10px; text-align: center; color: white; }"
-            "QProgressBar::chunk { background-color: #FF6433; border-radius: 8px; }"
-        )
-        self.logTextEdit.setStyleSheet("border: 2px solid #555; padding: 12px; background-color: #252526; color: white;")
-        self.setStyleSheet("""
-            QMainWindow { background-color: #1e1e1e; }
-            QWidget { background-color: #1e1e1e; color: white; font-family: 'AtkinsonHyperlegibleMono-Bold'; font-size: 18px; }
-            QLabel { color: white; font-size: 18px; font-weight: bold; }
-            QPushButton { background-color: #007acc; color: white; border-radius: 12px; padding: 14px; font-size: 18px; font-weight: bold; }
-            QPushButton:hover { background-color: #005f99; }
-            QComboBox { background-color: #333; color: white; border-radius: 8px; padding: 10px; font-size: 18px; }
-            QTextEdit { background-color: #252526; color: white; border-radius: 8px; padding: 12px; font-size: 18px; }
-            QScrollBar:vertical { background-color: #333; width: 10px; margin: 0; border: none; border-radius: 5px; }
-            QScrollBar::handle:vertical { background-color: #007acc; min-height: 20px; border-radius: 5px; }
-            QScrollBar::handle:vertical:hover { background-color: #005f99; }
-            QScrollBar:horizontal { background-color: #333; height: 10px; margin: 0; border: none; border-radius: 5px; }
-            QScrollBar::handle:horizontal { background-color: #007acc; min-width: 20px; border-radius: 5px; }
-            QScrollBar::handle:horizontal:hover { background-color: #005f99; }
-        """)
-
-    def applyLightStyle(self):
-        self.headerLabel.setStyleSheet("color: black;")
-        self.folderDisplay.setStyleSheet(
-            "background-color: #e0e0e0; padding: 12px; border-radius: 10px; border: 2px solid #ccc; min-width: 500px; color: black;"
-        )
-        self.progressBar.setStyleSheet(
-            "QProgressBar { background-color: #e0e0e0; border: 2px solid #ccc; border-radius: 10px; text-align: center; color: black; }"
-            "QProgressBar::chunk { background-color: #FF6433; border-radius: 8px; }"
-        )
-        self.logTextEdit.setStyleSheet("border: 2px solid #ccc; padding: 12px; background-color: #f5f5f5; color: black;")
-        self.setStyleSheet("""
-            QMainWindow { background-color: #ffffff; }
-            QWidget { background-color: #ffffff; color: #000000; font-family: 'AtkinsonHyperlegibleMono-Bold'; font-size: 18px; }
-            QLabel { color: #000000; font-size: 18px; font-weight: bold; }
-            QPushButton { background-color: #007acc; color: white; border-radius: 12px; padding: 14px; font-size: 18px; font-weight: bold; }
-            QPushButton:hover { background-color: #005f99; }
-            QComboBox { background-color: #f0f0f0; color: black; border-radius: 8px; padding: 10px; font-size: 18px; }
-            QTextEdit { background-color: #f5f5f5; color: black; border-radius: 8px; padding: 12px; font-size: 18px; }
-            QScrollBar:vertical { background-color: #f0f0f0; width: 10px; margin: 0; border: none; border-radius: 5px; }
-            QScrollBar::handle:vertical { background-color: #007acc; min-height: 20px; border-radius: 5px; }
-            QScrollBar::handle:vertical:hover { background-color: #005f99; }
-            QScrollBar:horizontal { background-color: #f0f0f0; height: 10px; margin: 0; border: none; border-radius: 5px; }
-            QScrollBar::handle:horizontal { background-color: #007acc; min-width: 20px; border-radius: 5px; }
-            QScrollBar::handle:horizontal:hover { background-color: #005f99; }
-        """)
+    def applyTheme(self):
+        theme = THEMES["Dark" if self.darkMode else "Light"]
+        self.setStyleSheet(theme["window"])
+        self.headerLabel.setStyleSheet(theme["header"])
+        self.folderDisplay.setStyleSheet(theme["folder"])
+        self.progressBar.setStyleSheet(theme["progress"])
+        self.logTextEdit.setStyleSheet(theme["log"])
 
     def browseFolder(self):
         folder = QtWidgets.QFileDialog.getExistingDirectory(self, self.tr("Select Folder"))
         if folder:
+            self.watchCheck.setChecked(False)
             self.folderDisplay.setText(folder)
             self.startBtn.setEnabled(True)
             self.progressBar.setValue(0)
@@ -439,34 +1124,31 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         if not folder or not os.path.isdir(folder):
             QtWidgets.QMessageBox.warning(self, self.tr("Error"), self.tr("Please select a valid folder."))
             return
+        if not self.confirmIdle() or not self.confirmJournalFinished():
+            return
 
         lang_choice = self.languageCombo.currentText()
         self.title_preference = "english" if lang_choice.lower() == "english" else "romaji"
-        self.logTextEdit.append(self.tr("Starting renaming in folder: ") + folder)
-        self.logTextEdit.append(self.tr("Selected title language: ") + lang_choice)
+        self.logTextEdit.appendPlainText(self.tr("Starting renaming in folder: ") + folder)
+        self.logTextEdit.appendPlainText(self.tr("Selected title language: ") + lang_choice)
 
-        files = [f for f in os.listdir(folder) if f.lower().endswith(ALLOWED_EXTENSIONS)]
-        if not files:
-            self.logTextEdit.append(self.tr("⚠️ No supported files found in this folder."))
-            return
-        self.progressBar.setMaximum(len(files))
-
-        functions = {
-            'anilist': self.get_anime_title_anilist,
-            'mal': self.get_anime_title_mal,
-            'title_case': self.format_title_case,
-            'expand_season': self.expand_season_format,
-            'format_mal': self.format_for_mal_search
-        }
+        # The total is unknown until the scan finishes, so the bar stays busy until then
+        self.progressBar.setRange(0, 0)
+        self.processedCount = 0
 
         self.startBtn.setEnabled(False)
-        self.worker = RenameWorker(folder, self.title_preference, functions)
+        self.worker = RenameWorker(
+            folder, self.title_preference, self.resolver, scanOptions=self.scanOptions(), **self.workerOptions()
+        )
         self.worker.logSignal.connect(self.appendLog)
         self.worker.progressSignal.connect(self.updateProgress)
         self.worker.finishedSignal.connect(self.onRenameFinished)
         self.worker.start()
+        self.cancelBtn.setEnabled(True)
 
     def previewFilenames(self):
+        if not self.confirmIdle():
+            return
         folder = self.folderDisplay.text().strip()
         if not folder or not os.path.isdir(folder):
             QtWidgets.QMessageBox.warning(self, self.tr("Error"), self.tr("Please select a valid folder."))
@@ -475,137 +1157,383 @@ class AnimeRenamerWindow(QtWidgets.QMainWindow):
         lang_choice = self.languageCombo.currentText()
         self.title_preference = "english" if lang_choice.lower() == "english" else "romaji"
 
-        self.previewDialog = PreviewDialog(self)
+        if self.previewDialog is None:
+            self.previewDialog = PreviewDialog(self)
+            self.previewDialog.applyRequested.connect(self.applyPreviewPlan)
+            self.previewDialog.saveRequested.connect(self.savePreviewPlan)
+        else:
+            self.previewDialog.textArea.clear()
+            self.previewDialog.setPlanReady(False)
         self.previewDialog.show()
+        self.previewDialog.raise_()
 
-        files = [f for f in os.listdir(folder) if f.lower().endswith(ALLOWED_EXTENSIONS)]
-        if not files:
-            self.previewDialog.appendText(self.tr("⚠️ No supported files found in this folder."))
-            return
-        self.progressBar.setMaximum(len(files))
-
-        functions = {
-            'anilist': self.get_anime_title_anilist,
-            'mal': self.get_anime_title_mal,
-            'title_case': self.format_title_case,
-            'expand_season': self.expand_season_format,
-            'format_mal': self.format_for_mal_search
-        }
+        self.progressBar.setRange(0, 0)
+        self.processedCount = 0
 
         self.previewButton.setEnabled(False)
-        self.worker = RenameWorker(folder, self.title_preference, functions, previewMode=True)
+        self.worker = RenameWorker(
+            folder, self.title_preference, self.resolver, previewMode=True, scanOptions=self.scanOptions(),
+            **self.workerOptions()
+        )
         self.worker.logSignal.connect(self.previewDialog.appendText)
         self.worker.progressSignal.connect(self.updateProgress)
         self.worker.finishedSignal.connect(self.onPreviewFinished)
         self.worker.start()
+        self.cancelBtn.setEnabled(True)
+
+    def scanOptions(self):
+        max_depth = self.settings.value("scan_max_depth", 0, type=int)
+        return {
+            "recursive": self.recursiveCheck.isChecked(),
+            "max_depth": max_depth or None,
+            "include": [p.strip() for p in self.settings.value("scan_include", "").split(";") if p.strip()],
+            "exclude": [p.strip() for p in self.settings.value("scan_exclude", "").split(";") if p.strip()],
+            "symlinks": self.settings.value("scan_symlinks", "files"),
+        }
+
+    def workerOptions(self):
+        return {
+            "sinks": [self.eventLogFile] if self.eventLogFile else [],
+            "reportPath": self.settings.value("run_report_path", ""),
+            "profilePath": self.settings.value("profile_path", ""),
+            "probe": self.metadataProbe if self.settings.value("read_metadata", True, type=bool) else None,
+            "hashIndex": self.hashIndex if self.settings.value("check_duplicates", True, type=bool) else None,
+        }
+
+    def openEventLogFile(self, path):
+        if self.eventLogFile:
+            self.events.unsubscribe(self.eventLogFile)
+            self.eventLogFile.close()
+            self.eventLogFile = None
+        if not path:
+            return
+        try:
+            self.eventLogFile = self.events.subscribe(JsonlSink(path), DEBUG)
+        except OSError as e:
+            QtWidgets.QMessageBox.warning(self, self.tr("Error"), self.tr("Could not open event log file: ") + str(e))
+
+    def finishProgress(self):
+        self.progressBar.setRange(0, max(self.processedCount, 1))
+        self.progressBar.setValue(self.processedCount)
 
     def onPreviewFinished(self):
+        self.finishProgress()
         self.previewDialog.appendText(self.tr("Preview complete!"))
         self.previewButton.setEnabled(True)
+        self.cancelBtn.setEnabled(False)
+        self.previewPlan = (self.worker.folder, self.worker.title_preference, self.worker.plan)
+        self.previewDialog.setPlanReady(bool(self.worker.plan))
+
+    def applyPreviewPlan(self):
+        if not self.confirmIdle() or not self.confirmJournalFinished():
+            return
+        folder, title_preference, plan = self.previewPlan
+        self.previewDialog.setPlanReady(False)
+        self.logTextEdit.appendPlainText(self.tr("Applying previewed plan in folder: ") + folder)
+        self.progressBar.setRange(0, len(plan))
+        self.processedCount = 0
+
+        self.startBtn.setEnabled(False)
+        self.worker = RenameWorker(folder, title_preference, self.resolver, plan=plan, **self.workerOptions())
+        self.worker.logSignal.connect(self.appendLog)
+        self.worker.progressSignal.connect(self.updateProgress)
+        self.worker.finishedSignal.connect(self.onRenameFinished)
+        self.worker.start()
+        self.cancelBtn.setEnabled(True)
+
+    def setWatching(self, watching):
+        from folder_watcher import FolderWatcher, ProcessedIndex
+        from renamer_core import default_processed_path
+        if not watching:
+            self.watchTimer.stop()
+            if self.folderWatcher is not None:
+                self.folderWatcher.close()
+                self.folderWatcher = None
+            self.watchQueue = []
+            return
+        folder = self.folderDisplay.text().strip()
+        if not folder or not os.path.isdir(folder):
+            QtWidgets.QMessageBox.warning(self, self.tr("Error"), self.tr("Please select a valid folder."))
+            self.watchCheck.setChecked(False)
+            return
+        if self.processedIndex is None:
+            self.processedIndex = ProcessedIndex(default_processed_path())
+        scanOptions = self.scanOptions()
+        self.folderWatcher = FolderWatcher(
+            folder, scanOptions, self.processedIndex, source=QtChangeSource(folder, scanOptions, self)
+        )
+        self.logTextEdit.appendPlainText(self.tr("👀 Watching folder: ") + folder)
+        # Batches renamed while watching go into one journal, undone together
+        self.watchStarted = time.time()
+        self.watchTimer.start()
+
+    def pollWatchedFolder(self):
+        # Changes pile up in the change source meanwhile; files the run renames are recorded by then
+        from rename_journal import unfinished_journal
+        from renamer_core import default_journal_path
+        if self.worker is not None and self.worker.isRunning():
+            return
+        self.watchQueue += self.folderWatcher.poll(0)
+        if not self.watchQueue:
+            return
+        if unfinished_journal(default_journal_path()):
+            self.logTextEdit.appendPlainText(
+                self.tr("⚠️ The last run was interrupted. Resume or undo it under Settings → Last Run.")
+            )
+            self.watchCheck.setChecked(False)
+            return
+        files, self.watchQueue = self.watchQueue, []
+        lang_choice = self.languageCombo.currentText()
+        self.title_preference = "english" if lang_choice.lower() == "english" else "romaji"
+        self.progressBar.setRange(0, 0)
+        self.processedCount = 0
+        self.startBtn.setEnabled(False)
+        self.worker = RenameWorker(
+            self.folderWatcher.folder, self.title_preference, self.resolver, files=files,
+            processedIndex=self.processedIndex, journalSince=self.watchStarted, **self.workerOptions()
+        )
+        self.worker.logSignal.connect(self.appendLog)
+        self.worker.progressSignal.connect(self.updateProgress)
+        self.worker.finishedSignal.connect(self.onRenameFinished)
+        self.worker.start()
+        self.cancelBtn.setEnabled(True)
+
+    def confirmJournalFinished(self):
+        # A new run replaces the journal, which is all there is to resume or undo the last one with
+        from rename_journal import unfinished_journal
+        from renamer_core import default_journal_path
+        if not unfinished_journal(default_journal_path()):
+            return True
+        QtWidgets.QMessageBox.warning(
+            self, self.tr("Error"),
+            self.tr("The last run was interrupted. Resume or undo it under Settings → Last Run first.")
+        )
+        return False
+
+    def runJournal(self, action):
+        from rename_journal import unfinished_journal
+        from renamer_core import default_checkpoint_path, default_journal_path
+        from run_checkpoint import unfinished_checkpoint
+        if self.worker is not None and self.worker.isRunning():
+            QtWidgets.QMessageBox.warning(self, self.tr("Error"), self.tr("Wait for the current run to finish first."))
+            return
+        # Queued jobs are still adding their renames to the journal
+        if self.jobQueue is not None and self.jobQueue.isBusy():
+            QtWidgets.QMessageBox.warning(self, self.tr("Error"), self.tr("Wait for the queued jobs to finish first."))
+            return
+        if action == "resume":
+            if not unfinished_journal(default_journal_path()) and unfinished_checkpoint(default_checkpoint_path()) is None:
+                self.logTextEdit.appendPlainText(self.tr("Nothing to resume."))
+                return
+        elif not os.path.exists(default_journal_path()):
+            self.logTextEdit.appendPlainText(self.tr("Nothing to undo yet."))
+            return
+        self.progressBar.setRange(0, 0)
+        self.processedCount = 0
+        self.startBtn.setEnabled(False)
+        self.worker = RenameWorker("", None, self.resolver, journalAction=action, **self.workerOptions())
+        self.worker.logSignal.connect(self.appendLog)
+        self.worker.progressSignal.connect(self.updateProgress)
+        self.worker.finishedSignal.connect(self.onRenameFinished)
+        self.worker.start()
+        self.cancelBtn.setEnabled(True)
+
+    def cancelRun(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.cancelBtn.setEnabled(False)
+            self.logTextEdit.appendPlainText(self.tr("⏹️ Cancelling after the files under way..."))
+            self.worker.cancel()
+
+    def closeEvent(self, event):
+        # Stop cleanly, so the journal and checkpoint are left ready to resume
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        if self.jobQueue is not None:
+            self.jobQueue.cancelAll()
+        self.setWatching(False)
+        super().closeEvent(event)
+
+    def confirmIdle(self):
+        # Preview, Start and Apply share self.worker, so only one of them runs at a time
+        if self.worker is None or not self.worker.isRunning():
+            return True
+        QtWidgets.QMessageBox.warning(self, self.tr("Error"), self.tr("Wait for the current run to finish first."))
+        return False
+
+    def createJobWorker(self, folder):
+        lang_choice = self.languageCombo.currentText()
+        title_preference = "english" if lang_choice.lower() == "english" else "romaji"
+        options = self.workerOptions()
+        # cProfile can only profile one run at a time
+        options["profilePath"] = ""
+        return RenameWorker(
+            folder, title_preference, self.resolver, scanOptions=self.scanOptions(), checkpointed=False,
+            trackResolver=False, **options
+        )
+
+    def reportFirstPaint(self, windowStarted):
+        """Log the startup timings, from launch to the window's first paint, once it is on screen."""
+        self.startupTimes = (windowStarted, time.perf_counter())
+
+    def logStartupTimes(self, windowStarted, windowBuilt):
+        painted = time.perf_counter()
+        lines = [
+            self.tr("⏱️ Startup profile:"),
+            f"    imports: {(IMPORTS_FINISHED - STARTUP_STARTED) * 1000:.0f} ms",
+            f"    window built: {(windowBuilt - windowStarted) * 1000:.0f} ms",
+            f"    first paint: {(painted - STARTUP_STARTED) * 1000:.0f} ms after launch",
+        ]
+        self.logTextEdit.appendPlainText("\n".join(lines))
+        # No stderr in a windowed build
+        if sys.stderr is not None:
+            print("\n".join(lines), file=sys.stderr)
+
+    def showJobQueue(self):
+        if self.jobQueue is None:
+            self.jobQueue = JobQueueDialog(self.createJobWorker, self.settings, self)
+            self.jobQueue.logRequested.connect(self.appendJobLog)
+            self.jobQueue.summaryRequested.connect(self.appendLog)
+        self.jobQueue.show()
+        self.jobQueue.raise_()
+        return self.jobQueue
+
+    def appendJobLog(self, folder, lines):
+        prefix = f"[{os.path.basename(folder) or folder}] "
+        self.logTextEdit.appendPlainText("\n".join(prefix + line for line in lines.split("\n")))
+
+    def dragEnterEvent(self, event):
+        if droppedFolders(event.mimeData()):
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        self.showJobQueue().addFolders(droppedFolders(event.mimeData()))
+        event.acceptProposedAction()
+
+    def savePreviewPlan(self):
+        from renamer_core import save_plan
+        folder, title_preference, plan = self.previewPlan
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self.previewDialog, self.tr("Save Plan"), os.path.join(folder, "rename_plan.json"), self.tr("Plan files (*.json)")
+        )
+        if not path:
+            return
+        try:
+            save_plan(path, folder, plan, title_preference)
+            self.previewDialog.appendText(self.tr("💾 Plan saved to ") + path)
+        except OSError as e:
+            QtWidgets.QMessageBox.warning(self.previewDialog, self.tr("Error"), self.tr("Could not save plan: ") + str(e))
 
     def appendLog(self, message):
-        self.logTextEdit.append(message)
+        self.logTextEdit.appendPlainText(message)
 
     def updateProgress(self, value):
+        self.processedCount = value
         self.progressBar.setValue(value)
 
     def onRenameFinished(self):
-        self.logTextEdit.append(self.tr("Renaming complete!"))
+        self.finishProgress()
+        self.logTextEdit.appendPlainText(self.tr("Renaming complete!"))
         self.startBtn.setEnabled(True)
+        self.cancelBtn.setEnabled(False)
 
-    def get_anime_title_anilist(self, query):
-        url = "https://graphql.anilist.co"
-        query_graphql = self.tr('''
-        query ($search: String) {
-          Media(search: $search, type: ANIME) {
-            title {
-              romaji
-              english
-            }
-          }
-        }
-        ''')
-        variables = {"search": query}
+    def importTitleIndex(self):
+        from renamer_core import default_index_path, open_index
+        from title_index import build_index
+        if not self.confirmIdle():
+            return
+        if self.jobQueue is not None and self.jobQueue.isBusy():
+            QtWidgets.QMessageBox.warning(self, self.tr("Error"), self.tr("Wait for the queued jobs to finish first."))
+            return
+        dump_path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, self.tr("Import Title Dump"), "", self.tr("Title dumps (*.json *.csv)")
+        )
+        if not dump_path:
+            return
+        # The index file is replaced, so the open one has to be let go first
+        if self.resolver.index is not None:
+            self.resolver.index.close()
+            self.resolver.index = None
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
         try:
-            response = requests.post(url, json={"query": query_graphql, "variables": variables})
-            if response.status_code == 200:
-                data = response.json()
-                if "data" in data and "Media" in data["data"]:
-                    titles = data["data"]["Media"]["title"]
-                    return titles.get(self.title_preference) or titles.get("english") or titles.get("romaji")
-        except Exception as e:
-            self.logTextEdit.append(self.tr("⚠️ AniList request failed: ") + str(e))
-        return None
-
-    def get_anime_title_mal(self, query):
-        formatted_query = self.format_for_mal_search(query)
-        self.logTextEdit.append(self.tr("🔎 Searching MAL with: ") + formatted_query)
-        url = f"https://api.jikan.moe/v4/anime?q={formatted_query}&limit=1"
+            count = build_index(dump_path, default_index_path())
+        except (OSError, ValueError) as e:
+            QtWidgets.QMessageBox.warning(self, self.tr("Error"), self.tr("Could not import title dump: ") + str(e))
+            count = None
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
         try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                if "data" in data and len(data["data"]) > 0:
-                    return data["data"][0]["title"]
-        except Exception as e:
-            self.logTextEdit.append(self.tr("⚠️ MAL request failed: ") + str(e))
-        return None
-
-    def format_for_mal_search(self, title):
-        title = re.sub(r'S(\d+)Part(\d+)', r'Season \1 Part \2', title, flags=re.IGNORECASE)
-        title = re.sub(r'S(\d+)', r'Season \1', title, flags=re.IGNORECASE)
-        title = re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', title)
-        return title.strip()
-
-    def format_title_case(self, title):
-        lowercase_words = {"a", "an", "and", "as", "at", "but", "by", "for", "in", "nor",
-                           "of", "on", "or", "so", "the", "to", "up", "yet"}
-        words = title.split()
-        if not words:
-            return title
-        formatted_words = [words[0].capitalize()]
-        for word in words[1:]:
-            formatted_words.append(word.lower() if word.lower() in lowercase_words else word.capitalize())
-        return " ".join(formatted_words)
-
-    def expand_season_format(self, filename):
-        filename = re.sub(r'S(\d+)Part(\d+)', r'Season \1 Part \2', filename, flags=re.IGNORECASE)
-        filename = re.sub(r'S(\d+)\b', r'Season \1', filename, flags=re.IGNORECASE)
-        return filename
+            self.resolver.index = open_index()
+        except ValueError:
+            self.resolver.index = None
+        if count is not None:
+            self.logTextEdit.appendPlainText(self.tr("📚 Offline titles imported: ") + str(count))
+
+    def clearTitleCache(self):
+        self.resolver.cache.clear()
+        self.logTextEdit.appendPlainText(self.tr("🧹 Title cache cleared."))
 
     def loadSettings(self):
         font_size = self.settings.value("font_size", 18, type=int)
         self.appFont.setPointSize(font_size)
         self.setFont(self.appFont)
-        self.apiPriority = self.settings.value("api_priority", "Auto")
+        self.apiPriority = self.storedApiPriority()
         self.interface_language = self.settings.value("interface_language", "English")
         self.theme_mode = self.settings.value("theme_mode", "Dark")
 
+    def storedApiPriority(self):
+        # Older versions stored the combo text ("AniList", "MAL", "Auto")
+        priority = str(self.settings.value("api_priority", "auto")).lower()
+        return priority if priority in API_PRIORITIES else "auto"
+
     def openSettings(self):
         current = {
             "api_priority": self.apiPriority,
             "interface_language": self.interface_language,
-            "theme_mode": self.theme_mode
+            "theme_mode": self.theme_mode,
+            "scan_max_depth": self.settings.value("scan_max_depth", 0, type=int),
+            "scan_include": self.settings.value("scan_include", ""),
+            "scan_exclude": self.settings.value("scan_exclude", ""),
+            "scan_symlinks": self.settings.value("scan_symlinks", "files"),
+            "read_metadata": self.settings.value("read_metadata", True, type=bool),
+            "check_duplicates": self.settings.value("check_duplicates", True, type=bool),
+            "event_log_path": self.settings.value("event_log_path", ""),
+            "run_report_path": self.settings.value("run_report_path", ""),
+            "profile_path": self.settings.value("profile_path", "")
         }
         dlg = SettingsDialog(current, self)
+        dlg.clearCacheRequested.connect(self.clearTitleCache)
+        dlg.importIndexRequested.connect(self.importTitleIndex)
+        dlg.resumeRunRequested.connect(lambda: self.runJournal("resume"))
+        dlg.undoRunRequested.connect(lambda: self.runJournal("undo"))
         if dlg.exec_() == QtWidgets.QDialog.Accepted:
             new_settings = dlg.getSettings()
             self.settings.setValue("api_priority", new_settings["api_priority"])
             self.settings.setValue("theme_mode", new_settings.get("theme_mode", "Dark"))
+            for key in ("scan_max_depth", "scan_include", "scan_exclude", "scan_symlinks", "read_metadata", "check_duplicates",
+                        "run_report_path", "profile_path"):
+                self.settings.setValue(key, new_settings[key])
+            if new_settings["event_log_path"] != self.settings.value("event_log_path", ""):
+                self.settings.setValue("event_log_path", new_settings["event_log_path"])
+                self.openEventLogFile(new_settings["event_log_path"])
             self.apiPriority = new_settings["api_priority"]
+            if self._resolver is not None:
+                self._resolver.priority = self.apiPriority
             self.theme_mode = new_settings["theme_mode"]
-            if self.theme_mode == "Dark":
-                self.darkMode = True
-                self.applyDarkStyle()
-            else:
-                self.darkMode = False
-                self.applyLightStyle()
+            darkMode = self.theme_mode == "Dark"
+            if darkMode != self.darkMode:
+                self.darkMode = darkMode
+                self.applyTheme()
 
 if __name__ == "__main__":
     if sys.platform == "win32":
         import ctypes
         ctypes.windll.kernel32.FreeConsole()
-    app = QtWidgets.QApplication(sys.argv)
+    startupProfile = "--startup-profile" in sys.argv
+    app = QtWidgets.QApplication([arg for arg in sys.argv if arg != "--startup-profile"])
+    windowStarted = time.perf_counter()
     window = AnimeRenamerWindow()
+    if startupProfile:
+        window.reportFirstPaint(windowStarted)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
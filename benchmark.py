@@ -0,0 +1,312 @@
+"""Benchmark the rename pipeline against a local stand-in for the AniList and Jikan APIs.
+
+Generates a synthetic folder, serves fake API answers with configurable latency, 429s and
+failures, runs the same planning/renaming code the app uses and reports throughput,
+request counts and per-file latency percentiles.
+
+Usage: python benchmark.py --files 2000 --collisions 0.85 --latency-ms 80 --rate-429 0.02
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from event_log import EventLog
+from rate_limit import ANILIST_LIMIT, JIKAN_LIMIT, RateLimit, TokenBucket
+from rename_journal import execute_plan
+from renamer_core import iter_rename_plan
+from title_cache import TitleCache, normalize_query
+from title_resolver import TitleResolver
+
+# Filename layouts seen in real OP/ED dumps; {title}, {n}, {s} and {p} are filled in
+NAMING_STYLES = {
+    "op": "{title} OP{n}",
+    "ed": "{title} ED{n}",
+    "opening": "{title} - Opening {n}",
+    "ending": "{title} Ending {n}",
+    "season": "{title} S{s} OP{n}",
+    "season-part": "{title} S{s}Part{p} ED{n}",
+    "dash": "{title}-OP{n}",
+}
+
+EXTENSIONS = (".webm", ".mp4", ".mkv")
+
+# "Show S2" or "Show Season 2" is answered with the show's entry for that season
+SEASON_SUFFIX = re.compile(r"\s+(?:Season\s*\d+|S\d+).*$", re.IGNORECASE)
+
+
+class MockCatalog:
+    """Titles known to the fake APIs; some only to Jikan so the MAL fallback gets exercised."""
+
+    def __init__(self, titles, mal_only_share, rng):
+        self.anilist = {}
+        self.mal = {}
+        for i, title in enumerate(titles):
+            english = f"{title} (English {i})"
+            romaji = f"{title} Romaji"
+            if rng.random() < mal_only_share:
+                # AniList only knows the show under the name MAL returns
+                self.mal[normalize_query(title)] = {"title": romaji, "title_english": english}
+                self.anilist[normalize_query(romaji)] = {"english": english, "romaji": romaji}
+            else:
+                self.anilist[normalize_query(title)] = {"english": english, "romaji": romaji}
+
+    @staticmethod
+    def find(entries, search):
+        season = SEASON_SUFFIX.search(search)
+        entry = entries.get(normalize_query(SEASON_SUFFIX.sub("", search)))
+        if entry is None or not season:
+            return entry
+        return {key: value + season.group(0) for key, value in entry.items()}
+
+    def anilist_title(self, search):
+        return self.find(self.anilist, search)
+
+    def mal_title(self, query):
+        return self.find(self.mal, query)
+
+
+class MockApiServer(ThreadingHTTPServer):
+    """Local stand-in for graphql.anilist.co and api.jikan.moe/v4/anime."""
+
+    daemon_threads = True
+
+    def __init__(self, catalog, latency=0.0, rate_429=0.0, failure_rate=0.0, retry_after=0.1, seed=0):
+        super().__init__(("127.0.0.1", 0), MockApiHandler)
+        self.catalog = catalog
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.failure_rate = failure_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {"anilist": 0, "jikan": 0, "429": 0, "failures": 0, "bytes": 0}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] += amount
+
+    def roll(self):
+        with self.lock:
+            return self.rng.random()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.server.count("bytes", len(body))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def misbehave(self):
+        """Answer with a 429 or a 500 as configured; returns True when it did."""
+        time.sleep(self.server.latency)
+        roll = self.server.roll()
+        if roll < self.server.rate_429:
+            self.server.count("429")
+            self.send_json(429, {"errors": [{"message": "Too Many Requests.", "status": 429}]},
+                           {"Retry-After": str(self.server.retry_after)})
+            return True
+        if roll < self.server.rate_429 + self.server.failure_rate:
+            self.server.count("failures")
+            self.send_json(500, {"errors": [{"message": "Internal Server Error", "status": 500}]})
+            return True
+        return False
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.server.count("anilist")
+        if self.misbehave():
+            return
+        data = {}
+        for name, search in (body.get("variables") or {}).items():
+            if name == "perPage":
+                continue
+            # The single query uses $search, batches alias $sN as aN
+            alias = "Page" if name == "search" else "a" + name[1:]
+            titles = self.server.catalog.anilist_title(search)
+            data[alias] = {"media": [{"title": titles, "synonyms": []}] if titles else []}
+        self.send_json(200, {"data": data})
+
+    def do_GET(self):
+        self.server.count("jikan")
+        if self.misbehave():
+            return
+        query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        entry = self.server.catalog.mal_title(query)
+        self.send_json(200, {"data": [entry] if entry else []})
+
+
+def generate_folder(folder, file_count, collisions, styles, rng):
+    """Create empty files; `collisions` is the share of files reusing an earlier title."""
+    distinct = max(1, round(file_count * (1 - collisions)))
+    titles = [f"Show {rng.choice('ABCDEFGH')}{i:05d}" for i in range(distinct)]
+    for i in range(file_count):
+        title = titles[i] if i < distinct else rng.choice(titles)
+        style = NAMING_STYLES[rng.choice(styles)]
+        name = style.format(title=title, n=rng.randint(1, 9), s=rng.randint(1, 4), p=rng.randint(1, 2))
+        path = os.path.join(folder, f"{name} [{i}]{rng.choice(EXTENSIONS)}")
+        open(path, "w").close()
+    return titles
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def run_pipeline(folder, resolver, dry_run, journal_path):
+    """Plan (and rename) the folder; returns (elapsed seconds, per-file latencies, renamed count).
+
+    Renames go through execute_plan with a journal at `journal_path`, as the CLI and GUI do, so a
+    file's latency runs from when it is listed until it is under its new name.
+    """
+    entered = {}
+    finished = {}
+
+    def timed_files():
+        for name in sorted(os.listdir(folder)):
+            entered[name] = time.perf_counter()
+            yield name
+
+    # No sinks: records are dropped before they are even built
+    quiet = EventLog()
+    plan = []
+    start = time.perf_counter()
+    for entry in iter_rename_plan(folder, "english", resolver, log=quiet, files=timed_files()):
+        finished[entry["source"]] = time.perf_counter()
+        if entry["target"]:
+            plan.append(entry)
+    if dry_run:
+        renamed = len(plan)
+    else:
+        execute_plan(folder, plan, journal_path, quiet,
+                     renamed=lambda entry: finished.__setitem__(entry["source"], time.perf_counter()))
+        renamed = sum(1 for entry in plan if entry["status"] == "renamed")
+        # Files held back or failed are done once the whole batch is
+        done = time.perf_counter()
+        for entry in plan:
+            if entry["status"] != "renamed":
+                finished[entry["source"]] = done
+    latencies = sorted(finished[source] - entered[source] for source in finished)
+    return time.perf_counter() - start, latencies, renamed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the renamer against a local mock API server.")
+    parser.add_argument("--files", type=int, default=2000, help="number of synthetic files")
+    parser.add_argument("--collisions", type=float, default=0.85, help="share of files reusing an earlier title")
+    parser.add_argument("--styles", default=",".join(NAMING_STYLES),
+                        help="comma-separated naming styles: " + ", ".join(NAMING_STYLES))
+    parser.add_argument("--mal-only", type=float, default=0.1, help="share of titles only Jikan can resolve")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mock API latency per request")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--real-limits", action="store_true",
+                        help="apply the real AniList/Jikan quotas instead of unlimited ones")
+    parser.add_argument("--warm", action="store_true", help="also time a second run against the warm cache")
+    parser.add_argument("--dry-run", action="store_true", help="plan only, do not rename the files")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    styles = [s.strip() for s in args.styles.split(",") if s.strip()]
+    unknown = [s for s in styles if s not in NAMING_STYLES]
+    if unknown or not styles:
+        parser.error("unknown naming styles: " + ", ".join(unknown))
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="renamer_bench_")
+    folder = os.path.join(workdir, "files")
+    os.makedirs(folder)
+    try:
+        titles = generate_folder(folder, args.files, args.collisions, styles, rng)
+        catalog = MockCatalog(titles, args.mal_only, rng)
+        server = MockApiServer(catalog, args.latency_ms / 1000.0, args.rate_429, args.failure_rate,
+                               args.retry_after, args.seed).start()
+        if args.real_limits:
+            limits = {"anilist_limit": ANILIST_LIMIT, "jikan_limit": JIKAN_LIMIT}
+        else:
+            unlimited = RateLimit(TokenBucket(1e9, 1, burst=1e9))
+            limits = {"anilist_limit": unlimited, "jikan_limit": unlimited}
+        cache = TitleCache(os.path.join(workdir, "titles.sqlite3"))
+        resolver = TitleResolver(cache, log=EventLog(), retries=5,
+                                 anilist_url=server.base_url + "/graphql",
+                                 jikan_url=server.base_url + "/v4/anime", **limits)
+
+        report = {"files": args.files, "distinct_titles": len(titles), "runs": []}
+        for label in (["cold", "warm"] if args.warm else ["cold"]):
+            if label == "warm" and not args.dry_run:
+                # Put the original names back so the warm run has the same work to do
+                shutil.rmtree(folder)
+                os.makedirs(folder)
+                generate_folder(folder, args.files, args.collisions, styles, random.Random(args.seed))
+            before = dict(server.counters)
+            elapsed, latencies, renamed = run_pipeline(folder, resolver, args.dry_run,
+                                                       os.path.join(workdir, "journal.jsonl"))
+            counters = {key: server.counters[key] - before[key] for key in server.counters}
+            report["runs"].append({
+                "run": label,
+                "seconds": round(elapsed, 3),
+                "files_per_second": round(args.files / elapsed, 1) if elapsed else None,
+                "renamed": renamed,
+                "requests": {"anilist": counters["anilist"], "jikan": counters["jikan"]},
+                "responses_429": counters["429"],
+                "responses_failed": counters["failures"],
+                "bytes_received": counters["bytes"],
+                "latency_ms": {
+                    "p50": round(percentile(latencies, 0.50) * 1000, 2),
+                    "p99": round(percentile(latencies, 0.99) * 1000, 2),
+                },
+            })
+        resolver.close()
+        cache.close()
+        server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return 0
+    print(f"Files: {report['files']} ({report['distinct_titles']} distinct titles)")
+    for run in report["runs"]:
+        print(f"[{run['run']}] {run['seconds']} s, {run['files_per_second']} files/s, {run['renamed']} renamed")
+        print(f"    requests: AniList {run['requests']['anilist']}, Jikan {run['requests']['jikan']}"
+              f" (429: {run['responses_429']}, failed: {run['responses_failed']}, {run['bytes_received']} bytes)")
+        print(f"    per-file latency: p50 {run['latency_ms']['p50']} ms, p99 {run['latency_ms']['p99']} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Find files that are byte-for-byte copies of one another, reading as little of them as possible.
+
+Only files of the same size can be copies. Those are told apart by a hash of their first and last
+HASH_CHUNK_BYTES, and a full hash only confirms files that still look alike. Hashes are kept in a
+HashIndex by device, inode, size and modification time, so a folder seen before costs no reads.
+"""
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+
+# Bytes hashed from each end of a file before the whole of it is
+HASH_CHUNK_BYTES = 64 * 1024
+
+# Bytes hashed per step of a full hash
+FULL_HASH_STEP = 1024 * 1024
+
+# Files hashed in parallel
+MAX_HASH_WORKERS = 4
+
+# Files remembered per index; the ones hashed longest ago are dropped first
+DEFAULT_MAX_HASHED = 200000
+
+
+def hash_bytes(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def partial_hash(path):
+    """Hash of the first and last HASH_CHUNK_BYTES; of the whole file when it is no longer than that."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) <= 2 * HASH_CHUNK_BYTES:
+            return hash_bytes(data)
+        return hash_bytes(data[:HASH_CHUNK_BYTES] + data[-HASH_CHUNK_BYTES:])
+
+
+def full_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        view = memoryview(data)
+        try:
+            for start in range(0, len(data), FULL_HASH_STEP):
+                digest.update(view[start:start + FULL_HASH_STEP])
+        finally:
+            view.release()
+    return digest.hexdigest()
+
+
+class HashIndex:
+    """Hashes of files, filed under device and inode and kept while size and modification time match."""
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_HASHED):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                " device INTEGER NOT NULL,"
+                " inode INTEGER NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " partial TEXT NOT NULL,"
+                " full TEXT,"
+                " hashed REAL NOT NULL,"
+                " PRIMARY KEY (device, inode))"
+            )
+
+    def get(self, key):
+        """(partial hash, full hash or None) for key (device, inode, size, mtime_ns), or None if unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, partial, full FROM hashes WHERE device = ? AND inode = ?", key[:2]
+            ).fetchone()
+        if row is None or row[:2] != key[2:]:
+            return None
+        return row[2], row[3]
+
+    def put_many(self, rows):
+        """Store (key, partial hash, full hash or None) rows."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [key + (partial, full, now) for key, partial, full in rows],
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM hashes WHERE rowid IN (SELECT rowid FROM hashes ORDER BY hashed LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM hashes")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DuplicateFinder:
+    """Remembers the files of one run by size and content, and tells which new ones are copies.
+
+    Files are given a batch at a time as (path, key) pairs, key being (device, inode, size,
+    mtime_ns) of the file under `folder`; the first file seen with some content is its original.
+    """
+
+    def __init__(self, folder, index=None):
+        self.folder = folder
+        self.index = index
+        # Sizes seen so far; the one file of a size not yet read, by size; (path, key) of the
+        # originals by (size, partial hash), since files alike at both ends may still differ
+        self.sizes = set()
+        self.unread = {}
+        self.originals = {}
+        # Hashes of the files read so far, by path
+        self.hashes = {}
+        # Hashed since the last save, path -> key
+        self.updated = {}
+
+    def hash_all(self, items, pool, full):
+        """Fill in the partial (or full) hash of every (path, key) pair that lacks it."""
+        missing = []
+        for path, key in items:
+            known = self.hashes.get(path)
+            if known is None and self.index is not None:
+                known = self.index.get(key)
+                if known is not None:
+                    self.hashes[path] = known
+            if known is None or (full and known[1] is None):
+                missing.append((path, key))
+        hash_file = full_hash if full else partial_hash
+
+        def hash_one(item):
+            try:
+                return hash_file(os.path.join(self.folder, item[0]))
+            except (OSError, ValueError):
+                return None
+
+        for (path, key), digest in zip(missing, pool.map(hash_one, missing)):
+            if digest is None:
+                continue
+            partial, _ = self.hashes.get(path, (None, None))
+            self.hashes[path] = (partial, digest) if full else (digest, None)
+            self.updated[path] = key
+
+    def same_content(self, a, b):
+        """Whether two (path, key) items with the same size and partial hash are copies."""
+        if a[1][2] <= 2 * HASH_CHUNK_BYTES:
+            # The partial hash already covers the whole of a short file
+            return True
+        full_a = self.hashes.get(a[0], (None, None))[1]
+        return full_a is not None and full_a == self.hashes.get(b[0], (None, None))[1]
+
+    def find(self, items, pool):
+        """{path: path of its original} for the copies among `items`; the others become originals."""
+        # Empty files have no content to compare
+        items = [(path, key) for path, key in items if key[2] > 0]
+        batch_sizes = {}
+        for path, key in items:
+            batch_sizes[key[2]] = batch_sizes.get(key[2], 0) + 1
+        # Only sizes shared by two or more files are worth reading
+        shared = {size for size, count in batch_sizes.items() if count > 1 or size in self.sizes}
+        candidates = [(path, key) for path, key in items if key[2] in shared]
+        # An earlier file of a size seen once is read now, and stays the original
+        ordered = [original for size in shared for original in self.unread.pop(size, ())] + candidates
+        copies = {}
+        if ordered:
+            self.hash_all(ordered, pool, full=False)
+            alike = {}
+            for path, key in ordered:
+                partial = self.hashes.get(path, (None, None))[0]
+                if partial is not None and key[2] > 2 * HASH_CHUNK_BYTES:
+                    alike.setdefault((key[2], partial), []).append((path, key))
+            # Large files alike at both ends, in this batch or with an original from an earlier
+            # one, are read in full
+            confirm = []
+            for group_key, group in alike.items():
+                earlier = self.originals.get(group_key, [])
+                if earlier or len(group) > 1:
+                    confirm += earlier + group
+            self.hash_all(confirm, pool, full=True)
+            for item in ordered:
+                partial = self.hashes.get(item[0], (None, None))[0]
+                if partial is None:
+                    continue
+                originals = self.originals.setdefault((item[1][2], partial), [])
+                original = next((other for other in originals if self.same_content(other, item)), None)
+                if original is None:
+                    originals.append(item)
+                else:
+                    copies[item[0]] = original[0]
+
+        for path, key in items:
+            self.sizes.add(key[2])
+            if key[2] not in shared:
+                self.unread[key[2]] = [(path, key)]
+        self.save()
+        return copies
+
+    def save(self):
+        if self.index is not None and self.updated:
+            self.index.put_many([
+                (key,) + self.hashes[path] for path, key in self.updated.items()
+            ])
+        self.updated = {}
+
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from collections import namedtuple
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+
+# `file` correlates a record with one file (its path relative to the renamed folder);
+# lookups are shared by every file with the same title, so they carry the `title` instead
+LogRecord = namedtuple("LogRecord", "time level message file title thread")
+
+
+class EventLog:
+    """Leveled log channel that any thread can publish to; every record goes to every sink.
+
+    A sink is a callable taking a LogRecord. Sinks are called on the publishing thread, so
+    ones that touch a GUI must hand the record over to the GUI thread themselves. Calling
+    the log like a function logs at INFO, so it can stand in for a plain `log(message)`.
+    """
+
+    def __init__(self):
+        # Replaced as a whole on (un)subscribe, so publishing never needs the lock
+        self.sinks = ()
+        self._lock = threading.Lock()
+
+    def subscribe(self, sink, level=INFO):
+        with self._lock:
+            self.sinks += ((sink, level),)
+        return sink
+
+    def unsubscribe(self, sink):
+        with self._lock:
+            self.sinks = tuple(item for item in self.sinks if item[0] is not sink)
+
+    def publish(self, level, message, file=None, title=None):
+        sinks = self.sinks
+        if not any(level >= sink_level for _, sink_level in sinks):
+            return
+        record = LogRecord(time.time(), level, message, file, title, threading.current_thread().name)
+        for sink, sink_level in sinks:
+            if level >= sink_level:
+                sink(record)
+
+    def debug(self, message, file=None, title=None):
+        self.publish(DEBUG, message, file, title)
+
+    def info(self, message, file=None, title=None):
+        self.publish(INFO, message, file, title)
+
+    def warning(self, message, file=None, title=None):
+        self.publish(WARNING, message, file, title)
+
+    def error(self, message, file=None, title=None):
+        self.publish(ERROR, message, file, title)
+
+    __call__ = info
+
+
+def as_event_log(log):
+    """Return `log` itself if it is an EventLog, else one that passes messages on to the callable."""
+    if isinstance(log, EventLog):
+        return log
+    events = EventLog()
+    events.subscribe(lambda record: log(record.message), DEBUG)
+    return events
+
+
+def record_to_dict(record):
+    data = record._asdict()
+    data["level"] = LEVEL_NAMES.get(record.level, str(record.level))
+    return data
+
+
+class StreamSink:
+    """Writes each record's message as one line, e.g. to sys.stderr."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        with self._lock:
+            print(record.message, file=self.stream)
+
+
+class JsonlSink:
+    """Appends every record as one JSON object per line."""
+
+    def __init__(self, path):
+        # Line buffered, so records written before a crash are on disk
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record_to_dict(record), ensure_ascii=False)
+        with self._lock:
+            if not self.file.closed:
+                self.file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self.file.close()
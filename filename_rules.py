@@ -0,0 +1,73 @@
+import re
+
+# Ordered rule tables: (merge group, pattern, replacement template, flags).
+# Adjacent rules in the same merge group never compete for the same text, so they are
+# compiled into one alternation and applied in a single pass; group None never merges.
+
+# Cleans up a filename after the anime title has been swapped in
+FILENAME_RULES = [
+    (None, r'[\/:*?"<>|]', '', 0),
+    ("markers", r'\bOP(\d+)\b', r'Opening \1', re.IGNORECASE),
+    ("markers", r'\bED(\d+)\b', r'Ending \1', re.IGNORECASE),
+    ("markers", r'S(\d+)Part(\d+)', r'Season \1 Part \2', re.IGNORECASE),
+    ("markers", r'S(\d+)\b', r'Season \1', re.IGNORECASE),
+    (None, r'(\w)(Opening|Ending)', r'\1 - \2', 0),
+    (None, r'(\S)-(\S)', r'\1 - \2', 0),
+    (None, r'(Opening \d+|Ending \d+).*', r'\1', re.IGNORECASE),
+]
+
+# Turns a parsed title into something Jikan's search understands
+MAL_SEARCH_RULES = [
+    ("season", r'S(\d+)Part(\d+)', r'Season \1 Part \2', re.IGNORECASE),
+    ("season", r'S(\d+)', r'Season \1', re.IGNORECASE),
+    (None, r'(?<=[a-z])(?=[A-Z])', ' ', 0),
+]
+
+GROUP_REFERENCE = re.compile(r'\\(\d+)|\\g<(\d+)>')
+
+
+class FilenameNormalizer:
+    """Compiles a rule table once; normalize() then runs one regex pass per merged step."""
+
+    def __init__(self, rules=FILENAME_RULES):
+        self.steps = []
+        pending = []
+        for rule in rules:
+            if pending and (rule[0] is None or rule[0] != pending[-1][0]):
+                self.steps.append(self.compile_step(pending))
+                pending = []
+            pending.append(rule)
+        if pending:
+            self.steps.append(self.compile_step(pending))
+
+    @staticmethod
+    def compile_step(rules):
+        if len(rules) == 1:
+            _, pattern, replacement, flags = rules[0]
+            return re.compile(pattern, flags), replacement
+
+        flags = rules[0][3]
+        if any(rule[3] != flags for rule in rules):
+            raise ValueError(f"Rules merged as '{rules[0][0]}' must share the same flags")
+        alternatives = []
+        templates = {}
+        group_index = 0
+        for _, pattern, replacement, _ in rules:
+            outer = group_index + 1
+            # Renumber the rule's own group references to their place in the combined pattern
+            templates[outer] = GROUP_REFERENCE.sub(
+                lambda m, outer=outer: f"\\g<{outer + int(m.group(1) or m.group(2))}>", replacement
+            )
+            alternatives.append(f"({pattern})")
+            group_index = outer + re.compile(pattern).groups
+        combined = re.compile("|".join(alternatives), flags)
+        # The enclosing group of the matching alternative is always the last one to close
+        return combined, lambda m: m.expand(templates[m.lastindex])
+
+    def normalize(self, text):
+        for regex, replacement in self.steps:
+            text = regex.sub(replacement, text)
+        return text
+
+
+MAL_SEARCH_NORMALIZER = FilenameNormalizer(MAL_SEARCH_RULES)
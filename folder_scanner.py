@@ -0,0 +1,120 @@
+import fnmatch
+import os
+
+# Allowed file extensions
+ALLOWED_EXTENSIONS = (".webm", ".mp4", ".mkv", ".avi")
+
+# skip: ignore every symlink, files: keep symlinked files but never descend
+# into symlinked folders, follow: treat symlinks like the real thing
+SYMLINK_POLICIES = ("skip", "files", "follow")
+
+
+def matches_any(relative_path, name, patterns):
+    relative_path = relative_path.replace(os.sep, "/")
+    return any(fnmatch.fnmatch(relative_path, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def folder_depth(relative_dir):
+    return len(os.path.normpath(relative_dir).split(os.sep)) if relative_dir else 0
+
+
+def scan_folder(folder, recursive=False, max_depth=None, include=(), exclude=(), symlinks="files",
+                extensions=ALLOWED_EXTENSIONS, start=""):
+    """Yield supported files below `folder` as paths relative to it, one directory at a time.
+
+    `start` (relative to `folder`) limits the walk to that subfolder; depth still counts from `folder`.
+
+    Only the names of the directory being read and the pending subfolders are held in memory,
+    so callers can start working on the first files while the walk is still going. Each
+    directory is read completely before its files are yielded, which keeps files renamed by
+    the caller from showing up a second time. Unreadable subfolders are skipped; an
+    unreadable `folder` raises OSError.
+    """
+    if symlinks not in SYMLINK_POLICIES:
+        raise ValueError(f"Unknown symlink policy: {symlinks}")
+    if not recursive:
+        max_depth = 0
+    follow = symlinks == "follow"
+    visited = set()
+    if follow:
+        root_stat = os.stat(folder)
+        visited.add((root_stat.st_dev, root_stat.st_ino))
+
+    stack = [(start, folder_depth(start))]
+    while stack:
+        relative_dir, depth = stack.pop()
+        files = []
+        subfolders = []
+        try:
+            with os.scandir(os.path.join(folder, relative_dir)) as entries:
+                for entry in entries:
+                    relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                    if exclude and matches_any(relative_path, entry.name, exclude):
+                        continue
+                    try:
+                        if entry.is_symlink() and symlinks == "skip":
+                            continue
+                        if entry.is_dir(follow_symlinks=follow):
+                            if max_depth is not None and depth >= max_depth:
+                                continue
+                            if follow:
+                                # Symlinked folders can point back up the tree
+                                entry_stat = entry.stat()
+                                key = (entry_stat.st_dev, entry_stat.st_ino)
+                                if key in visited:
+                                    continue
+                                visited.add(key)
+                            subfolders.append(relative_path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    if not entry.name.lower().endswith(extensions):
+                        continue
+                    if include and not matches_any(relative_path, entry.name, include):
+                        continue
+                    files.append(relative_path)
+        except OSError:
+            if relative_dir == start:
+                raise
+            continue
+        yield from files
+        # Reversed so subfolders are visited in the order they were listed
+        stack.extend((subfolder, depth + 1) for subfolder in reversed(subfolders))
+
+
+def scan_subfolders(folder, recursive=False, max_depth=None, exclude=(), symlinks="files", start=""):
+    """Yield `start` and every subfolder scan_folder would walk into, relative to `folder`."""
+    if not recursive:
+        max_depth = 0
+    follow = symlinks == "follow"
+    visited = set()
+    stack = [(start, folder_depth(start))]
+    while stack:
+        relative_dir, depth = stack.pop()
+        yield relative_dir
+        if max_depth is not None and depth >= max_depth:
+            continue
+        subfolders = []
+        try:
+            with os.scandir(os.path.join(folder, relative_dir)) as entries:
+                for entry in entries:
+                    relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                    if exclude and matches_any(relative_path, entry.name, exclude):
+                        continue
+                    try:
+                        if entry.is_symlink() and not follow:
+                            continue
+                        if entry.is_dir():
+                            if follow:
+                                entry_stat = entry.stat()
+                                if (entry_stat.st_dev, entry_stat.st_ino) in visited:
+                                    continue
+                                visited.add((entry_stat.st_dev, entry_stat.st_ino))
+                            subfolders.append(relative_path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        stack.extend((subfolder, depth + 1) for subfolder in reversed(subfolders))
@@ -0,0 +1,299 @@
+"""Watch a folder and hand over new files once they are completely written.
+
+Changes come from inotify on Linux and from polling folder modification times elsewhere; the
+GUI plugs in its own QFileSystemWatcher. Files already handled are kept in a ProcessedIndex,
+so an idle watch costs neither lookups nor parsing.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import sqlite3
+import struct
+import sys
+import threading
+import time
+
+from folder_scanner import folder_depth, scan_folder, scan_subfolders
+
+# A file is taken once its size and modification time have not changed for this long
+DEFAULT_SETTLE_SECONDS = 3.0
+
+# How often PollingSource looks at folder modification times
+POLL_INTERVAL_SECONDS = 2.0
+
+# Processed files remembered per index; the ones not seen for longest are dropped first
+DEFAULT_MAX_PROCESSED = 100000
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+# Writes to a file are left to FolderWatcher's settle check, so a download in progress does not
+# relist its folder on every write
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class ProcessedIndex:
+    """Files a watch has already handled, with the size and modification time they had then."""
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_PROCESSED):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS processed ("
+                " folder TEXT NOT NULL,"
+                " path TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " last_seen REAL NOT NULL,"
+                " PRIMARY KEY (folder, path))"
+            )
+
+    def is_processed(self, folder, path, size, mtime_ns):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns FROM processed WHERE folder = ? AND path = ?", (os.path.abspath(folder), path)
+            ).fetchone()
+        return row == (size, mtime_ns)
+
+    def record(self, folder, entries):
+        """Remember the files of finished plan entries: renamed ones under their new name, files left alone as they are.
+
+        Failed and held-back renames are not recorded, so the next watch looks at them again.
+        """
+        folder = os.path.abspath(folder)
+        now = time.time()
+        rows = []
+        for entry in entries:
+            if entry["status"] == "renamed":
+                path = entry["target"]
+            elif entry["status"] in ("skipped", "planned") and not entry["target"]:
+                path = entry["source"]
+            else:
+                continue
+            try:
+                file_stat = os.stat(os.path.join(folder, path))
+            except OSError:
+                continue
+            rows.append((folder, path, file_stat.st_size, file_stat.st_mtime_ns, now))
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?)", rows)
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM processed").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM processed WHERE rowid IN (SELECT rowid FROM processed ORDER BY last_seen LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM processed")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def folder_options(scan_options):
+    """The scan options that decide which folders are walked."""
+    return {key: value for key, value in scan_options.items() if key not in ("include", "extensions")}
+
+
+class PollingSource:
+    """Reports folders whose modification time changed, i.e. that gained, lost or renamed entries."""
+
+    def __init__(self, folder, scan_options=None, interval=POLL_INTERVAL_SECONDS):
+        self.folder = folder
+        self.scan_options = scan_options or {}
+        self.interval = interval
+        self.mtimes = {}
+        self.last_poll = 0.0
+
+    def wait(self, timeout):
+        """Return the folders (relative to the watched one) changed since the last call, waiting up to `timeout`."""
+        delay = self.last_poll + self.interval - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        if delay > 0:
+            time.sleep(delay)
+        self.last_poll = time.monotonic()
+        changed = set()
+        mtimes = {}
+        for relative_dir in scan_subfolders(self.folder, **folder_options(self.scan_options)):
+            try:
+                mtime = os.stat(os.path.join(self.folder, relative_dir)).st_mtime_ns
+            except OSError:
+                continue
+            mtimes[relative_dir] = mtime
+            if self.mtimes.get(relative_dir) != mtime:
+                changed.add(relative_dir)
+        self.mtimes = mtimes
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifySource:
+    """Linux inotify watches on the folder and its subfolders; waits without any polling."""
+
+    def __init__(self, folder, scan_options=None):
+        self.folder = folder
+        self.scan_options = scan_options or {}
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        # Everything counts as changed once, so files already there are looked at too
+        self.pending = self.add_watches("")
+
+    def add_watches(self, start):
+        """Watch `start` and the subfolders below it that a scan would walk; returns them."""
+        added = set()
+        for relative_dir in scan_subfolders(self.folder, start=start, **folder_options(self.scan_options)):
+            path = os.path.join(self.folder, relative_dir)
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = relative_dir
+                added.add(relative_dir)
+        return added
+
+    def wait(self, timeout):
+        changed, self.pending = self.pending, set()
+        if changed:
+            return changed
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+            name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + name_length].rstrip(b"\0")
+            offset += INOTIFY_EVENT.size + name_length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; look at every folder again
+                changed.update(self.watches.values())
+                continue
+            relative_dir = self.watches.get(wd)
+            if relative_dir is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                continue
+            changed.add(relative_dir)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                subfolder = os.path.join(relative_dir, os.fsdecode(name)) if relative_dir else os.fsdecode(name)
+                changed.update(self.add_watches(subfolder))
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_change_source(folder, scan_options=None):
+    """InotifySource where inotify is available, PollingSource everywhere else."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifySource(folder, scan_options)
+        except (OSError, AttributeError):
+            pass
+    return PollingSource(folder, scan_options)
+
+
+class FolderWatcher:
+    """Turns folder changes from a change source into batches of new, completely written files.
+
+    A source has wait(timeout), returning the set of changed folders relative to `folder`, and
+    close(). A file is ready once it is not in `processed` and its size and modification time
+    have stayed the same for `settle_seconds`, which also catches downloads still being written.
+    """
+
+    def __init__(self, folder, scan_options=None, processed=None, source=None, settle_seconds=DEFAULT_SETTLE_SECONDS):
+        self.folder = folder
+        self.scan_options = dict(scan_options or {})
+        self.processed = processed
+        self.source = source or create_change_source(folder, scan_options)
+        self.settle_seconds = settle_seconds
+        # path -> (size, mtime_ns, when it was last seen changing)
+        self.pending = {}
+        # Per folder, the files already processed or handed out. They are not looked at again
+        # while the watch runs, so a busy folder costs one listing per change and no stat calls.
+        self.settled = {}
+
+    def files_in(self, relative_dir):
+        # Only the folder itself; its subfolders report their own changes
+        options = dict(self.scan_options, recursive=True, max_depth=folder_depth(relative_dir))
+        try:
+            return list(scan_folder(self.folder, start=relative_dir, **options))
+        except OSError:
+            return []
+
+    def poll(self, timeout):
+        """Wait up to `timeout` seconds for changes; returns the paths of files that are ready."""
+        if self.pending:
+            timeout = min(timeout, self.settle_seconds)
+        now = time.monotonic()
+        for relative_dir in self.source.wait(timeout):
+            files = set(self.files_in(relative_dir))
+            settled = self.settled.setdefault(relative_dir, set())
+            # Forget files that were deleted or renamed away
+            settled &= files
+            for path in files - settled:
+                if path not in self.pending:
+                    # Seen changing now; settles from here
+                    self.pending[path] = (None, None, now)
+        return self.ready()
+
+    def settle(self, path):
+        self.settled.setdefault(os.path.dirname(path), set()).add(path)
+
+    def ready(self):
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime_ns, since) in list(self.pending.items()):
+            try:
+                file_stat = os.stat(os.path.join(self.folder, path))
+            except OSError:
+                del self.pending[path]
+                continue
+            if (file_stat.st_size, file_stat.st_mtime_ns) != (size, mtime_ns):
+                if self.processed is not None and self.processed.is_processed(
+                        self.folder, path, file_stat.st_size, file_stat.st_mtime_ns):
+                    del self.pending[path]
+                    self.settle(path)
+                else:
+                    self.pending[path] = (file_stat.st_size, file_stat.st_mtime_ns, now)
+            elif now - since >= self.settle_seconds:
+                del self.pending[path]
+                self.settle(path)
+                # Recorded while it was settling, e.g. renamed to this name by the run in progress
+                if self.processed is None or not self.processed.is_processed(
+                        self.folder, path, file_stat.st_size, file_stat.st_mtime_ns):
+                    ready.append(path)
+        return sorted(ready)
+
+    def close(self):
+        self.source.close()
@@ -0,0 +1,300 @@
+"""Read the title a video's container metadata carries, for files whose names say nothing useful.
+
+Only headers are read, a few small reads per file with no ffprobe: the Segment Info Title of
+Matroska and WebM, the ©nam tag of MP4 and the INFO INAM chunk of AVI. Answers are cached by
+path, size and modification time, so a folder is probed once.
+"""
+import os
+import sqlite3
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Files probed in parallel; each is a handful of small reads
+MAX_PROBE_WORKERS = 8
+
+# Largest metadata element read in one piece; bigger ones are not metadata worth reading
+MAX_ELEMENT_BYTES = 64 * 1024
+
+# Elements or boxes stepped over per level before giving up
+MAX_ELEMENTS = 64
+
+# Probed files remembered per cache; the ones probed longest ago are dropped first
+DEFAULT_MAX_PROBED = 200000
+
+# Matroska/WebM element IDs
+EBML_HEADER = 0x1A45DFA3
+EBML_SEGMENT = 0x18538067
+EBML_INFO = 0x1549A966
+EBML_TITLE = 0x7BA9
+EBML_CLUSTER = 0x1F43B675
+
+# Returned by MetadataCache.get when the file has not been probed as it is now
+MISS = object()
+
+
+class Reader:
+    """Reads at offsets of a file, or of bytes already read."""
+
+    def __init__(self, f=None, data=None):
+        self.f = f
+        self.data = data
+        self.size = len(data) if f is None else os.fstat(f.fileno()).st_size
+
+    def read(self, offset, length):
+        if self.f is None:
+            return self.data[offset:offset + length]
+        self.f.seek(offset)
+        return self.f.read(length)
+
+
+def decode_text(data):
+    data = data.split(b"\0", 1)[0]
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        text = data.decode("latin-1")
+    return " ".join(text.split()) or None
+
+
+def read_vint(data, pos, keep_marker=False):
+    """Decode the EBML variable-length integer at `pos`; returns (value, length, all ones)."""
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while not first & mask:
+        mask >>= 1
+        length += 1
+        if length > 8:
+            raise ValueError("Invalid EBML integer")
+    if pos + length > len(data):
+        raise ValueError("Truncated EBML integer")
+    value = first if keep_marker else first & (mask - 1)
+    for byte in data[pos + 1:pos + length]:
+        value = value << 8 | byte
+    return value, length, value == (1 << 7 * length) - 1
+
+
+def iter_elements(reader, start, end):
+    """Yield (id, payload offset, payload size) of the EBML elements between `start` and `end`."""
+    offset = start
+    for _ in range(MAX_ELEMENTS):
+        if offset >= end:
+            return
+        header = reader.read(offset, 12)
+        if len(header) < 2:
+            return
+        element_id, id_length, _ = read_vint(header, 0, keep_marker=True)
+        size, size_length, unknown = read_vint(header, id_length)
+        payload = offset + id_length + size_length
+        # Only a Segment streamed without knowing its length has an unknown size
+        size = end - payload if unknown else size
+        yield element_id, payload, size
+        offset = payload + size
+
+
+def matroska_title(reader):
+    for element_id, offset, size in iter_elements(reader, 0, reader.size):
+        if element_id != EBML_SEGMENT:
+            continue
+        for child_id, child_offset, child_size in iter_elements(reader, offset, offset + size):
+            if child_id == EBML_CLUSTER:
+                # Media data from here on; Info always comes before it
+                return None
+            if child_id == EBML_INFO and child_size <= MAX_ELEMENT_BYTES:
+                info = Reader(data=reader.read(child_offset, child_size))
+                for info_id, title_offset, title_size in iter_elements(info, 0, info.size):
+                    if info_id == EBML_TITLE:
+                        return decode_text(info.read(title_offset, title_size))
+                return None
+        return None
+    return None
+
+
+def iter_boxes(reader, start, end):
+    """Yield (type, payload offset, payload size) of the MP4 boxes between `start` and `end`."""
+    offset = start
+    for _ in range(MAX_ELEMENTS):
+        if offset + 8 > end:
+            return
+        size, box_type = struct.unpack(">I4s", reader.read(offset, 8))
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", reader.read(offset + 8, 8))
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield box_type, offset + header, size - header
+        offset += size
+
+
+def find_box(reader, path, start, end):
+    """The (payload offset, payload size) of the box at `path`, e.g. [b"moov", b"udta"], or None."""
+    for box_type in path:
+        for found_type, offset, size in iter_boxes(reader, start, end):
+            if found_type == box_type:
+                start, end = offset, offset + size
+                break
+        else:
+            return None
+    return start, end - start
+
+
+def mp4_title(reader):
+    # moov is usually small but may sit after the media data; udta is read in one piece
+    found = find_box(reader, [b"moov", b"udta"], 0, reader.size)
+    if found is None or found[1] > MAX_ELEMENT_BYTES:
+        return None
+    udta = Reader(data=reader.read(*found))
+    for box_type, offset, size in iter_boxes(udta, 0, udta.size):
+        if box_type == b"meta":
+            # An ISO meta box starts with version and flags; QuickTime's goes straight to hdlr
+            if udta.read(offset + 4, 4) != b"hdlr":
+                offset, size = offset + 4, size - 4
+            found = find_box(udta, [b"ilst", b"\xa9nam", b"data"], offset, offset + size)
+            if found is not None:
+                # Past the data type and locale
+                return decode_text(udta.read(found[0] + 8, found[1] - 8))
+        elif box_type == b"\xa9nam":
+            # QuickTime user data text: length, language, text
+            (length,) = struct.unpack(">H", udta.read(offset, 2))
+            return decode_text(udta.read(offset + 4, length))
+    return None
+
+
+def iter_chunks(reader, start, end):
+    """Yield (id, payload offset, payload size) of the RIFF chunks between `start` and `end`."""
+    offset = start
+    for _ in range(MAX_ELEMENTS):
+        if offset + 8 > end:
+            return
+        chunk_id, size = struct.unpack("<4sI", reader.read(offset, 8))
+        yield chunk_id, offset + 8, size
+        # Chunks are padded to an even length
+        offset += 8 + size + (size & 1)
+
+
+def avi_title(reader):
+    for chunk_id, offset, size in iter_chunks(reader, 12, reader.size):
+        if chunk_id == b"LIST" and reader.read(offset, 4) == b"INFO" and size <= MAX_ELEMENT_BYTES:
+            info = Reader(data=reader.read(offset + 4, size - 4))
+            for info_id, info_offset, info_size in iter_chunks(info, 0, info.size):
+                if info_id == b"INAM":
+                    return decode_text(info.read(info_offset, info_size))
+    return None
+
+
+def read_title(path):
+    """The title in the container metadata of the video at `path`, or None if there is none."""
+    try:
+        with open(path, "rb") as f:
+            reader = Reader(f)
+            head = reader.read(0, 12)
+            if head[:4] == struct.pack(">I", EBML_HEADER):
+                return matroska_title(reader)
+            if head[4:8] == b"ftyp":
+                return mp4_title(reader)
+            if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+                return avi_title(reader)
+    except (OSError, ValueError, IndexError, struct.error):
+        # Unreadable or not what its header claims; the file is just left alone
+        pass
+    return None
+
+
+class MetadataCache:
+    """Titles read from files, filed under the size and modification time they had then."""
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_PROBED):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " title TEXT,"
+                " probed REAL NOT NULL)"
+            )
+
+    def get(self, path, size, mtime_ns):
+        """The title stored for the file (None if it has none), or MISS if it changed or is unknown."""
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, title FROM metadata WHERE path = ?", (path,)).fetchone()
+        if row is None or row[:2] != (size, mtime_ns):
+            return MISS
+        return row[2]
+
+    def put_many(self, rows):
+        """Store (path, size, mtime_ns, title) rows."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?)", [row + (now,) for row in rows]
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM metadata WHERE rowid IN (SELECT rowid FROM metadata ORDER BY probed LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM metadata")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MetadataProbe:
+    """Reads metadata titles on a thread pool, through a MetadataCache when one is given."""
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def titles(self, folder, files):
+        """{path: title or None} for `files`, (path, size, mtime_ns) tuples relative to `folder`."""
+        titles = {}
+        missing = []
+        for path, size, mtime_ns in files:
+            full_path = os.path.abspath(os.path.join(folder, path))
+            title = self.cache.get(full_path, size, mtime_ns) if self.cache is not None else MISS
+            if title is MISS:
+                missing.append((path, full_path, size, mtime_ns))
+            else:
+                titles[path] = title
+        if not missing:
+            return titles
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=MAX_PROBE_WORKERS, thread_name_prefix="probe")
+        probed = list(self._pool.map(lambda item: read_title(item[1]), missing))
+        for (path, _, _, _), title in zip(missing, probed):
+            titles[path] = title
+        if self.cache is not None:
+            self.cache.put_many([
+                (full_path, size, mtime_ns, title)
+                for (_, full_path, size, mtime_ns), title in zip(missing, probed)
+            ])
+        return titles
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        if self.cache is not None:
+            self.cache.close()
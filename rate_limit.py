@@ -0,0 +1,99 @@
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate, period, burst=1):
+        self.rate = rate / period
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def backoff(self, seconds):
+        """Hold every caller back for `seconds`, e.g. after a 429 response."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class RateLimit:
+    """Combines several buckets, e.g. a per-second and a per-minute quota."""
+
+    def __init__(self, *buckets):
+        self.buckets = buckets
+
+    def acquire(self):
+        for bucket in self.buckets:
+            bucket.acquire()
+
+    def backoff(self, seconds):
+        for bucket in self.buckets:
+            bucket.backoff(seconds)
+
+
+# AniList allows 90 requests per minute, Jikan 3 per second and 60 per minute
+ANILIST_LIMIT = RateLimit(TokenBucket(90, 60, burst=5))
+JIKAN_LIMIT = RateLimit(TokenBucket(3, 1, burst=3), TokenBucket(60, 60, burst=3))
+
+
+def retry_after_seconds(response, default):
+    """Seconds to wait as requested by a Retry-After header, or `default`."""
+    value = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def send_with_backoff(limit, send, retries=3, base_delay=1.0, stats=None):
+    """Call `send()` within the rate limit, retrying 429s, 5xx answers and connection errors.
+
+    `stats` (a RunStats) records the time spent waiting for the limit, retries and 429s.
+    """
+    for attempt in range(retries + 1):
+        if attempt and stats is not None:
+            stats.count("retries")
+        if stats is not None:
+            with stats.timed("rate_limit_wait"):
+                limit.acquire()
+        else:
+            limit.acquire()
+        # Exponential backoff with jitter so parallel lookups don't retry in lockstep
+        delay = base_delay * 2 ** attempt * random.uniform(0.5, 1.5)
+        try:
+            response = send()
+        except OSError:
+            # requests' connection errors and timeouts derive from IOError
+            if attempt == retries:
+                raise
+            time.sleep(delay)
+            continue
+        if attempt == retries or (response.status_code != 429 and response.status_code < 500):
+            return response
+        if response.status_code == 429:
+            if stats is not None:
+                stats.count("responses_429")
+            limit.backoff(retry_after_seconds(response, delay))
+        else:
+            time.sleep(delay)
+    return response
@@ -0,0 +1,600 @@
+"""Journaled batch renames.
+
+The whole plan is checked before the first rename: two files planned to the same name, names
+already taken on disk and files changed since the preview are held back. Renames are ordered
+so a file only moves once its new name is free, and rings of renames (A → B, B → A) go through
+a temporary name. Every step is written to an append-only journal first, so a run that crashed
+half way can be resumed or undone from the journal alone, without scanning or lookups.
+
+A journal holds one or more batches. A run starts a new journal; watched folders and queued
+jobs append a batch per round, so undo puts back everything since the journal was started.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from event_log import as_event_log
+from run_stats import RunStats
+
+# Bumped whenever the journal layout changes; version 1 journals hold a single batch
+JOURNAL_FORMAT_VERSION = 2
+
+# Finished steps are fsync'd this many at a time. A step that is done but not yet synced is
+# recognised on resume by its files: the old name is gone and the new one exists.
+JOURNAL_SYNC_INTERVAL = 64
+
+# Folders renamed at the same time; renames inside one folder always run one after another
+MAX_RENAME_WORKERS = 8
+
+# Files in a rename ring wait under this suffix until the name they are moving to is free
+TEMP_SUFFIX = ".renaming"
+
+# Bytes read from the end of a journal or checkpoint to find its last record
+TAIL_BYTES = 64 * 1024
+
+
+def path_key(path):
+    """Key under which two spellings of one path compare equal (case-insensitive on Windows)."""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def same_file(a, b):
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def changed_since_plan(folder, entry):
+    """Why the source of a planned entry can no longer be renamed as planned, or None."""
+    try:
+        source_stat = os.stat(os.path.join(folder, entry["source"]))
+    except OSError:
+        return "file no longer exists"
+    if "size" in entry and (source_stat.st_size != entry["size"] or source_stat.st_mtime_ns != entry["mtime_ns"]):
+        return "file changed since the preview"
+    return None
+
+
+def check_plan(folder, entries):
+    """Return the planned entries that can safely be renamed together.
+
+    The others get status "conflict" or "changed" and an "error"; entries whose target equals
+    their source are left out untouched.
+    """
+    planned = [entry for entry in entries if entry["target"] and entry["target"] != entry["source"]]
+    held = {}
+
+    by_target = {}
+    for entry in planned:
+        by_target.setdefault(path_key(entry["target"]), []).append(entry)
+    for same_target in by_target.values():
+        if len(same_target) > 1:
+            sources = ", ".join(entry["source"] for entry in same_target)
+            for entry in same_target:
+                held[id(entry)] = ("conflict", f"{len(same_target)} files would be named {entry['target']}: {sources}")
+
+    for entry in planned:
+        if id(entry) not in held:
+            reason = changed_since_plan(folder, entry)
+            if reason:
+                held[id(entry)] = ("changed", reason)
+
+    runnable = [entry for entry in planned if id(entry) not in held]
+    moving = {path_key(entry["source"]): entry for entry in runnable}
+    # A taken name is fine as long as the file holding it is renamed too; a case-only rename
+    # on a case-insensitive disk finds its own file under the new name
+    blocked = []
+    for entry in runnable:
+        holder = moving.get(path_key(entry["target"]))
+        if holder is None or holder is entry:
+            target = os.path.join(folder, entry["target"])
+            if os.path.lexists(target) and not same_file(os.path.join(folder, entry["source"]), target):
+                blocked.append(entry)
+    # A blocked file keeps its name, so whatever was to move into that name is blocked too
+    waiting = {path_key(entry["target"]): entry for entry in runnable}
+    while blocked:
+        entry = blocked.pop()
+        if id(entry) in held:
+            continue
+        held[id(entry)] = ("conflict", f"{entry['target']} already exists")
+        if path_key(entry["source"]) in waiting:
+            blocked.append(waiting[path_key(entry["source"])])
+
+    for entry in planned:
+        if id(entry) in held:
+            entry["status"], entry["error"] = held[id(entry)]
+    return [entry for entry in planned if id(entry) not in held]
+
+
+def temp_name(folder, source):
+    """A free name next to `source` to park it under while a rename ring is resolved."""
+    base = f"{source}.{os.getpid()}"
+    candidate = base + TEMP_SUFFIX
+    counter = 1
+    while os.path.lexists(os.path.join(folder, candidate)):
+        counter += 1
+        candidate = f"{base}-{counter}{TEMP_SUFFIX}"
+    return candidate
+
+
+def order_steps(folder, entries):
+    """Order the renames of checked entries so no rename lands on a name still in use.
+
+    Returns a list of (old name, new name, entry); a file in a ring first moves to a temporary
+    name, with entry None for that step.
+    """
+    moving = {path_key(entry["source"]): entry for entry in entries}
+    # Targets are unique after check_plan, so at most one entry waits for each file to move
+    waits_for = {}
+    unblocks = {}
+    for entry in entries:
+        holder = moving.get(path_key(entry["target"]))
+        if holder is not None and holder is not entry:
+            waits_for[id(entry)] = holder
+            unblocks[id(holder)] = entry
+
+    steps = []
+    done = set()
+
+    def release(entry):
+        # Each rename frees a name for the entry waiting on it, which frees the next one
+        while entry is not None and id(entry) not in done:
+            steps.append((entry["source"], entry["target"], entry))
+            done.add(id(entry))
+            entry = unblocks.get(id(entry))
+
+    for entry in entries:
+        if id(entry) not in waits_for:
+            release(entry)
+    # Whatever is left waits in a ring; parking one file under a temporary name breaks it
+    for entry in entries:
+        if id(entry) in done:
+            continue
+        parked = temp_name(folder, entry["source"])
+        steps.append((entry["source"], parked, None))
+        done.add(id(entry))
+        release(unblocks.get(id(entry)))
+        steps.append((parked, entry["target"], entry))
+    return steps
+
+
+class RenameJournal:
+    """Append-only JSON lines file recording batches of renames as they happen.
+
+    Records are filed under the batch numbered `batch`, counting from 0 in the order the
+    batches begin.
+    """
+
+    def __init__(self, path, mode="a", batch=0):
+        self.path = path
+        self.batch = batch
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, mode, encoding="utf-8")
+        self.unsynced = 0
+        self._lock = threading.Lock()
+        # A crash can leave the last line half written; later records start on a line of their own
+        if mode == "a" and self.file.tell():
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write("\n")
+
+    def write(self, record, sync=False):
+        line = json.dumps(dict(record, batch=self.batch), ensure_ascii=False) + "\n"
+        with self._lock:
+            self.file.write(line)
+            self.unsynced += 1
+            if sync or self.unsynced >= JOURNAL_SYNC_INTERVAL:
+                self._sync()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def close(self):
+        with self._lock:
+            if not self.file.closed:
+                self._sync()
+                self.file.close()
+
+
+class JournalBatch:
+    """One batch of a journal: its folder, its steps, and which of them are done or undone."""
+
+    def __init__(self, folder, step_count):
+        self.folder = folder
+        self.step_count = step_count
+        self.steps = []
+        self.done = set()
+        self.undone = set()
+        self.finished = False
+
+
+class JournalState:
+    """What a journal says about its batches and how they, or an undo of them, ended."""
+
+    def __init__(self, path):
+        self.path = path
+        self.batches = []
+        self.undo_finished = False
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn by a crash; a resume or undo carries on below it
+                continue
+            op = record.get("op")
+            if op == "begin":
+                if not 1 <= record.get("version", 0) <= JOURNAL_FORMAT_VERSION:
+                    raise ValueError(f"Unsupported journal version: {record.get('version')}")
+                self.batches.append(JournalBatch(record["folder"], record["steps"]))
+                continue
+            if op == "undo_end":
+                self.undo_finished = True
+                continue
+            if not self.batches:
+                continue
+            # Version 1 records carry no batch number; they belong to the only batch
+            number = record.get("batch", len(self.batches) - 1)
+            if not 0 <= number < len(self.batches):
+                continue
+            batch = self.batches[number]
+            if op == "step":
+                batch.steps.append((record["from"], record["to"], record.get("file")))
+            elif op == "done":
+                batch.done.add(record["step"])
+            elif op == "end":
+                batch.finished = True
+            elif op == "undone":
+                batch.undone.add(record["step"])
+        if not self.batches:
+            raise ValueError(f"Not a rename journal: {path}")
+        for batch in self.batches:
+            if len(batch.steps) != batch.step_count:
+                # Cut off while the steps were written, i.e. before the first rename
+                batch.steps = []
+
+    @property
+    def folder(self):
+        """Folder of the newest batch."""
+        return self.batches[-1].folder
+
+    def undo_started(self):
+        return self.undo_finished or any(batch.undone for batch in self.batches)
+
+    def interrupted(self):
+        """True while a batch (or the undo) stopped half way and can still be resumed or undone."""
+        if self.undo_started():
+            return not self.undo_finished
+        return not all(batch.finished for batch in self.batches)
+
+
+def last_record(path):
+    """The last record of a JSON lines file, read from its end; None if that line is torn or there is none."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - TAIL_BYTES))
+        lines = f.read().splitlines()
+    for line in reversed(lines):
+        if line.strip():
+            try:
+                return json.loads(line)
+            except ValueError:
+                return None
+    return None
+
+
+def unfinished_journal(path):
+    """The state of the journal at `path` if its run was interrupted, else None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        # A run or undo that ended says so last; only an interrupted one is read in full
+        record = last_record(path)
+        if record is not None and record.get("op") in ("end", "undo_end"):
+            return None
+        state = JournalState(path)
+    except (OSError, ValueError):
+        return None
+    return state if state.interrupted() else None
+
+
+def rename_step(folder, old, new):
+    """Rename one file, refusing to replace a file that is already there; returns an error or None."""
+    source = os.path.join(folder, old)
+    target = os.path.join(folder, new)
+    # os.rename silently replaces an existing file on POSIX
+    if os.path.lexists(target) and not same_file(source, target):
+        return f"{new} already exists"
+    try:
+        os.rename(source, target)
+    except OSError as e:
+        return str(e)
+    return None
+
+
+def partition_steps(steps):
+    """Split step numbers into groups that can run side by side, each in its original order.
+
+    Steps touching the same folder share a group, so chains and rings of renames within a
+    folder keep their order; a step moving a file between folders joins both folders' groups.
+    """
+    parent = {}
+
+    def find(folder):
+        parent.setdefault(folder, folder)
+        while parent[folder] != folder:
+            parent[folder] = parent[parent[folder]]
+            folder = parent[folder]
+        return folder
+
+    for old, new, _ in steps:
+        old_root, new_root = find(path_key(os.path.dirname(old))), find(path_key(os.path.dirname(new)))
+        if old_root != new_root:
+            parent[old_root] = new_root
+    groups = {}
+    for number, (old, _, _) in enumerate(steps):
+        groups.setdefault(find(path_key(os.path.dirname(old))), []).append(number)
+    return list(groups.values())
+
+
+def completed_steps(folder, steps, done):
+    """Numbers of the steps a run got through: the ones journaled as done, plus any done after the last sync.
+
+    Steps of one group (see partition_steps) run one after another, so past a group's last
+    journaled step only a prefix can have run. Its end is the last step whose old name is gone
+    and whose new name exists. The steps before it are taken as done when their old name is gone
+    too, or when a later step of that prefix moved a file into it, as the second step of a ring
+    does after the first parked its file under a temporary name.
+    """
+    completed = set(done)
+    for group in partition_steps(steps):
+        journaled = [position for position, number in enumerate(group) if number in done]
+        tail = group[journaled[-1] + 1:] if journaled else group
+        for end in range(len(tail) - 1, -1, -1):
+            old, new, _ = steps[tail[end]]
+            if not os.path.lexists(os.path.join(folder, old)) and os.path.lexists(os.path.join(folder, new)):
+                break
+        else:
+            continue
+        refilled = set()
+        for position in range(end, -1, -1):
+            old, new, _ = steps[tail[position]]
+            if position == end or path_key(old) in refilled or not os.path.lexists(os.path.join(folder, old)):
+                completed.add(tail[position])
+            refilled.add(path_key(new))
+    return completed
+
+
+def run_steps(folder, steps, journal, log, stats, skip=(), progress=None, stop=None, renamed=None):
+    """Rename steps of (old name, new name, original file name); returns {step number: error or None}.
+
+    Folders are renamed in parallel on up to MAX_RENAME_WORKERS threads, which pays off on network
+    shares where every rename is a round trip. Outcomes are still logged, and `progress` is
+    called with the number of files renamed or failed so far, in step order; `renamed` with the
+    original name of each file once it is under its new name. Once `stop` (a threading.Event) is
+    set no further step starts; the ones left out are missing from the result.
+    """
+    pending = [number for number in range(len(steps)) if number not in skip]
+    results = {}
+    outcomes = {}
+    report_lock = threading.Lock()
+    reported = {"next": 0, "files": 0}
+
+    def emit(step, error):
+        old, new, file = steps[step]
+        results[step] = error
+        if error:
+            stats.count("rename_failures")
+            log.error(f"❌ Error renaming {old}: {error}", file=file)
+        elif new.endswith(TEMP_SUFFIX):
+            log.debug(f"Parked {old} as {new}", file=file)
+            return
+        else:
+            stats.count("renamed")
+            log.info(f"✅ Renamed: {file} → {new}", file=file)
+            if renamed:
+                renamed(file)
+        reported["files"] += 1
+        if progress:
+            progress(reported["files"])
+
+    def report(number, error):
+        with report_lock:
+            outcomes[number] = error
+            # Steps finishing ahead of an earlier one wait here until it is in
+            while reported["next"] < len(pending) and pending[reported["next"]] in outcomes:
+                step = pending[reported["next"]]
+                reported["next"] += 1
+                emit(step, outcomes.pop(step))
+
+    def run_group(numbers):
+        for number in numbers:
+            if stop is not None and stop.is_set():
+                return
+            old, new, _ = steps[number]
+            stats.count("rename_calls")
+            with stats.timed("rename"):
+                error = rename_step(folder, old, new)
+            if not error:
+                with stats.timed("journal"):
+                    journal.write({"op": "done", "step": number})
+            report(number, error)
+
+    skip = set(skip)
+    groups = [[number for number in group if number not in skip] for group in partition_steps(steps)]
+    groups = [group for group in groups if group]
+    if len(groups) <= 1 or MAX_RENAME_WORKERS <= 1:
+        for group in groups:
+            run_group(group)
+    else:
+        with ThreadPoolExecutor(max_workers=min(MAX_RENAME_WORKERS, len(groups))) as pool:
+            # Largest folders first, so one big folder doesn't start last and finish alone
+            for _ in pool.map(run_group, sorted(groups, key=len, reverse=True)):
+                pass
+    # After a stop, steps that finished behind one that never ran are still waiting
+    for step in sorted(outcomes):
+        emit(step, outcomes.pop(step))
+    return results
+
+
+def next_batch(journal_path, since):
+    """Number of the batch to append to the journal at `journal_path`, or None to start it afresh.
+
+    Only a journal started at or after the time `since`, whose last batch ended and that has not
+    been undone, is appended to.
+    """
+    try:
+        with open(journal_path, encoding="utf-8") as f:
+            first = json.loads(f.readline())
+        record = last_record(journal_path)
+    except (OSError, ValueError):
+        return None
+    if first.get("time", 0) < since or record is None or record.get("op") != "end":
+        return None
+    return record.get("batch", 0) + 1
+
+
+def execute_plan(folder, entries, journal_path, log=print, stats=None, progress=None, stop=None, renamed=None,
+                 append_since=None):
+    """Check and rename every planned entry, journaling each step to `journal_path`.
+
+    The journal is started afresh, or gets the renames as one more batch if it was started at or
+    after the time `append_since` (e.g. when watching began). A plan with nothing to rename
+    leaves the journal alone. Entries get status "renamed", "failed",
+    "conflict" or "changed"; ones not reached before `stop` was set stay "planned" and the
+    journal is left unfinished, for resume_journal. Returns the number of entries that failed or
+    were held back. See run_steps for `progress` and `stop`; `renamed` is called with each entry
+    as soon as it is under its new name, from the thread that renamed it.
+    """
+    log = as_event_log(log)
+    stats = stats or RunStats()
+    with stats.timed("check"):
+        runnable = check_plan(folder, entries)
+        # A parking step has no entry; it moves the entry's own source
+        steps = [(old, new, entry["source"] if entry else old) for old, new, entry in order_steps(folder, runnable)]
+    for entry in entries:
+        if entry["status"] in ("conflict", "changed"):
+            stats.count("renames_skipped")
+            log.warning(f"⚠️ Skipped {entry['source']}: {entry['error']}", file=entry["source"])
+
+    if not steps:
+        return sum(1 for entry in entries if entry["target"] and entry["status"] in ("failed", "conflict", "changed"))
+    batch = None if append_since is None else next_batch(journal_path, append_since)
+    journal = RenameJournal(journal_path, "w" if batch is None else "a", batch or 0)
+    try:
+        with stats.timed("journal"):
+            journal.write({"op": "begin", "version": JOURNAL_FORMAT_VERSION, "folder": os.path.abspath(folder),
+                           "steps": len(steps), "time": time.time()})
+            for old, new, file in steps:
+                journal.write({"op": "step", "from": old, "to": new, "file": file})
+            # Nothing is renamed before the whole batch is safely on disk
+            journal.sync()
+        by_source = {entry["source"]: entry for entry in runnable}
+
+        def on_renamed(file):
+            entry = by_source.get(file)
+            if entry is not None:
+                entry["status"] = "renamed"
+                renamed(entry)
+
+        results = run_steps(folder, steps, journal, log, stats, progress=progress, stop=stop,
+                            renamed=on_renamed if renamed else None)
+        if len(results) == len(steps):
+            journal.write({"op": "end", "time": time.time()}, sync=True)
+    finally:
+        journal.close()
+
+    # An entry's last step puts it under its new name; a parked file's first step only moves it aside
+    last_step = {file: number for number, (_, _, file) in enumerate(steps)}
+    errors = {steps[number][2]: error for number, error in results.items() if error}
+    for entry in runnable:
+        if entry["source"] in errors:
+            entry["status"] = "failed"
+            entry["error"] = errors[entry["source"]]
+        elif last_step[entry["source"]] in results:
+            entry["status"] = "renamed"
+    return sum(1 for entry in entries if entry["target"] and entry["status"] in ("failed", "conflict", "changed"))
+
+
+def resume_journal(journal_path, log=print, stats=None, progress=None, stop=None):
+    """Finish the renames of every interrupted batch of a journal; returns (folder of the last, failed renames)."""
+    log = as_event_log(log)
+    stats = stats or RunStats()
+    state = JournalState(journal_path)
+    if state.undo_started():
+        raise ValueError("This run has been undone; it can only be undone again")
+    failures = 0
+    for number, batch in enumerate(state.batches):
+        if batch.finished:
+            continue
+        if stop is not None and stop.is_set():
+            break
+        # Some may have been done before the crash but not synced to the journal yet
+        skip = completed_steps(batch.folder, batch.steps, batch.done)
+        log.info(f"↩️ Resuming {len(batch.steps) - len(skip)} of {len(batch.steps)} renames in {batch.folder}")
+        journal = RenameJournal(journal_path, batch=number)
+        try:
+            for step in skip - batch.done:
+                journal.write({"op": "done", "step": step})
+            results = run_steps(batch.folder, batch.steps, journal, log, stats, skip, progress, stop)
+            if len(results) + len(skip) == len(batch.steps):
+                journal.write({"op": "end", "time": time.time()}, sync=True)
+        finally:
+            journal.close()
+        failures += sum(1 for error in results.values() if error)
+    return state.folder, failures
+
+
+def undo_journal(journal_path, log=print, stats=None):
+    """Put back every file a journaled run renamed, newest rename first; returns (folder, failures).
+
+    A step is undone when its new name exists and its old name is free again, so steps that
+    never ran, or were already undone by an interrupted undo, are passed over.
+    """
+    log = as_event_log(log)
+    stats = stats or RunStats()
+    state = JournalState(journal_path)
+    failures = 0
+    journal = RenameJournal(journal_path)
+    try:
+        # Newest batch first, so a file renamed again by a later batch is put back step by step
+        for batch_number in range(len(state.batches) - 1, -1, -1):
+            batch = state.batches[batch_number]
+            folder = batch.folder
+            journal.batch = batch_number
+            for number in range(len(batch.steps) - 1, -1, -1):
+                old, new, file = batch.steps[number]
+                if number in batch.undone or os.path.lexists(os.path.join(folder, old)) \
+                        or not os.path.lexists(os.path.join(folder, new)):
+                    continue
+                stats.count("rename_calls")
+                with stats.timed("rename"):
+                    error = rename_step(folder, new, old)
+                if error:
+                    failures += 1
+                    stats.count("rename_failures")
+                    log.error(f"❌ Could not undo {new}: {error}", file=file)
+                    continue
+                with stats.timed("journal"):
+                    journal.write({"op": "undone", "step": number})
+                if not new.endswith(TEMP_SUFFIX):
+                    stats.count("undone")
+                    log.info(f"↩️ Restored: {new} → {file}", file=file)
+        if not failures:
+            journal.write({"op": "undo_end", "time": time.time()}, sync=True)
+    finally:
+        journal.close()
+    return state.folder, failures
@@ -0,0 +1,683 @@
+"""Qt-free rename logic shared by the GUI and the command line.
+
+Usage: python -m renamer_core FOLDER [--language english|japanese] [--dry-run] [--json] [--recursive]
+       python -m renamer_core FOLDER --log-file events.jsonl [--verbose]
+       python -m renamer_core FOLDER --stats run.prom [--profile run.pstats]
+       python -m renamer_core --build-index DUMP.json|DUMP.csv [--index INDEX.sqlite3]
+       python -m renamer_core FOLDER --dry-run --save-plan PLAN.json
+       python -m renamer_core --apply-plan PLAN.json
+       python -m renamer_core --resume | --undo [--journal JOURNAL.jsonl]
+       python -m renamer_core FOLDER --watch [--recursive]
+"""
+import argparse
+import csv
+import functools
+import itertools
+import json
+import os
+import queue
+import re
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from duplicate_finder import MAX_HASH_WORKERS, DuplicateFinder, HashIndex
+from event_log import DEBUG, INFO, EventLog, JsonlSink, StreamSink, as_event_log
+from filename_rules import FILENAME_RULES, FilenameNormalizer
+from folder_scanner import SYMLINK_POLICIES, scan_folder
+from folder_watcher import FolderWatcher, ProcessedIndex
+from media_probe import MetadataCache, MetadataProbe
+from rename_journal import execute_plan, resume_journal, undo_journal, unfinished_journal
+from resolver_chain import API_PRIORITIES, backend_chain
+from run_checkpoint import RunCheckpoint, unfinished_checkpoint
+from run_stats import RunStats, run_profiled, write_report
+from title_cache import TitleCache, normalize_query
+from title_index import TitleIndex, build_index
+from title_resolver import TitleResolver
+
+# Unique titles looked up in parallel; the API rate limits still bound throughput
+MAX_LOOKUP_WORKERS = 8
+
+# Files taken from the folder scan per planning round
+PLAN_CHUNK_SIZE = 200
+
+# Scanned chunks buffered ahead of planning; the scan waits once this many are queued
+PLAN_QUEUE_CHUNKS = 4
+
+# Everything before the OP/ED marker is taken as the anime title
+TITLE_PATTERN = re.compile(r"^(.*?)[-\s]+(?:OP\d*|Opening|ED\d*|Ending)", re.IGNORECASE)
+
+# Longest a watch waits for changes before checking whether it should stop
+WATCH_POLL_SECONDS = 1.0
+
+# Bumped whenever the saved plan layout changes
+PLAN_FORMAT_VERSION = 1
+
+# CLI exit codes
+EXIT_OK = 0
+EXIT_RENAME_FAILED = 1
+EXIT_USAGE = 2
+EXIT_CANCELLED = 130
+
+
+def settings_dir():
+    """Same location the GUI uses for its QSettings ini store."""
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, "MyOrganization")
+
+
+def default_cache_path():
+    return os.path.join(settings_dir(), "AnimeRenamer_titles.sqlite3")
+
+
+def default_index_path():
+    return os.path.join(settings_dir(), "AnimeRenamer_index.sqlite3")
+
+
+def default_journal_path():
+    return os.path.join(settings_dir(), "AnimeRenamer_journal.jsonl")
+
+
+def default_checkpoint_path():
+    return os.path.join(settings_dir(), "AnimeRenamer_checkpoint.jsonl")
+
+
+def default_processed_path():
+    return os.path.join(settings_dir(), "AnimeRenamer_processed.sqlite3")
+
+
+def default_metadata_path():
+    return os.path.join(settings_dir(), "AnimeRenamer_metadata.sqlite3")
+
+
+def default_hashes_path():
+    return os.path.join(settings_dir(), "AnimeRenamer_hashes.sqlite3")
+
+
+def open_index(index_path=None):
+    """The offline title index at `index_path` (default location if None), or None if there is none."""
+    index_path = index_path or default_index_path()
+    return TitleIndex(index_path) if os.path.exists(index_path) else None
+
+
+def create_resolver(cache_path=None, log=print, index_path=None, **options):
+    return TitleResolver(TitleCache(cache_path or default_cache_path()), log=log, index=open_index(index_path),
+                         **options)
+
+
+def create_metadata_probe(cache_path=None):
+    return MetadataProbe(MetadataCache(cache_path or default_metadata_path()))
+
+
+@functools.lru_cache(maxsize=4096)
+def format_title_case(title):
+    lowercase_words = {"a", "an", "and", "as", "at", "but", "by", "for", "in", "nor",
+                       "of", "on", "or", "so", "the", "to", "up", "yet"}
+    words = title.split()
+    if not words:
+        return title
+    formatted_words = [words[0].capitalize()]
+    for word in words[1:]:
+        formatted_words.append(word.lower() if word.lower() in lowercase_words else word.capitalize())
+    return " ".join(formatted_words)
+
+
+def parse_title(name):
+    """The anime title in a name like "Naruto OP1", or None if it has no OP/ED marker."""
+    match = TITLE_PATTERN.match(name)
+    return (match.group(1).strip() or None) if match else None
+
+
+def parse_filename(filename):
+    """Split a filename into (root, extension, anime title or None)."""
+    file_root, file_ext = os.path.splitext(filename)
+    return file_root, file_ext, parse_title(file_root)
+
+
+def build_new_filename(new_anime_name, file_root, anime_title, file_ext, title_preference, normalizer):
+    if title_preference == "english":
+        new_anime_name = format_title_case(new_anime_name)
+    return normalizer.normalize(new_anime_name + file_root[len(anime_title):]) + file_ext
+
+
+class ScannedFile:
+    """A file on its way from the scan to the planner: its path, what its name says and, if it
+    names a title, the size and modification time it was found with and the file it is a copy of."""
+
+    __slots__ = ("path", "root", "ext", "anime_title", "size", "mtime_ns", "file_id", "copy_of")
+
+    def __init__(self, path):
+        self.path = path
+        self.root, self.ext, self.anime_title = parse_filename(os.path.basename(path))
+        self.size = None
+        self.mtime_ns = None
+        self.file_id = None
+        self.copy_of = None
+
+    def stat(self, folder):
+        try:
+            file_stat = os.stat(os.path.join(folder, self.path))
+        except OSError:
+            return
+        self.size = file_stat.st_size
+        self.mtime_ns = file_stat.st_mtime_ns
+        self.file_id = (file_stat.st_dev, file_stat.st_ino)
+
+    def use_metadata(self, title):
+        """Name the file after its metadata title instead, if that has an OP/ED marker."""
+        anime_title = parse_title(title)
+        if anime_title:
+            # The new name is built from this root; keep it to one path component
+            self.root = title.replace("\\", " ").replace("/", " ")
+            self.anime_title = parse_title(self.root)
+        return bool(anime_title)
+
+
+def scan_chunks(folder, files, stats, probe=None, hash_index=None):
+    """The scan and parse stages: ScannedFile records, PLAN_CHUNK_SIZE at a time.
+
+    With a MetadataProbe, files whose names have no OP/ED marker are named after the title in
+    their container metadata when that has one. With a HashIndex, files that could be renamed
+    but are copies of one seen earlier get copy_of set.
+    """
+    files = iter(files)
+    if hash_index is None:
+        yield from parse_chunks(folder, files, stats, probe)
+        return
+    duplicates = DuplicateFinder(folder, hash_index)
+    with ThreadPoolExecutor(max_workers=MAX_HASH_WORKERS, thread_name_prefix="hash") as pool:
+        for chunk in parse_chunks(folder, files, stats, probe):
+            candidates = {
+                scanned.path: scanned for scanned in chunk if scanned.anime_title and scanned.size is not None
+            }
+            with stats.timed("duplicates"):
+                copies = duplicates.find([
+                    (path, scanned.file_id + (scanned.size, scanned.mtime_ns)) for path, scanned in candidates.items()
+                ], pool)
+            for path, original in copies.items():
+                candidates[path].copy_of = original
+            yield chunk
+
+
+def parse_chunks(folder, files, stats, probe=None):
+    while True:
+        with stats.timed("scan"):
+            paths = list(itertools.islice(files, PLAN_CHUNK_SIZE))
+        if not paths:
+            return
+        with stats.timed("parse"):
+            chunk = [ScannedFile(path) for path in paths]
+        # Only files that can be renamed need their size and modification time
+        with stats.timed("stat"):
+            for scanned in chunk:
+                if scanned.anime_title or probe is not None:
+                    scanned.stat(folder)
+        if probe is not None:
+            untitled = [scanned for scanned in chunk if not scanned.anime_title and scanned.size is not None]
+            if untitled:
+                with stats.timed("metadata"):
+                    titles = probe.titles(folder, [(scanned.path, scanned.size, scanned.mtime_ns) for scanned in untitled])
+                for scanned in untitled:
+                    if titles.get(scanned.path) and scanned.use_metadata(titles[scanned.path]):
+                        stats.count("metadata_titles")
+        yield chunk
+
+
+def read_ahead(iterable, max_items, stop=None):
+    """Yield the items of `iterable`, produced on a separate thread up to `max_items` ahead.
+
+    The producer waits while `max_items` are queued, and gives up once `stop` (a
+    threading.Event) is set or the consumer stops iterating. Its exceptions are raised here.
+    """
+    items = queue.Queue(maxsize=max_items)
+    closed = threading.Event()
+
+    def put(item):
+        while not closed.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        error = None
+        try:
+            for item in iterable:
+                if (stop is not None and stop.is_set()) or not put((True, item)):
+                    break
+        except Exception as e:
+            error = e
+        put((False, error))
+
+    producer = threading.Thread(target=produce, name="read-ahead", daemon=True)
+    producer.start()
+    try:
+        while True:
+            more, value = items.get()
+            if not more:
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        closed.set()
+        producer.join()
+
+
+def resolve_titles(resolver, titles, title_preference, stats=None, stop=None, log=None):
+    """Resolve each title once, asking the backends of backend_chain() in turn for what is still open.
+
+    Returns {normalized title: (resolved title or None, where it came from or None)}. No further
+    backend is asked once `stop` (a threading.Event) is set. The resolver's records go to `log`
+    if given, e.g. the run's own log when runs share one resolver.
+    """
+    stats = stats or RunStats()
+    unique_titles = {}
+    for anime_title in titles:
+        unique_titles.setdefault(normalize_query(anime_title), anime_title)
+
+    resolved = {}
+    with resolver.logging_to(log):
+        with ThreadPoolExecutor(max_workers=MAX_LOOKUP_WORKERS, initializer=resolver.use_log, initargs=(log,)) as pool:
+            for backend in backend_chain(resolver, resolver.priority):
+                pending = [anime_title for key, anime_title in unique_titles.items() if key not in resolved]
+                if not pending or (stop is not None and stop.is_set()):
+                    break
+                # Its circuit may have opened while an earlier backend was busy
+                if not backend.available():
+                    continue
+                with stats.timed(backend.name):
+                    answers = backend.resolve(pending, title_preference, pool)
+                for anime_title, answer in answers.items():
+                    resolved[normalize_query(anime_title)] = answer
+        for key, anime_title in unique_titles.items():
+            title, api = resolved.setdefault(key, (None, None))
+            resolver.log.debug(f"{anime_title} → {title} ({api})" if title else f"No match for {anime_title}",
+                               title=anime_title)
+    return resolved
+
+
+def iter_rename_plan(folder, title_preference="english", resolver=None, log=print, files=None, scan_options=None,
+                     filename_rules=FILENAME_RULES, stats=None, checkpoint=None, stop=None, probe=None,
+                     hash_index=None):
+    """Yield the plan entry of every supported file without touching the disk.
+
+    Files come from `files` (paths relative to `folder`) or from scan_folder(folder, **scan_options)
+    and are planned a chunk at a time, so entries start flowing before a big scan has finished.
+    Scanning and parsing run up to PLAN_QUEUE_CHUNKS chunks ahead of the lookups.
+    New names are cleaned up by `filename_rules`, compiled once per call.
+    Each entry is a dict with "source", "target" (None when the file is left alone),
+    "anime_title", "resolved_title", "api" and "status"; planned entries also record the
+    "size" and "mtime_ns" of the source so a saved plan can detect files changed since.
+    `log` is an EventLog or a plain callable taking a message; `stats` (a RunStats) gets
+    the time spent in each stage and per-file counters.
+    With a RunCheckpoint, planned entries are added to it, and files it already has are taken
+    from it (or left out, once renamed) without lookups. Planning ends early once `stop` (a
+    threading.Event) is set. A MetadataProbe names files the filename pattern misses after the
+    title in their container metadata. With a HashIndex, copies of a file planned earlier in
+    the run are left alone as status "duplicate", with "duplicate_of" naming that file, and are
+    not looked up.
+    """
+    log = as_event_log(log)
+    stats = stats or RunStats()
+    if resolver is None:
+        resolver = create_resolver(log=log)
+    if files is None:
+        files = scan_folder(folder, **(scan_options or {}))
+    normalizer = FilenameNormalizer(filename_rules)
+
+    # Titles stay resolved across chunks, so each distinct title is looked up once per run
+    resolved = {}
+    # The scan runs ahead on its own thread, so the disk is read while lookups are in flight
+    for chunk in read_ahead(scan_chunks(folder, files, stats, probe, hash_index), PLAN_QUEUE_CHUNKS, stop):
+        if stop is not None and stop.is_set():
+            break
+        if checkpoint is not None:
+            with stats.timed("checkpoint"):
+                known = [(scanned, checkpoint.lookup(folder, scanned.path)) for scanned in chunk]
+            chunk = [scanned for scanned, entry in known if entry is None]
+            for _, entry in known:
+                if entry is not None:
+                    stats.count("files")
+                    stats.count("files_resumed")
+                    if entry["status"] == "planned":
+                        yield entry
+        new_titles = {}
+        for scanned in chunk:
+            if scanned.anime_title and not scanned.copy_of and normalize_query(scanned.anime_title) not in resolved:
+                new_titles.setdefault(normalize_query(scanned.anime_title), scanned.anime_title)
+        if new_titles:
+            log.info(f"🔎 Unique titles to resolve: {len(new_titles)} / {len(chunk)}")
+            with stats.timed("resolve"):
+                resolved.update(resolve_titles(resolver, new_titles.values(), title_preference, stats, stop, log))
+            # Titles cut short by a stop would look unresolved; this chunk is planned again on resume
+            if stop is not None and stop.is_set():
+                break
+
+        for scanned in chunk:
+            path, anime_title = scanned.path, scanned.anime_title
+            new_anime_name, api = resolved.get(normalize_query(anime_title), (None, None)) if anime_title else (None, None)
+            entry = {
+                "source": path,
+                "target": None,
+                "anime_title": anime_title,
+                "resolved_title": new_anime_name,
+                "api": api,
+                "status": "skipped",
+            }
+            stats.count("files")
+            if scanned.copy_of:
+                entry["resolved_title"] = None
+                entry["status"] = "duplicate"
+                entry["duplicate_of"] = scanned.copy_of
+                stats.count("files_duplicate")
+                log.info(f"♊ Duplicate of {scanned.copy_of}, left alone: {path}", file=path)
+                yield entry
+                continue
+            # A file gone since the scan is left alone
+            if new_anime_name and scanned.size is not None:
+                start = time.perf_counter()
+                new_filename = build_new_filename(
+                    new_anime_name, scanned.root, anime_title, scanned.ext, title_preference, normalizer
+                )
+                stats.add_time("filename_rules", time.perf_counter() - start)
+                entry["target"] = os.path.join(os.path.dirname(path), new_filename)
+                entry["status"] = "planned"
+                entry["size"] = scanned.size
+                entry["mtime_ns"] = scanned.mtime_ns
+                if checkpoint is not None:
+                    checkpoint.add(entry)
+            stats.count("files_planned" if entry["target"] else "files_skipped")
+            # Ties the file to the title its lookup records are filed under
+            log.debug(f"Planned: {path} → {entry['target']}" if entry["target"] else f"Left alone: {path}",
+                      file=path, title=anime_title)
+            yield entry
+
+
+def rename_plan(folder, title_preference="english", resolver=None, log=print, files=None, scan_options=None,
+                filename_rules=FILENAME_RULES, stats=None):
+    """Like iter_rename_plan but returns the whole plan as a list."""
+    return list(iter_rename_plan(folder, title_preference, resolver, log, files, scan_options, filename_rules, stats))
+
+
+def save_plan(path, folder, plan, title_preference):
+    data = {
+        "version": PLAN_FORMAT_VERSION,
+        "folder": os.path.abspath(folder),
+        "title_preference": title_preference,
+        "entries": [entry for entry in plan if entry["target"]],
+    }
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def load_plan(path):
+    """Read a plan written by save_plan; returns (folder, entries)."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != PLAN_FORMAT_VERSION:
+        raise ValueError(f"Unsupported plan version: {data.get('version')}")
+    return data["folder"], data["entries"]
+
+
+def apply_plan(folder, plan, log=print, stats=None, journal_path=None, stop=None):
+    """Rename every planned file as one journaled batch; returns the number of files not renamed.
+
+    See rename_journal.execute_plan; the journal goes to default_journal_path() unless given.
+    """
+    stats = stats or RunStats()
+    stats.count("files", len(plan))
+    return execute_plan(folder, plan, journal_path or default_journal_path(), log, stats, stop=stop)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="renamer_core", description="Rename anime opening/ending files without starting the GUI."
+    )
+    parser.add_argument("folder", nargs="?", help="folder containing the files to rename")
+    parser.add_argument("--language", choices=("english", "japanese"), default="english",
+                        help="title language (default: english)")
+    parser.add_argument("--dry-run", action="store_true", help="only show the new filenames")
+    parser.add_argument("--json", action="store_true", help="print the plan as JSON on stdout")
+    parser.add_argument("--cache", default=default_cache_path(), help="title cache file")
+    parser.add_argument("--api-priority", choices=API_PRIORITIES, default="auto",
+                        help="API asked first; auto picks the one answering best lately (default: auto)")
+    parser.add_argument("--index", default=default_index_path(),
+                        help="offline title index, consulted before the APIs when it exists")
+    parser.add_argument("--build-index", metavar="DUMP",
+                        help="build the offline title index from a JSON or CSV dump of AniList/MAL entries")
+    parser.add_argument("-r", "--recursive", action="store_true", help="also rename files in subfolders")
+    parser.add_argument("--max-depth", type=int, default=None, help="subfolder levels to descend with --recursive")
+    parser.add_argument("--include", action="append", default=[], metavar="GLOB",
+                        help="only rename files matching GLOB (repeatable)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="skip files and folders matching GLOB (repeatable)")
+    parser.add_argument("--symlinks", choices=SYMLINK_POLICIES, default="files",
+                        help="skip symlinks, keep symlinked files only, or follow symlinked folders too")
+    parser.add_argument("--save-plan", metavar="FILE", help="write the rename plan to FILE (use with --dry-run)")
+    parser.add_argument("--apply-plan", metavar="FILE",
+                        help="rename exactly as planned in FILE, without any lookups")
+    parser.add_argument("--no-metadata", action="store_true",
+                        help="do not read titles from the container metadata of files the filename pattern misses")
+    parser.add_argument("--no-duplicate-check", action="store_true",
+                        help="plan byte-for-byte copies of a file like any other file")
+    parser.add_argument("--journal", default=default_journal_path(),
+                        help="journal of the renames, for --resume and --undo after a crash")
+    parser.add_argument("--resume", action="store_true",
+                        help="pick up an interrupted or cancelled run where it stopped, without looking anything up again")
+    parser.add_argument("--undo", action="store_true", help="put back every file the last run renamed")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and rename new files as they finish arriving in FOLDER")
+    parser.add_argument("--log-file", metavar="FILE", help="append every log record to FILE as JSON lines")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also log debug records to stderr")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="write the run summary to FILE: Prometheus textfile if it ends in .prom, else JSON")
+    parser.add_argument("--profile", metavar="FILE", help="profile the run with cProfile and save the stats to FILE")
+    args = parser.parse_args(argv)
+
+    log = EventLog()
+    log.subscribe(StreamSink(sys.stderr), DEBUG if args.verbose else INFO)
+    if args.log_file:
+        try:
+            log_file = log.subscribe(JsonlSink(args.log_file), DEBUG)
+        except OSError as e:
+            log.error(f"❌ Could not open log file {args.log_file}: {e}")
+            return EXIT_USAGE
+    try:
+        if args.build_index:
+            try:
+                count = build_index(args.build_index, args.index)
+            except (OSError, ValueError, csv.Error) as e:
+                log.error(f"❌ Could not build the title index from {args.build_index}: {e}")
+                return EXIT_USAGE
+            log.info(f"📚 Indexed {count} titles into {args.index}")
+            if not args.folder and not args.apply_plan and not args.resume and not args.undo:
+                return EXIT_OK
+        stats = RunStats()
+        stop = threading.Event()
+        # The first Ctrl+C stops the run between files, so it can be resumed; a second one aborts
+        if threading.current_thread() is threading.main_thread():
+            def request_stop(signum, frame):
+                log.warning("⏹️ Stopping… press Ctrl+C again to abort")
+                stop.set()
+                signal.signal(signal.SIGINT, signal.default_int_handler)
+            previous_handler = signal.signal(signal.SIGINT, request_stop)
+        try:
+            exit_code = run_profiled(args.profile, run_cli, args, log, stats, stop)
+        finally:
+            if threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGINT, previous_handler)
+        if exit_code != EXIT_USAGE:
+            stats.finish()
+            for line in stats.report_lines():
+                log.info(line)
+            if args.stats:
+                try:
+                    write_report(args.stats, stats)
+                except OSError as e:
+                    log.error(f"❌ Could not write stats to {args.stats}: {e}")
+        return exit_code
+    finally:
+        if args.log_file:
+            log_file.close()
+
+
+def run_cli(args, log, stats, stop):
+    if args.undo:
+        try:
+            _, failures = undo_journal(args.journal, log, stats)
+        except (OSError, ValueError) as e:
+            log.error(f"❌ Could not read journal {args.journal}: {e}")
+            return EXIT_USAGE
+        return EXIT_RENAME_FAILED if failures else EXIT_OK
+
+    checkpoint = None
+    failures = 0
+    if args.resume:
+        # Renames that were under way first, then the files the run had not got to
+        if unfinished_journal(args.journal):
+            try:
+                _, failures = resume_journal(args.journal, log, stats, stop=stop)
+            except (OSError, ValueError) as e:
+                log.error(f"❌ Could not read journal {args.journal}: {e}")
+                return EXIT_USAGE
+        checkpoint = unfinished_checkpoint(default_checkpoint_path())
+        if stop.is_set():
+            log.warning("⏹️ Stopped; run with --resume to carry on")
+            return EXIT_CANCELLED
+        if checkpoint is None:
+            return EXIT_RENAME_FAILED if failures else EXIT_OK
+        args.folder = checkpoint.folder
+        args.dry_run = args.json = False
+        args.save_plan = args.apply_plan = None
+        log.info(f"↩️ Resuming the run in {checkpoint.folder}")
+
+    renaming = args.apply_plan or not args.dry_run
+    if renaming and unfinished_journal(args.journal):
+        log.error(f"❌ The last run was interrupted; finish it with --resume or put it back with --undo ({args.journal})")
+        return EXIT_USAGE
+
+    if args.apply_plan:
+        try:
+            folder, plan = load_plan(args.apply_plan)
+        except (OSError, ValueError) as e:
+            log.error(f"❌ Could not read plan {args.apply_plan}: {e}")
+            return EXIT_USAGE
+        failures = apply_plan(args.folder or folder, plan, log=log, stats=stats, journal_path=args.journal,
+                              stop=stop)
+        if args.json:
+            json.dump(plan, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        if stop.is_set():
+            log.warning("⏹️ Stopped; run with --resume to carry on")
+            return EXIT_CANCELLED
+        return EXIT_RENAME_FAILED if failures else EXIT_OK
+
+    if not args.folder or not os.path.isdir(args.folder):
+        log.error(f"❌ Not a folder: {args.folder}")
+        return EXIT_USAGE
+
+    title_preference = "english" if args.language == "english" else "romaji"
+    if checkpoint is not None:
+        title_preference = checkpoint.title_preference
+    try:
+        resolver = create_resolver(args.cache, log=log, index_path=args.index, priority=args.api_priority)
+    except ValueError as e:
+        log.error(f"❌ Could not open the title index: {e}")
+        return EXIT_USAGE
+    stats.track(resolver.stats)
+    probe = None if args.no_metadata else create_metadata_probe()
+    hash_index = None if args.no_duplicate_check else HashIndex(default_hashes_path())
+    try:
+        scan_options = {
+            "recursive": args.recursive,
+            "max_depth": args.max_depth,
+            "include": args.include,
+            "exclude": args.exclude,
+            "symlinks": args.symlinks,
+        }
+        if args.watch:
+            return watch_cli(args, resolver, title_preference, scan_options, log, stats, stop, probe, hash_index)
+        if checkpoint is not None:
+            scan_options = checkpoint.scan_options
+            checkpoint.reopen()
+        elif not args.dry_run:
+            checkpoint = RunCheckpoint(default_checkpoint_path())
+            checkpoint.start(args.folder, title_preference, scan_options)
+        plan = []
+        entries = iter_rename_plan(args.folder, title_preference, resolver, log=log, scan_options=scan_options,
+                                   stats=stats, checkpoint=checkpoint, stop=stop, probe=probe,
+                                   hash_index=hash_index)
+        for entry in entries:
+            if entry["target"] and args.dry_run and not args.json:
+                print(f"{entry['source']} ➡️ {entry['target']}")
+            # The whole plan is checked for clashing names before anything is renamed
+            if args.json or args.save_plan or (entry["target"] and not args.dry_run):
+                plan.append(entry)
+        if not args.dry_run and not stop.is_set():
+            failures += execute_plan(args.folder, plan, args.journal, log, stats, stop=stop)
+        if stop.is_set():
+            log.warning("⏹️ Stopped; run with --resume to carry on")
+            return EXIT_CANCELLED
+        if checkpoint is not None:
+            checkpoint.finish()
+        if args.save_plan:
+            save_plan(args.save_plan, args.folder, plan, title_preference)
+        if args.json:
+            json.dump(plan, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if probe is not None:
+            probe.close()
+        if hash_index is not None:
+            hash_index.close()
+        resolver.close()
+    return EXIT_RENAME_FAILED if failures else EXIT_OK
+
+
+def watch_cli(args, resolver, title_preference, scan_options, log, stats, stop, probe=None, hash_index=None):
+    """Rename files as they arrive in args.folder until `stop` is set, e.g. by Ctrl+C."""
+    processed = ProcessedIndex(default_processed_path())
+    watcher = FolderWatcher(args.folder, scan_options, processed)
+    log.info(f"👀 Watching {args.folder} (Ctrl+C to stop)")
+    started = time.time()
+    failures = 0
+    try:
+        while not stop.is_set():
+            files = watcher.poll(WATCH_POLL_SECONDS)
+            if not files:
+                continue
+            entries = list(iter_rename_plan(args.folder, title_preference, resolver, log=log, files=files,
+                                            stats=stats, stop=stop, probe=probe, hash_index=hash_index))
+            renames = [entry for entry in entries if entry["target"]]
+            if args.dry_run:
+                for entry in renames:
+                    print(f"{entry['source']} ➡️ {entry['target']}")
+                continue
+            if renames:
+                if unfinished_journal(args.journal):
+                    log.error(f"❌ The last run was interrupted; finish it with --resume or put it back with --undo ({args.journal})")
+                    return EXIT_USAGE
+                # Each batch is added to the journal, so --undo puts back everything since watching began
+                failures += execute_plan(args.folder, renames, args.journal, log, stats, stop=stop, append_since=started)
+            processed.record(args.folder, entries)
+        log.info("👋 Stopped watching")
+    finally:
+        watcher.close()
+        processed.close()
+    return EXIT_RENAME_FAILED if failures else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
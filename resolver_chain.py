@@ -0,0 +1,168 @@
+import threading
+import time
+
+from title_cache import MISS
+
+# Values of the api_priority setting; "auto" orders the APIs by how well they are doing
+API_PRIORITIES = ("auto", "anilist", "mal")
+
+# Titles packed into one aliased AniList GraphQL request
+ANILIST_BATCH_SIZE = 10
+
+# A backend failing this many requests in a row is skipped for CIRCUIT_RESET_SECONDS
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 30.0
+
+# Weight of the newest request in the moving latency and success averages
+HEALTH_SMOOTHING = 0.2
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an API whose circuit breaker is open."""
+
+
+class BackendHealth:
+    """Moving latency and success rate of one API, plus a circuit breaker.
+
+    After `failure_threshold` failed or throttled requests in a row the circuit opens and
+    available() is False for `reset_seconds`. The first request after that decides: a success
+    closes the circuit, another failure opens it again right away.
+    """
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.latency = None
+        self.success_rate = 1.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        """Record one request; returns True when this failure opened the circuit."""
+        with self._lock:
+            if self.latency is None:
+                self.latency = seconds
+            else:
+                self.latency += HEALTH_SMOOTHING * (seconds - self.latency)
+            self.success_rate += HEALTH_SMOOTHING * ((1.0 if ok else 0.0) - self.success_rate)
+            if ok:
+                self.consecutive_failures = 0
+                return False
+            self.consecutive_failures += 1
+            if self.consecutive_failures < self.failure_threshold or time.monotonic() < self.open_until:
+                return False
+            self.open_until = time.monotonic() + self.reset_seconds
+            return True
+
+    def available(self):
+        return time.monotonic() >= self.open_until
+
+    def expected_cost(self):
+        """Seconds a request is expected to take, counting the ones that fail; lower is better."""
+        with self._lock:
+            if self.latency is None:
+                # Untried APIs go last; they are measured once they are asked as a fallback
+                return float("inf")
+            return self.latency / max(self.success_rate, 0.05)
+
+
+class CacheBackend:
+    """Earlier answers from any API, straight from the title cache."""
+
+    name = "cache"
+
+    def __init__(self, resolver):
+        self.resolver = resolver
+
+    def available(self):
+        return True
+
+    def resolve(self, queries, title_preference, pool):
+        results = {}
+        for query in queries:
+            for source in ("anilist", "mal"):
+                title = self.resolver.cache.get(source, query, title_preference)
+                if title is not MISS and title:
+                    self.resolver.stats.count("cache_hits")
+                    results[query] = (title, source)
+                    break
+        return results
+
+
+class IndexBackend:
+    """The offline title index, when one is loaded."""
+
+    name = "index"
+
+    def __init__(self, resolver):
+        self.resolver = resolver
+
+    def available(self):
+        return self.resolver.index is not None
+
+    def resolve(self, queries, title_preference, pool):
+        results = {}
+        for query in queries:
+            title = self.resolver.get_anime_title_index(query, title_preference)
+            if title:
+                results[query] = (title, "index")
+        return results
+
+
+class AniListBackend:
+    """AniList searches, several titles per aliased GraphQL request."""
+
+    name = "anilist"
+    health_key = "anilist"
+    titles_per_request = ANILIST_BATCH_SIZE
+
+    def __init__(self, resolver):
+        self.resolver = resolver
+
+    def available(self):
+        return self.resolver.health[self.health_key].available()
+
+    def resolve(self, queries, title_preference, pool):
+        batches = [queries[i:i + ANILIST_BATCH_SIZE] for i in range(0, len(queries), ANILIST_BATCH_SIZE)]
+        results = {}
+        for batch_result in pool.map(
+            lambda batch: self.resolver.get_anime_titles_anilist(batch, title_preference), batches
+        ):
+            results.update({query: (title, "anilist") for query, title in batch_result.items() if title})
+        return results
+
+
+class JikanBackend:
+    """MyAnimeList searches through Jikan, one title per request."""
+
+    name = "mal"
+    health_key = "jikan"
+    titles_per_request = 1
+
+    def __init__(self, resolver):
+        self.resolver = resolver
+
+    def available(self):
+        return self.resolver.health[self.health_key].available()
+
+    def resolve(self, queries, title_preference, pool):
+        titles = pool.map(lambda query: self.resolver.get_anime_title_mal(query, title_preference), queries)
+        return {query: (title, "mal") for query, title in zip(queries, titles) if title}
+
+
+def backend_chain(resolver, priority="auto"):
+    """Backends in the order they are asked: cache and offline index first, then the APIs.
+
+    "anilist" and "mal" put that API first; "auto" puts first the API expected to answer a
+    title soonest, judging by recent latency, failures and titles per request. APIs with an
+    open circuit are left out.
+    """
+    apis = [AniListBackend(resolver), JikanBackend(resolver)]
+    if priority == "mal":
+        apis.reverse()
+    elif priority == "auto":
+        # The sort is stable, so AniList stays first while neither API has a track record
+        apis.sort(key=lambda backend: resolver.health[backend.health_key].expected_cost() / backend.titles_per_request)
+    chain = [CacheBackend(resolver), IndexBackend(resolver)] + apis
+    return [backend for backend in chain if backend.available()]
@@ -0,0 +1,137 @@
+"""Checkpoint of the files a run has planned, so an interrupted run can pick up where it stopped.
+
+Every planned file is appended as soon as its new name is known, keyed by path, size and
+modification time. A resumed run takes the files that still match straight from the checkpoint,
+without lookups, and recognises the ones already renamed by their planned name, size and
+modification time, which a rename keeps.
+"""
+import json
+import os
+import threading
+
+from rename_journal import last_record
+
+# Bumped whenever the checkpoint layout changes
+CHECKPOINT_FORMAT_VERSION = 1
+
+# Planned files are flushed to disk this many at a time
+CHECKPOINT_FLUSH_INTERVAL = 100
+
+
+class RunCheckpoint:
+    """Append-only JSON lines file: a header with the run's settings, then one line per planned file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.folder = None
+        self.title_preference = None
+        self.scan_options = {}
+        self.finished = False
+        # Planned entries by source and by target
+        self.planned = {}
+        self.renamed = {}
+        self.file = None
+        self.unflushed = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        checkpoint = cls(path)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn by a crash
+                    continue
+                op = record.get("op")
+                if op == "begin":
+                    if record.get("version") != CHECKPOINT_FORMAT_VERSION:
+                        raise ValueError(f"Unsupported checkpoint version: {record.get('version')}")
+                    checkpoint.folder = record["folder"]
+                    checkpoint.title_preference = record["title_preference"]
+                    checkpoint.scan_options = record["scan_options"]
+                elif op == "planned":
+                    entry = record["entry"]
+                    checkpoint.planned[entry["source"]] = entry
+                    checkpoint.renamed[entry["target"]] = entry
+                elif op == "end":
+                    checkpoint.finished = True
+        if checkpoint.folder is None:
+            raise ValueError(f"Not a run checkpoint: {path}")
+        return checkpoint
+
+    def start(self, folder, title_preference, scan_options):
+        """Begin a new checkpoint, replacing the one at `path`."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.folder = os.path.abspath(folder)
+        self.title_preference = title_preference
+        self.scan_options = dict(scan_options or {})
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.write({"op": "begin", "version": CHECKPOINT_FORMAT_VERSION, "folder": self.folder,
+                    "title_preference": title_preference, "scan_options": self.scan_options}, flush=True)
+
+    def reopen(self):
+        """Carry on appending to a loaded checkpoint."""
+        self.file = open(self.path, "a", encoding="utf-8")
+        # A crash can leave the last line half written
+        self.write({"op": "resumed"}, flush=True, newline_first=True)
+
+    def write(self, record, flush=False, newline_first=False):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.file.write("\n" + line if newline_first else line)
+            self.unflushed += 1
+            if flush or self.unflushed >= CHECKPOINT_FLUSH_INTERVAL:
+                self.file.flush()
+                self.unflushed = 0
+
+    def add(self, entry):
+        self.write({"op": "planned", "entry": entry})
+
+    def lookup(self, folder, path):
+        """The checkpointed entry for the file at `path`, or None if it has to be planned afresh.
+
+        A file still under its old name comes back as status "planned"; a file found under its
+        planned name as status "renamed". Either only if size and modification time still match.
+        """
+        entry = self.planned.get(path)
+        status = "planned"
+        if entry is None:
+            entry = self.renamed.get(path)
+            status = "renamed"
+            if entry is None or os.path.lexists(os.path.join(folder, entry["source"])):
+                return None
+        try:
+            file_stat = os.stat(os.path.join(folder, path))
+        except OSError:
+            return None
+        if (file_stat.st_size, file_stat.st_mtime_ns) != (entry.get("size"), entry.get("mtime_ns")):
+            return None
+        return dict(entry, status=status)
+
+    def finish(self):
+        self.write({"op": "end"}, flush=True)
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self.file is not None and not self.file.closed:
+                self.file.close()
+
+
+def unfinished_checkpoint(path):
+    """The checkpoint at `path` if its run was interrupted, else None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        # A finished run says so last; only an interrupted one is read in full
+        record = last_record(path)
+        if record is not None and record.get("op") == "end":
+            return None
+        checkpoint = RunCheckpoint.load(path)
+    except (OSError, ValueError):
+        return None
+    return None if checkpoint.finished else checkpoint
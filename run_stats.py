@@ -0,0 +1,147 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Prefix of every metric in the Prometheus textfile report
+METRIC_PREFIX = "anime_renamer_last_run"
+
+
+class RunStats:
+    """Thread-safe counters and per-stage timings for one run.
+
+    Stage time is summed over every call, so stages run on a thread pool can add up to more
+    than the wall-clock time of the run.
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.stage_seconds = Counter()
+        self.stage_calls = Counter()
+        self.started = time.perf_counter()
+        self.finished_at = time.time()
+        self.elapsed = None
+        self.tracked = []
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            self.stage_seconds[stage] += seconds
+            self.stage_calls[stage] += 1
+
+    @contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.counters), Counter(self.stage_seconds), Counter(self.stage_calls)
+
+    def track(self, other):
+        """Include whatever `other` (e.g. a shared resolver's stats) records until finish()."""
+        self.tracked.append((other, other.snapshot()))
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        self.finished_at = time.time()
+        for other, (counters, seconds, calls) in self.tracked:
+            now_counters, now_seconds, now_calls = other.snapshot()
+            with self._lock:
+                self.counters.update(now_counters - counters)
+                self.stage_seconds.update(now_seconds - seconds)
+                self.stage_calls.update(now_calls - calls)
+        self.tracked = []
+        return self
+
+    def to_dict(self):
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+        files = self.counters["files"]
+        return {
+            "seconds": round(elapsed, 3),
+            "files_per_second": round(files / elapsed, 1) if elapsed else None,
+            "counters": dict(sorted(self.counters.items())),
+            "stages": {
+                stage: {"seconds": round(self.stage_seconds[stage], 4), "calls": self.stage_calls[stage]}
+                for stage in sorted(self.stage_seconds)
+            },
+        }
+
+    def report_lines(self):
+        data = self.to_dict()
+        counters = data["counters"]
+        lines = [
+            f"📊 {counters.get('files', 0)} files in {data['seconds']} s ({data['files_per_second']} files/s)",
+            "    " + ", ".join(f"{name} {value}" for name, value in counters.items() if name != "files"),
+        ]
+        # Slowest stages first
+        for stage, timing in sorted(data["stages"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"    {stage}: {timing['seconds']} s over {timing['calls']} calls")
+        return lines
+
+    def to_prometheus(self):
+        data = self.to_dict()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_seconds Wall-clock duration of the last run.",
+            f"# TYPE {METRIC_PREFIX}_seconds gauge",
+            f"{METRIC_PREFIX}_seconds {data['seconds']}",
+            f"# HELP {METRIC_PREFIX}_files_per_second Files processed per second in the last run.",
+            f"# TYPE {METRIC_PREFIX}_files_per_second gauge",
+            f"{METRIC_PREFIX}_files_per_second {data['files_per_second'] or 0}",
+            f"# HELP {METRIC_PREFIX}_timestamp_seconds When the last run finished.",
+            f"# TYPE {METRIC_PREFIX}_timestamp_seconds gauge",
+            f"{METRIC_PREFIX}_timestamp_seconds {self.finished_at:.3f}",
+            f"# HELP {METRIC_PREFIX}_count Counters recorded during the last run.",
+            f"# TYPE {METRIC_PREFIX}_count gauge",
+        ]
+        lines += [f'{METRIC_PREFIX}_count{{counter="{name}"}} {value}' for name, value in data["counters"].items()]
+        lines += [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Time spent in each stage during the last run.",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds gauge",
+        ]
+        lines += [f'{METRIC_PREFIX}_stage_seconds{{stage="{stage}"}} {timing["seconds"]}'
+                  for stage, timing in data["stages"].items()]
+        lines += [
+            f"# HELP {METRIC_PREFIX}_stage_calls Calls of each stage during the last run.",
+            f"# TYPE {METRIC_PREFIX}_stage_calls gauge",
+        ]
+        lines += [f'{METRIC_PREFIX}_stage_calls{{stage="{stage}"}} {timing["calls"]}'
+                  for stage, timing in data["stages"].items()]
+        return "\n".join(lines) + "\n"
+
+
+def write_report(path, stats):
+    """Write `stats` as a Prometheus textfile when `path` ends in .prom, as JSON otherwise."""
+    if path.endswith(".prom"):
+        content = stats.to_prometheus()
+    else:
+        content = json.dumps(stats.to_dict(), indent=2) + "\n"
+    # Written under a temporary name so collectors never read half a report
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+def run_profiled(profile_path, func, *args, **kwargs):
+    """Call func(*args, **kwargs), under cProfile when `profile_path` is set.
+
+    Only the calling thread is profiled; lookups on the thread pool show up as waits.
+    """
+    if not profile_path:
+        return func(*args, **kwargs)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(profile_path)
@@ -0,0 +1,73 @@
+from title_cache import TitleCache
+from title_resolver import TitleResolver
+
+
+class Response:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def page(*titles):
+    return {"media": [{"title": {"romaji": title, "english": title}, "synonyms": []} for title in titles]}
+
+
+def quiet(*args, **kwargs):
+    pass
+
+
+def resolver_answering(tmp_path, monkeypatch, batch_response, single_pages):
+    """A resolver whose AniList gives `batch_response` to the aliased query and `single_pages` to single searches."""
+    resolver = TitleResolver(TitleCache(str(tmp_path / "cache.sqlite3")), log=quiet)
+    searches = []
+
+    def post_anilist(query_graphql, variables):
+        if "search" not in variables:
+            return batch_response
+        searches.append(variables["search"])
+        return Response(200, {"data": {"Page": single_pages.get(variables["search"])}})
+
+    monkeypatch.setattr(resolver, "post_anilist", post_anilist)
+    return resolver, searches
+
+
+def test_only_failed_aliases_are_looked_up_again(tmp_path, monkeypatch):
+    batch = Response(404, {
+        "data": {"a0": page("Naruto"), "a1": None, "a2": None},
+        "errors": [{"status": 500, "path": ["a1"]}, {"status": 404, "path": ["a2"]}],
+    })
+    resolver, searches = resolver_answering(tmp_path, monkeypatch, batch, {"Bleach": page("Bleach")})
+    try:
+        results = resolver.get_anime_titles_anilist(["Naruto", "Bleach", "Unknown"], "english")
+        assert results == {"Naruto": "Naruto", "Bleach": "Bleach", "Unknown": None}
+        # Unknown was simply not found, so only Bleach is searched on its own
+        assert searches == ["Bleach"]
+        assert resolver.cache.get("anilist", "Unknown", "english") is None
+        assert resolver.cache.get("anilist", "Naruto", "english") == "Naruto"
+    finally:
+        resolver.close()
+
+
+def test_error_without_a_path_retries_every_missing_alias(tmp_path, monkeypatch):
+    batch = Response(200, {"data": {"a0": page("Naruto"), "a1": None}, "errors": [{"status": 500}]})
+    resolver, searches = resolver_answering(tmp_path, monkeypatch, batch, {"Bleach": page("Bleach")})
+    try:
+        assert resolver.get_anime_titles_anilist(["Naruto", "Bleach"], "english") == {"Naruto": "Naruto",
+                                                                                     "Bleach": "Bleach"}
+        assert searches == ["Bleach"]
+    finally:
+        resolver.close()
+
+
+def test_failed_batch_falls_back_to_single_searches(tmp_path, monkeypatch):
+    pages = {"Naruto": page("Naruto"), "Bleach": page("Bleach")}
+    resolver, searches = resolver_answering(tmp_path, monkeypatch, Response(500, {}), pages)
+    try:
+        assert resolver.get_anime_titles_anilist(["Naruto", "Bleach"], "english") == {"Naruto": "Naruto",
+                                                                                     "Bleach": "Bleach"}
+        assert sorted(searches) == ["Bleach", "Naruto"]
+    finally:
+        resolver.close()
@@ -0,0 +1,75 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from duplicate_finder import HASH_CHUNK_BYTES, DuplicateFinder, HashIndex
+
+# Longer than the two ends the partial hash reads
+LARGE = 3 * HASH_CHUNK_BYTES
+
+
+def write(folder, name, data):
+    (folder / name).write_bytes(data)
+
+
+def items(folder, *names):
+    result = []
+    for name in names:
+        file_stat = os.stat(folder / name)
+        result.append((name, (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)))
+    return result
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def test_large_copies_across_batches(tmp_path, pool):
+    data = os.urandom(LARGE)
+    for name in ("A.mkv", "B.mkv", "C.mkv"):
+        write(tmp_path, name, data)
+    finder = DuplicateFinder(str(tmp_path))
+    assert finder.find(items(tmp_path, "A.mkv", "B.mkv"), pool) == {"B.mkv": "A.mkv"}
+    assert finder.find(items(tmp_path, "C.mkv"), pool) == {"C.mkv": "A.mkv"}
+
+
+def test_large_copy_of_an_original_that_had_a_lookalike(tmp_path, pool):
+    data = os.urandom(LARGE)
+    # Same size and same ends as A, different middle
+    lookalike = data[:HASH_CHUNK_BYTES] + os.urandom(HASH_CHUNK_BYTES) + data[-HASH_CHUNK_BYTES:]
+    write(tmp_path, "A.mkv", data)
+    write(tmp_path, "X.mkv", lookalike)
+    write(tmp_path, "Y.mkv", data)
+    finder = DuplicateFinder(str(tmp_path))
+    assert finder.find(items(tmp_path, "A.mkv", "X.mkv"), pool) == {}
+    assert finder.find(items(tmp_path, "Y.mkv"), pool) == {"Y.mkv": "A.mkv"}
+
+
+def test_copy_of_a_file_first_seen_alone(tmp_path, pool):
+    data = os.urandom(LARGE)
+    write(tmp_path, "A.mkv", data)
+    write(tmp_path, "B.mkv", data)
+    write(tmp_path, "small.webm", b"small")
+    write(tmp_path, "small copy.webm", b"small")
+    finder = DuplicateFinder(str(tmp_path))
+    assert finder.find(items(tmp_path, "A.mkv", "small.webm"), pool) == {}
+    assert finder.find(items(tmp_path, "B.mkv", "small copy.webm"), pool) == {
+        "B.mkv": "A.mkv", "small copy.webm": "small.webm",
+    }
+
+
+def test_hashes_are_reused_from_the_index(tmp_path, pool):
+    data = os.urandom(LARGE)
+    write(tmp_path, "A.mkv", data)
+    write(tmp_path, "B.mkv", data)
+    index = HashIndex(str(tmp_path / "hashes.sqlite3"))
+    try:
+        DuplicateFinder(str(tmp_path), index).find(items(tmp_path, "A.mkv", "B.mkv"), pool)
+        key = items(tmp_path, "A.mkv")[0][1]
+        partial, full = index.get(key)
+        assert partial is not None and full is not None
+    finally:
+        index.close()
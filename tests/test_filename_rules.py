@@ -0,0 +1,45 @@
+import re
+
+import pytest
+
+from filename_rules import FILENAME_RULES, MAL_SEARCH_RULES, FilenameNormalizer
+
+FILENAMES = [
+    "Naruto OP1",
+    "naruto - ED2",
+    "Attack on Titan S3Part2 op5 [1080p]",
+    "Bleach S2 ED10 (NCED)",
+    "Shingeki no Kyojin S4 OP7 v2",
+    "Re:Zero OP3",
+    "Fate/Zero ED1",
+    "NarutoOpening 2",
+    "Hunter-x-Hunter OP4 Creditless",
+    "Made in Abyss S1ED1",
+    "Kaguya-sama S3 ED2 - Heart",
+    "Steins;Gate OP",
+    "",
+]
+
+SEARCH_TITLES = ["AttackOnTitan S3Part2", "Bleach S2", "MyHeroAcademia", "Made in Abyss S1", "JoJo"]
+
+
+def apply_one_by_one(rules, text):
+    """The plain re.sub chain the rule tables replaced."""
+    for _, pattern, replacement, flags in rules:
+        text = re.sub(pattern, replacement, text, flags=flags)
+    return text
+
+
+@pytest.mark.parametrize("filename", FILENAMES)
+def test_filename_rules_match_the_re_sub_chain(filename):
+    assert FilenameNormalizer(FILENAME_RULES).normalize(filename) == apply_one_by_one(FILENAME_RULES, filename)
+
+
+@pytest.mark.parametrize("title", SEARCH_TITLES)
+def test_search_rules_match_the_re_sub_chain(title):
+    assert FilenameNormalizer(MAL_SEARCH_RULES).normalize(title) == apply_one_by_one(MAL_SEARCH_RULES, title)
+
+
+def test_merged_rules_need_the_same_flags():
+    with pytest.raises(ValueError):
+        FilenameNormalizer([("group", "a", "b", 0), ("group", "c", "d", re.IGNORECASE)])
@@ -0,0 +1,33 @@
+from folder_watcher import FolderWatcher, ProcessedIndex
+
+
+class ChangedOnce:
+    """Change source reporting the top folder as changed on the first wait only."""
+
+    def __init__(self):
+        self.changed = {""}
+
+    def wait(self, timeout):
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def close(self):
+        pass
+
+
+def test_file_recorded_while_settling_is_not_handed_out(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    (folder / "Naruto Opening 1.webm").touch()
+    (folder / "Naruto OP2.webm").touch()
+    processed = ProcessedIndex(str(tmp_path / "processed.sqlite3"))
+    watcher = FolderWatcher(str(folder), {}, processed, source=ChangedOnce(), settle_seconds=0)
+    try:
+        assert watcher.poll(0) == []
+        # The run in progress renames a file to this name and records it before it settles
+        processed.record(str(folder), [{"status": "renamed", "source": "Naruto OP1.webm",
+                                        "target": "Naruto Opening 1.webm"}])
+        assert watcher.poll(0) == ["Naruto OP2.webm"]
+    finally:
+        watcher.close()
+        processed.close()
@@ -0,0 +1,96 @@
+import os
+import struct
+
+import media_probe
+from media_probe import MetadataCache, MetadataProbe, read_title
+
+
+def element(element_id, payload):
+    """An EBML element with an 8-byte size."""
+    encoded_id = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return encoded_id + b"\x01" + len(payload).to_bytes(7, "big") + payload
+
+
+def matroska(title, unknown_size=False):
+    header = element(0x1A45DFA3, element(0x4282, b"matroska"))
+    info = element(0x1549A966, element(0x2AD7B1, (1000000).to_bytes(3, "big"))
+                   + (element(0x7BA9, title.encode()) if title else b""))
+    body = element(0x114D9B74, b"\0" * 20) + element(0xEC, b"\0" * 1000) + info + element(0x1F43B675, b"\0" * 5000)
+    size = b"\x01\xff\xff\xff\xff\xff\xff\xff" if unknown_size else b"\x01" + len(body).to_bytes(7, "big")
+    return header + (0x18538067).to_bytes(4, "big") + size + body
+
+
+def box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def mp4(title, full_box_meta=True, moov_last=True):
+    data = box(b"data", struct.pack(">II", 1, 0) + title.encode())
+    meta = box(b"meta", (b"\0\0\0\0" if full_box_meta else b"") + box(b"hdlr", b"\0" * 25)
+               + box(b"ilst", box(b"\xa9nam", data)))
+    moov = box(b"moov", box(b"mvhd", b"\0" * 100) + box(b"trak", b"\0" * 3000) + box(b"udta", meta))
+    mdat = box(b"mdat", b"\0" * 20000)
+    return box(b"ftyp", b"isom\0\0\0\0") + (mdat + moov if moov_last else moov + mdat)
+
+
+def quicktime(title):
+    encoded = title.encode()
+    udta = box(b"udta", box(b"\xa9nam", struct.pack(">HH", len(encoded), 0) + encoded))
+    return box(b"ftyp", b"qt  \0\0\0\0") + box(b"moov", udta)
+
+
+def chunk(chunk_id, payload):
+    return struct.pack("<4sI", chunk_id, len(payload)) + payload + (b"\0" if len(payload) & 1 else b"")
+
+
+def avi(title):
+    info = chunk(b"LIST", b"INFO" + chunk(b"INAM", title.encode() + b"\0"))
+    body = b"AVI " + chunk(b"LIST", b"hdrl" + b"\0" * 101) + info + chunk(b"LIST", b"movi" + b"\0" * 1000)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def write(folder, name, data):
+    path = folder / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_matroska_title(tmp_path):
+    assert read_title(write(tmp_path, "a.mkv", matroska("Naruto OP1"))) == "Naruto OP1"
+    # Live recordings leave the segment size unknown
+    assert read_title(write(tmp_path, "b.webm", matroska("Bleach ED2", unknown_size=True))) == "Bleach ED2"
+    assert read_title(write(tmp_path, "c.mkv", matroska(None))) is None
+
+
+def test_mp4_title(tmp_path):
+    assert read_title(write(tmp_path, "a.mp4", mp4("Bleach ED2"))) == "Bleach ED2"
+    # Some muxers write "meta" as a plain box and put "moov" before the media data
+    plain = mp4("Bleach ED3", full_box_meta=False, moov_last=False)
+    assert read_title(write(tmp_path, "b.mp4", plain)) == "Bleach ED3"
+    assert read_title(write(tmp_path, "c.mov", quicktime("Naruto ED1"))) == "Naruto ED1"
+
+
+def test_avi_title(tmp_path):
+    assert read_title(write(tmp_path, "a.avi", avi("Naruto OP2 creditless"))) == "Naruto OP2 creditless"
+
+
+def test_damaged_headers_have_no_title(tmp_path):
+    assert read_title(write(tmp_path, "a.mp4", b"garbage" * 10)) is None
+    assert read_title(write(tmp_path, "b.mkv", b"\x1a\x45\xdf\xa3\xff")) is None
+    assert read_title(write(tmp_path, "c.avi", b"")) is None
+
+
+def test_probe_reads_each_file_once(tmp_path, monkeypatch):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    write(folder, "a.mkv", matroska("Naruto OP1"))
+    write(folder, "b.mkv", b"")
+    files = [(name, os.stat(folder / name).st_size, os.stat(folder / name).st_mtime_ns) for name in ("a.mkv", "b.mkv")]
+    probe = MetadataProbe(MetadataCache(str(tmp_path / "metadata.sqlite3")))
+    try:
+        assert probe.titles(str(folder), files) == {"a.mkv": "Naruto OP1", "b.mkv": None}
+        # Titles, and files without one, now come from the cache
+        monkeypatch.setattr(media_probe, "read_title", lambda path: "read again")
+        assert probe.titles(str(folder), files) == {"a.mkv": "Naruto OP1", "b.mkv": None}
+    finally:
+        probe.close()
@@ -0,0 +1,70 @@
+import rate_limit
+from rate_limit import RateLimit, TokenBucket, retry_after_seconds, send_with_backoff
+from run_stats import RunStats
+
+
+class Clock:
+    """Stands in for the time module; sleeping only moves the clock on."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def fake_clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def answers(*responses):
+    pending = list(responses)
+    return lambda: pending.pop(0)
+
+
+def test_bucket_waits_once_its_burst_is_spent(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    bucket = TokenBucket(2, 1, burst=2)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.slept == []
+    bucket.acquire()
+    assert sum(clock.slept) == 0.5
+
+
+def test_retry_after_holds_back_the_next_request(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    limit = RateLimit(TokenBucket(100, 1, burst=5))
+    stats = RunStats()
+    send = answers(Response(429, {"Retry-After": "7"}), Response(200))
+    response = send_with_backoff(limit, send, stats=stats)
+    assert response.status_code == 200
+    assert sum(clock.slept) >= 7
+    assert stats.counters["responses_429"] == 1
+    assert stats.counters["retries"] == 1
+
+
+def test_retry_after_falls_back_to_the_default():
+    assert retry_after_seconds(Response(429, {"Retry-After": "2.5"}), 9) == 2.5
+    assert retry_after_seconds(Response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}), 9) == 9
+    assert retry_after_seconds(Response(429), 9) == 9
+
+
+def test_server_errors_are_retried_until_the_last_answer(monkeypatch):
+    fake_clock(monkeypatch)
+    limit = RateLimit(TokenBucket(100, 1, burst=5))
+    send = answers(Response(503), Response(502), Response(500))
+    assert send_with_backoff(limit, send, retries=2).status_code == 500
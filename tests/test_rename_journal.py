@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+
+from rename_journal import TEMP_SUFFIX, execute_plan, resume_journal, undo_journal, unfinished_journal
+
+def quiet(*args, **kwargs):
+    pass
+
+
+def make_files(folder, names):
+    for name in names:
+        (folder / name).write_text(name, encoding="utf-8")
+
+
+def contents(folder):
+    return {path.name: path.read_text(encoding="utf-8") for path in folder.iterdir() if path.is_file()}
+
+
+def plan(*renames):
+    return [{"source": source, "target": target, "status": "planned"} for source, target in renames]
+
+
+def test_swap(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    make_files(folder, ["A.mkv", "B.mkv"])
+    entries = plan(("A.mkv", "B.mkv"), ("B.mkv", "A.mkv"))
+    assert execute_plan(str(folder), entries, str(tmp_path / "journal.jsonl"), quiet) == 0
+    assert contents(folder) == {"A.mkv": "B.mkv", "B.mkv": "A.mkv"}
+    assert [entry["status"] for entry in entries] == ["renamed", "renamed"]
+
+
+def test_chain(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    make_files(folder, ["A.mkv", "B.mkv"])
+    # B has to move out of the way before A can take its name
+    entries = plan(("A.mkv", "B.mkv"), ("B.mkv", "C.mkv"))
+    assert execute_plan(str(folder), entries, str(tmp_path / "journal.jsonl"), quiet) == 0
+    assert contents(folder) == {"B.mkv": "A.mkv", "C.mkv": "B.mkv"}
+
+
+def test_same_target_is_held_back(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    make_files(folder, ["A.mkv", "B.mkv"])
+    entries = plan(("A.mkv", "C.mkv"), ("B.mkv", "C.mkv"))
+    assert execute_plan(str(folder), entries, str(tmp_path / "journal.jsonl"), quiet) == 2
+    assert [entry["status"] for entry in entries] == ["conflict", "conflict"]
+    assert contents(folder) == {"A.mkv": "A.mkv", "B.mkv": "B.mkv"}
+
+
+def test_existing_target_is_held_back(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    make_files(folder, ["A.mkv", "B.mkv", "C.mkv"])
+    # C keeps its name, so A cannot move to it, nor B into A's name
+    entries = plan(("A.mkv", "C.mkv"), ("B.mkv", "A.mkv"))
+    assert execute_plan(str(folder), entries, str(tmp_path / "journal.jsonl"), quiet) == 2
+    assert [entry["status"] for entry in entries] == ["conflict", "conflict"]
+    assert contents(folder) == {"A.mkv": "A.mkv", "B.mkv": "B.mkv", "C.mkv": "C.mkv"}
+
+
+def test_resume_after_stop(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    make_files(folder, ["1.mkv", "2.mkv", "3.mkv"])
+    journal_path = str(tmp_path / "journal.jsonl")
+    stop = threading.Event()
+    entries = plan(("1.mkv", "one.mkv"), ("2.mkv", "two.mkv"), ("3.mkv", "three.mkv"))
+    execute_plan(str(folder), entries, journal_path, quiet, progress=lambda done: stop.set(), stop=stop)
+    assert unfinished_journal(journal_path) is not None
+    assert resume_journal(journal_path, quiet) == (str(folder), 0)
+    assert unfinished_journal(journal_path) is None
+    assert contents(folder) == {"one.mkv": "1.mkv", "two.mkv": "2.mkv", "three.mkv": "3.mkv"}
+
+
+def test_resume_ring_cut_off_before_sync(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    make_files(folder, ["A.mkv", "B.mkv"])
+    parked = "A.mkv.1" + TEMP_SUFFIX
+    journal_path = tmp_path / "journal.jsonl"
+    records = [
+        {"op": "begin", "version": 1, "folder": str(folder), "steps": 3, "time": 0},
+        {"op": "step", "from": "A.mkv", "to": parked, "file": "A.mkv"},
+        {"op": "step", "from": "B.mkv", "to": "A.mkv", "file": "B.mkv"},
+        {"op": "step", "from": parked, "to": "B.mkv", "file": "A.mkv"},
+    ]
+    journal_path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    # The first two steps ran, but their "done" records were never synced
+    (folder / "A.mkv").rename(folder / parked)
+    (folder / "B.mkv").rename(folder / "A.mkv")
+    assert resume_journal(str(journal_path), quiet) == (str(folder), 0)
+    assert contents(folder) == {"A.mkv": "B.mkv", "B.mkv": "A.mkv"}
+
+
+def test_undo_restores_the_originals(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    make_files(folder, ["A.mkv", "B.mkv", "Naruto OP1.webm"])
+    journal_path = str(tmp_path / "journal.jsonl")
+    entries = plan(("A.mkv", "B.mkv"), ("B.mkv", "A.mkv"), ("Naruto OP1.webm", "Naruto Opening 1.webm"))
+    execute_plan(str(folder), entries, journal_path, quiet)
+    assert undo_journal(journal_path, quiet) == (str(folder), 0)
+    assert contents(folder) == {"A.mkv": "A.mkv", "B.mkv": "B.mkv", "Naruto OP1.webm": "Naruto OP1.webm"}
+    assert unfinished_journal(journal_path) is None
+
+
+def test_nothing_to_rename_keeps_the_journal(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    make_files(folder, ["A.mkv", "B.mkv"])
+    journal_path = tmp_path / "journal.jsonl"
+    execute_plan(str(folder), plan(("A.mkv", "one.mkv")), str(journal_path), quiet)
+    before = journal_path.read_text(encoding="utf-8")
+    assert execute_plan(str(folder), plan(("B.mkv", "one.mkv")), str(journal_path), quiet) == 1
+    assert journal_path.read_text(encoding="utf-8") == before
+
+
+def test_appended_batches_are_undone_together(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    make_files(folder, ["1.mkv", "2.mkv"])
+    journal_path = str(tmp_path / "journal.jsonl")
+    since = time.time()
+    execute_plan(str(folder), plan(("1.mkv", "one.mkv")), journal_path, quiet, append_since=since)
+    # The second batch renames the first one's file again
+    execute_plan(str(folder), plan(("one.mkv", "uno.mkv"), ("2.mkv", "two.mkv")), journal_path, quiet,
+                 append_since=since)
+    assert contents(folder) == {"uno.mkv": "1.mkv", "two.mkv": "2.mkv"}
+    assert undo_journal(journal_path, quiet) == (str(folder), 0)
+    assert contents(folder) == {"1.mkv": "1.mkv", "2.mkv": "2.mkv"}
+
+
+def test_journal_from_before_is_replaced(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    make_files(folder, ["1.mkv", "2.mkv"])
+    journal_path = str(tmp_path / "journal.jsonl")
+    execute_plan(str(folder), plan(("1.mkv", "one.mkv")), journal_path, quiet)
+    execute_plan(str(folder), plan(("2.mkv", "two.mkv")), journal_path, quiet, append_since=time.time() + 1)
+    undo_journal(journal_path, quiet)
+    assert contents(folder) == {"one.mkv": "1.mkv", "2.mkv": "2.mkv"}
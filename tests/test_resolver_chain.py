@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import resolver_chain
+from resolver_chain import BackendHealth, backend_chain
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+def stub_resolver(index=None):
+    return SimpleNamespace(index=index, health={"anilist": BackendHealth(), "jikan": BackendHealth()})
+
+
+def names(chain):
+    return [backend.name for backend in chain]
+
+
+def test_circuit_opens_after_repeated_failures_and_closes_on_success(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resolver_chain, "time", clock)
+    health = BackendHealth(failure_threshold=3, reset_seconds=30)
+    assert not health.record(1.0, False)
+    assert not health.record(1.0, False)
+    assert health.record(1.0, False)
+    assert not health.available()
+    # Still failing while open does not count as opening it again
+    assert not health.record(1.0, False)
+    clock.now += 30
+    assert health.available()
+    # The first request after the pause decides; a failure opens the circuit right away
+    assert health.record(1.0, False)
+    clock.now += 30
+    health.record(1.0, True)
+    assert health.consecutive_failures == 0
+    assert health.available()
+
+
+def test_priority_puts_that_api_first():
+    resolver = stub_resolver()
+    assert names(backend_chain(resolver, "anilist")) == ["cache", "anilist", "mal"]
+    assert names(backend_chain(resolver, "mal")) == ["cache", "mal", "anilist"]
+    assert names(backend_chain(stub_resolver(index=object()), "mal")) == ["cache", "index", "mal", "anilist"]
+
+
+def test_auto_orders_by_expected_cost_per_title():
+    resolver = stub_resolver()
+    # Neither API has a track record yet
+    assert names(backend_chain(resolver, "auto")) == ["cache", "anilist", "mal"]
+    # AniList answers ten titles per request, so it stays first despite being slower
+    resolver.health["anilist"].record(2.0, True)
+    resolver.health["jikan"].record(0.5, True)
+    assert names(backend_chain(resolver, "auto")) == ["cache", "anilist", "mal"]
+    for _ in range(10):
+        resolver.health["anilist"].record(30.0, False)
+    assert names(backend_chain(resolver, "auto")) == ["cache", "mal"]
+
+
+def test_auto_prefers_mal_once_anilist_is_slow():
+    resolver = stub_resolver()
+    resolver.health["anilist"].record(20.0, True)
+    resolver.health["jikan"].record(0.5, True)
+    assert names(backend_chain(resolver, "auto")) == ["cache", "mal", "anilist"]
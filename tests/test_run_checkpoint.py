@@ -0,0 +1,28 @@
+from run_checkpoint import RunCheckpoint, unfinished_checkpoint
+
+
+def write_checkpoint(path, folder, finish):
+    checkpoint = RunCheckpoint(str(path))
+    checkpoint.start(str(folder), "english", {})
+    checkpoint.add({"source": "Naruto OP1.webm", "target": "Naruto Opening 1.webm", "size": 0, "mtime_ns": 0})
+    if finish:
+        checkpoint.finish()
+    else:
+        checkpoint.close()
+
+
+def test_finished_run_is_not_unfinished(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    write_checkpoint(path, tmp_path, finish=True)
+    assert unfinished_checkpoint(str(path)) is None
+
+
+def test_interrupted_run_is_loaded(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    write_checkpoint(path, tmp_path, finish=False)
+    # Torn by a crash while the next entry was written
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "plan')
+    checkpoint = unfinished_checkpoint(str(path))
+    assert checkpoint is not None
+    assert list(checkpoint.planned) == ["Naruto OP1.webm"]
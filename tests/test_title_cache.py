@@ -0,0 +1,66 @@
+import title_cache
+from title_cache import MISS, TitleCache
+
+
+class Clock:
+    """Stands in for the time module, so entries can be aged without waiting."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def open_cache(tmp_path, monkeypatch, **options):
+    clock = Clock()
+    monkeypatch.setattr(title_cache, "time", clock)
+    return TitleCache(str(tmp_path / "cache.sqlite3"), **options), clock
+
+
+def test_entries_expire_after_their_ttl(tmp_path, monkeypatch):
+    cache, clock = open_cache(tmp_path, monkeypatch, ttl=100, negative_ttl=10)
+    try:
+        cache.put("anilist", "Naruto", "english", "Naruto")
+        cache.put("anilist", "Unknown", "english", None)
+        assert cache.get("anilist", "  NARUTO ", "english") == "Naruto"
+        # A "not found" answer is cached too, and goes stale sooner
+        assert cache.get("anilist", "Unknown", "english") is None
+        clock.now += 11
+        assert cache.get("anilist", "Unknown", "english") is MISS
+        assert cache.get("anilist", "Naruto", "english") == "Naruto"
+        clock.now += 90
+        assert cache.get("anilist", "Naruto", "english") is MISS
+        assert len(cache) == 0
+    finally:
+        cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    cache, clock = open_cache(tmp_path, monkeypatch, max_entries=2)
+    try:
+        cache.put("anilist", "Naruto", "english", "Naruto")
+        clock.now += 1
+        cache.put("anilist", "Bleach", "english", "Bleach")
+        clock.now += 1
+        # Looking Naruto up makes Bleach the least recently used
+        cache.get("anilist", "Naruto", "english")
+        clock.now += 1
+        cache.put("anilist", "AOT", "english", "Attack on Titan")
+        assert len(cache) == 2
+        assert cache.get("anilist", "Bleach", "english") is MISS
+        assert cache.get("anilist", "Naruto", "english") == "Naruto"
+    finally:
+        cache.close()
+
+
+def test_entries_survive_reopening(tmp_path, monkeypatch):
+    cache, _ = open_cache(tmp_path, monkeypatch)
+    cache.put("jikan", "Naruto", "romaji", "Naruto")
+    cache.close()
+    cache = TitleCache(str(tmp_path / "cache.sqlite3"))
+    try:
+        assert cache.get("jikan", "Naruto", "romaji") == "Naruto"
+        assert cache.get("jikan", "Naruto", "english") is MISS
+    finally:
+        cache.close()
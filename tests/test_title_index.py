@@ -0,0 +1,50 @@
+import json
+
+from renamer_core import create_resolver, rename_plan
+from title_index import TitleIndex, build_index
+
+DUMP = [
+    {"title": {"romaji": "Shingeki no Kyojin", "english": "Attack on Titan"}, "synonyms": ["AoT"]},
+    {"title": {"romaji": "Shingeki no Kyojin Season 2", "english": "Attack on Titan Season 2"}, "synonyms": []},
+    {"title": {"romaji": "Naruto", "english": "Naruto"}, "synonyms": []},
+]
+
+
+def make_index(tmp_path):
+    dump_path = tmp_path / "dump.json"
+    dump_path.write_text(json.dumps(DUMP), encoding="utf-8")
+    index_path = str(tmp_path / "index.sqlite3")
+    build_index(str(dump_path), index_path)
+    return index_path
+
+
+def test_candidates_include_other_seasons(tmp_path):
+    index = TitleIndex(make_index(tmp_path))
+    try:
+        english = [entry["english"] for entry in index.candidates("Attack on Titan")]
+    finally:
+        index.close()
+    assert english[0] == "Attack on Titan"
+    assert "Attack on Titan Season 2" in english
+
+
+def test_season_marker_picks_that_season(tmp_path):
+    folder = tmp_path / "videos"
+    folder.mkdir()
+    for name in ("Attack on Titan S2 OP1.mkv", "Attack on Titan OP1.mkv"):
+        (folder / name).touch()
+    # Nothing listens on port 9, so any API request would fail; the index has to answer
+    resolver = create_resolver(
+        str(tmp_path / "cache.sqlite3"), log=lambda *args, **kwargs: None, index_path=make_index(tmp_path),
+        anilist_url="http://127.0.0.1:9", jikan_url="http://127.0.0.1:9", retries=0,
+    )
+    try:
+        plan = rename_plan(str(folder), "english", resolver, log=lambda *args, **kwargs: None)
+    finally:
+        resolver.close()
+    targets = {entry["source"]: entry["target"] for entry in plan}
+    assert targets == {
+        "Attack on Titan S2 OP1.mkv": "Attack on Titan Season 2 Opening 1.mkv",
+        "Attack on Titan OP1.mkv": "Attack on Titan Opening 1.mkv",
+    }
+    assert {entry["api"] for entry in plan} == {"index"}
@@ -0,0 +1,51 @@
+from title_match import best_candidate
+
+KONOSUBA = [
+    {"romaji": "Kono Subarashii Sekai ni Shukufuku wo!",
+     "english": "KONOSUBA -God's blessing on this wonderful world!", "synonyms": []},
+    {"romaji": "Kono Subarashii Sekai ni Shukufuku wo! 2",
+     "english": "KONOSUBA -God's blessing on this wonderful world! 2", "synonyms": []},
+]
+
+RE_ZERO = [
+    {"romaji": "Re:Zero kara Hajimeru Isekai Seikatsu",
+     "english": "Re:ZERO -Starting Life in Another World-", "synonyms": []},
+    {"romaji": "Re:Zero kara Hajimeru Isekai Seikatsu 2nd Season",
+     "english": "Re:ZERO -Starting Life in Another World- Season 2", "synonyms": []},
+]
+
+KAGUYA = [
+    {"romaji": "Kaguya-sama wa Kokurasetai: Tensai-tachi no Renai Zunousen",
+     "english": "Kaguya-sama: Love is War", "synonyms": []},
+    {"romaji": "Kaguya-sama wa Kokurasetai? Tensai-tachi no Renai Zunousen",
+     "english": "Kaguya-sama: Love is War?", "synonyms": ["Kaguya-sama wa Kokurasetai 2nd Season"]},
+]
+
+NARUTO = [
+    {"romaji": "Naruto: Shippuuden", "english": "Naruto Shippuden", "synonyms": []},
+    {"romaji": "Naruto", "english": "Naruto", "synonyms": []},
+]
+
+
+def test_abbreviated_query_takes_first_result():
+    candidate, _ = best_candidate("Konosuba", KONOSUBA)
+    assert candidate is KONOSUBA[0]
+
+
+def test_prefix_query_with_season_marker():
+    candidate, _ = best_candidate("Re Zero S2", RE_ZERO)
+    assert candidate is RE_ZERO[1]
+    candidate, _ = best_candidate("Kaguya-sama S2", KAGUYA)
+    assert candidate is KAGUYA[1]
+
+
+def test_exact_name_ranks_above_longer_one():
+    candidate, score = best_candidate("Naruto", NARUTO)
+    assert candidate is NARUTO[1]
+    assert score == 1.0
+
+
+def test_unrelated_candidates_are_rejected():
+    candidate, score = best_candidate("Cowboy Bebop", NARUTO)
+    assert candidate is None
+    assert score < 0.7
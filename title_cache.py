@@ -0,0 +1,98 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Resolved titles stay fresh for a month, "not found" answers only for a day
+DEFAULT_TTL = 30 * 24 * 60 * 60
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 20000
+
+# Returned by TitleCache.get when nothing usable is stored (None is a cached negative)
+MISS = object()
+
+
+def normalize_query(query):
+    """Lower-case and collapse whitespace so equivalent searches share a cache key."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class TitleCache:
+    """Persistent SQLite cache of title lookups keyed on (source, query, preference)."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS titles ("
+                " source TEXT NOT NULL,"
+                " query TEXT NOT NULL,"
+                " preference TEXT NOT NULL,"
+                " title TEXT,"
+                " expires REAL NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (source, query, preference))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS titles_last_used ON titles (last_used)")
+
+    def get(self, source, query, preference):
+        key = (source, normalize_query(query), preference)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, expires FROM titles WHERE source = ? AND query = ? AND preference = ?", key
+            ).fetchone()
+            if row is None:
+                return MISS
+            title, expires = row
+            with self._conn:
+                if expires < now:
+                    self._conn.execute("DELETE FROM titles WHERE source = ? AND query = ? AND preference = ?", key)
+                    return MISS
+                self._conn.execute(
+                    "UPDATE titles SET last_used = ? WHERE source = ? AND query = ? AND preference = ?", (now,) + key
+                )
+        return title
+
+    def put(self, source, query, preference, title):
+        now = time.time()
+        expires = now + (self.ttl if title else self.negative_ttl)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO titles (source, query, preference, title, expires, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (source, normalize_query(query), preference, title, expires, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM titles WHERE expires < ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM titles").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM titles WHERE rowid IN (SELECT rowid FROM titles ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM titles")
+        with self._lock:
+            self._conn.execute("VACUUM")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
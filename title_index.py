@@ -0,0 +1,208 @@
+"""Offline title index built from a JSON or CSV dump of AniList/MAL entries.
+
+Build one with: python -m renamer_core --build-index DUMP.json|DUMP.csv [--index INDEX.sqlite3]
+"""
+import csv
+import json
+import math
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+
+# Bumped whenever the index layout changes; older indexes must be rebuilt
+INDEX_FORMAT_VERSION = 1
+
+# Minimum Dice similarity of two names' trigrams for a fuzzy match to count
+DEFAULT_MIN_SIMILARITY = 0.75
+
+# Entries of each kind (exact, prefix, fuzzy) returned by TitleIndex.candidates
+DEFAULT_CANDIDATE_COUNT = 5
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+# Where several names of one entry are packed into a single CSV cell
+CSV_LIST_SEPARATOR = re.compile(r"\s*[|;]\s*")
+
+
+def name_key(name):
+    """Case, punctuation and spacing insensitive form of a title: "Re:Zero - S2" -> "re zero s2"."""
+    return " ".join(TOKEN_PATTERN.findall(name.casefold()))
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def entry_titles(entry):
+    """(romaji, english, synonyms) from an AniList, Jikan/MAL or flat dump entry."""
+    title = entry.get("title")
+    if isinstance(title, dict):
+        # AniList: {"title": {"romaji", "english", "native"}, "synonyms": [...]}
+        romaji = title.get("romaji")
+        english = title.get("english")
+        synonyms = [title.get("native")] + list(entry.get("synonyms") or [])
+    else:
+        romaji = entry.get("romaji") or title
+        english = entry.get("english") or entry.get("title_english")
+        synonyms = list(entry.get("synonyms") or entry.get("title_synonyms") or [])
+        synonyms.append(entry.get("title_japanese"))
+        # Jikan v4 also lists every title as {"type", "title"}
+        synonyms += [item.get("title") for item in entry.get("titles") or [] if isinstance(item, dict)]
+    return romaji, english, [s for s in synonyms if isinstance(s, str) and s.strip()]
+
+
+def read_dump(path):
+    """Yield (romaji, english, synonyms) for every entry of a JSON or CSV dump."""
+    if path.lower().endswith(".csv"):
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+                synonyms = [s for s in CSV_LIST_SEPARATOR.split(row.get("synonyms", "")) if s]
+                yield row.get("romaji") or row.get("title"), row.get("english") or row.get("title_english"), synonyms
+        return
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("data") or data.get("media") or data.get("entries") or []
+    for entry in data:
+        if isinstance(entry, dict):
+            yield entry_titles(entry)
+
+
+def build_index(dump_path, index_path):
+    """Build an index file from a dump, replacing any index at `index_path`; returns the entry count."""
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = index_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    count = 0
+    try:
+        conn.executescript(
+            "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE titles (id INTEGER PRIMARY KEY, romaji TEXT, english TEXT);"
+            "CREATE TABLE names (id INTEGER PRIMARY KEY, title_id INTEGER NOT NULL, key TEXT NOT NULL,"
+            " trigram_count INTEGER NOT NULL);"
+            "CREATE TABLE trigrams (trigram TEXT NOT NULL, name_id INTEGER NOT NULL,"
+            " PRIMARY KEY (trigram, name_id)) WITHOUT ROWID;"
+            "CREATE TABLE trigram_counts (trigram TEXT PRIMARY KEY, names INTEGER NOT NULL) WITHOUT ROWID;"
+        )
+        name_id = 0
+        for title_id, (romaji, english, synonyms) in enumerate(read_dump(dump_path), 1):
+            if not romaji and not english:
+                continue
+            conn.execute("INSERT INTO titles VALUES (?, ?, ?)", (title_id, romaji, english))
+            count += 1
+            keys = {name_key(name) for name in [romaji, english] + synonyms if name}
+            for key in keys - {""}:
+                name_id += 1
+                key_trigrams = trigrams(key)
+                conn.execute("INSERT INTO names VALUES (?, ?, ?, ?)", (name_id, title_id, key, len(key_trigrams)))
+                conn.executemany("INSERT INTO trigrams VALUES (?, ?)", ((t, name_id) for t in key_trigrams))
+        # Indexed after the bulk insert, which is much faster than keeping them up to date
+        conn.execute("CREATE INDEX names_key ON names (key)")
+        conn.execute("INSERT INTO trigram_counts SELECT trigram, COUNT(*) FROM trigrams GROUP BY trigram")
+        conn.execute("INSERT INTO meta VALUES ('version', ?)", (str(INDEX_FORMAT_VERSION),))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(temp_path, index_path)
+    return count
+
+
+class TitleIndex:
+    """Read-only lookups in an index written by build_index; safe to share between threads."""
+
+    def __init__(self, path, min_similarity=DEFAULT_MIN_SIMILARITY):
+        self.path = path
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        uri = pathlib.Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        try:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.DatabaseError:
+            self._conn.close()
+            raise ValueError(f"Not a title index: {path}")
+        if not row or row[0] != str(INDEX_FORMAT_VERSION):
+            self._conn.close()
+            raise ValueError(f"Unsupported title index version: {row[0] if row else None}")
+
+    def candidates(self, query, limit=DEFAULT_CANDIDATE_COUNT):
+        """Return entries {"romaji", "english", "synonyms"} that may match `query`, likeliest first.
+
+        Entries with the exact name key come first, then those with a longer name starting with
+        it ("attack on titan season 2" for "attack on titan"), then the ones whose names have the
+        most similar trigrams; at most `limit` of each. The synonyms are the names that matched.
+        Choosing among them, seasons included, is left to title_match.best_candidate.
+        """
+        key = name_key(query)
+        if not key:
+            return []
+        matched = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT title_id, key FROM names WHERE key = ? LIMIT ?", (key, limit)).fetchall()
+            # Keys hold only words and single spaces, so "!" is the first character after " "
+            rows += self._conn.execute(
+                "SELECT title_id, key FROM names WHERE key >= ? AND key < ? ORDER BY key LIMIT ?",
+                (key + " ", key + "!", limit),
+            ).fetchall()
+            rows += self._fuzzy_matches(key, limit)
+            for title_id, name in rows:
+                names = matched.setdefault(title_id, [])
+                if name not in names:
+                    names.append(name)
+            entries = []
+            for title_id, names in matched.items():
+                romaji, english = self._conn.execute(
+                    "SELECT romaji, english FROM titles WHERE id = ?", (title_id,)
+                ).fetchone()
+                entries.append({"romaji": romaji, "english": english, "synonyms": names})
+        return entries
+
+    def _fuzzy_matches(self, key, limit):
+        """(title id, name) of the `limit` names whose trigrams are most similar to the key's, best first."""
+        query_trigrams = list(trigrams(key))
+        size = len(query_trigrams)
+        counts = dict(self._conn.execute(
+            f"SELECT trigram, names FROM trigram_counts WHERE trigram IN ({', '.join('?' * size)})", query_trigrams
+        ))
+        # Dice similarity is 2 * shared / (|query| + |name|). A name reaching min_similarity has
+        # between size * s / (2 - s) and size * (2 - s) / s trigrams, shares at least `needed`
+        # of them with the query, and so must contain one of its rarest size - needed + 1.
+        similarity = self.min_similarity
+        needed = max(1, math.ceil(similarity * size / (2 - similarity)))
+        rarest = sorted(query_trigrams, key=lambda t: counts.get(t, 0))[:size - needed + 1]
+        probe = [t for t in rarest if t in counts]
+        if not probe:
+            return []
+        candidates = self._conn.execute(
+            "SELECT DISTINCT n.id, n.title_id, n.key FROM trigrams g JOIN names n ON n.id = g.name_id"
+            f" WHERE g.trigram IN ({', '.join('?' * len(probe))}) AND n.trigram_count BETWEEN ? AND ?"
+            " ORDER BY n.id",
+            probe + [size * similarity / (2 - similarity), size * (2 - similarity) / similarity],
+        )
+        query_set = set(query_trigrams)
+        scored = []
+        for name_id, title_id, name in candidates:
+            name_trigrams = trigrams(name)
+            score = 2.0 * len(query_set & name_trigrams) / (size + len(name_trigrams))
+            if score >= similarity:
+                scored.append((-score, name_id, title_id, name))
+        # Equal scores keep dump order
+        scored.sort()
+        return [(title_id, name) for _, _, title_id, name in scored[:limit]]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
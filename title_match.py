@@ -0,0 +1,98 @@
+import re
+from difflib import SequenceMatcher
+
+from title_index import name_key
+
+# Lowest token-set ratio a candidate needs to be taken as the answer
+DEFAULT_MIN_CONFIDENCE = 0.7
+
+# Score factor for a candidate from another season than the one in the filename
+SEASON_MISMATCH_PENALTY = 0.8
+
+# Season markers on name keys: "s2", "s2part1", "season 2 part 1", "2nd season", a trailing "ii"
+SEASON_PATTERN = re.compile(
+    r"\b(?:s|season)\s?(\d+)(?:\s?part\s?(\d+))?\b"
+    r"|\b(\d+)(?:st|nd|rd|th) season(?: part (\d+))?\b"
+    r"|\b(ii|iii|iv|v)$"
+)
+ROMAN_SEASONS = {"ii": 2, "iii": 3, "iv": 4, "v": 5}
+
+
+def split_season(key):
+    """Split a name key into (key without season markers, (season, part)); (1, 1) when there are none."""
+    season = (1, 1)
+    match = SEASON_PATTERN.search(key)
+    if match:
+        number = match.group(1) or match.group(3)
+        part = match.group(2) or match.group(4)
+        season = (int(number) if number else ROMAN_SEASONS[match.group(5)], int(part) if part else 1)
+        key = " ".join((key[:match.start()] + key[match.end():]).split())
+    return key, season
+
+
+def ratio(a, b):
+    return SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def token_ratios(a, b):
+    """(token-set ratio, token-sort ratio) of two name keys, both on word sets.
+
+    The token-set ratio ignores words only one side has, so "konosuba" matches "konosuba god s
+    blessing on this wonderful world" in full; it decides whether a name matches at all. It also
+    scores "naruto" against "naruto shippuden" as a perfect match, so the token-sort ratio, which
+    counts every word, decides between names that both match.
+    """
+    if a == b:
+        return 1.0, 1.0
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    common = " ".join(sorted(tokens_a & tokens_b))
+    with_a = " ".join(filter(None, [common, " ".join(sorted(tokens_a - tokens_b))]))
+    with_b = " ".join(filter(None, [common, " ".join(sorted(tokens_b - tokens_a))]))
+    token_set = ratio(with_a, with_b)
+    if common:
+        token_set = max(token_set, ratio(common, with_a), ratio(common, with_b))
+    return token_set, ratio(" ".join(sorted(tokens_a)), " ".join(sorted(tokens_b)))
+
+
+def candidate_names(candidate):
+    return [candidate.get("romaji"), candidate.get("english")] + list(candidate.get("synonyms") or [])
+
+
+def score_candidates(query, candidates):
+    """Score every candidate {"romaji", "english", "synonyms"} against the query by its best names.
+
+    Returns a list of (token-set ratio, token-sort ratio, candidate) in candidate order. Both are
+    scaled down for a name from another season than the query's.
+    """
+    query_key, query_season = split_season(name_key(query))
+    scored = []
+    for candidate in candidates:
+        best_set = best_sort = 0.0
+        for name in candidate_names(candidate):
+            if not name:
+                continue
+            key, season = split_season(name_key(name))
+            token_set, token_sort = token_ratios(query_key, key)
+            if season != query_season:
+                token_set *= SEASON_MISMATCH_PENALTY
+                token_sort *= SEASON_MISMATCH_PENALTY
+            best_set = max(best_set, token_set)
+            best_sort = max(best_sort, token_sort)
+        scored.append((best_set, best_sort, candidate))
+    return scored
+
+
+def best_candidate(query, candidates, min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """Return (candidate, token-set ratio) of the best candidate, or (None, best token-set ratio) if none passes.
+
+    Candidates pass with a token-set ratio of at least min_confidence; of those, the one with the
+    highest token-sort ratio wins, and on equal ratios the earlier one, i.e. the API's own ranking.
+    """
+    best, best_sort, best_set, top_set = None, -1.0, 0.0, 0.0
+    for token_set, token_sort, candidate in score_candidates(query, candidates):
+        top_set = max(top_set, token_set)
+        if token_set >= min_confidence and token_sort > best_sort:
+            best, best_sort, best_set = candidate, token_sort, token_set
+    if best is None:
+        return None, top_set
+    return best, best_set
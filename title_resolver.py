@@ -0,0 +1,310 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from event_log import as_event_log
+from filename_rules import MAL_SEARCH_NORMALIZER
+from rate_limit import ANILIST_LIMIT, JIKAN_LIMIT, send_with_backoff
+from resolver_chain import BackendHealth, CircuitOpenError
+from run_stats import RunStats
+from title_cache import MISS
+from title_index import name_key
+from title_match import DEFAULT_MIN_CONFIDENCE, best_candidate, split_season
+
+ANILIST_URL = "https://graphql.anilist.co"
+JIKAN_URL = "https://api.jikan.moe/v4/anime"
+
+# Search results fetched per lookup and scored locally
+CANDIDATE_COUNT = 5
+
+ANILIST_QUERY = '''
+query ($search: String, $perPage: Int) {
+  Page(perPage: $perPage) {
+    media(search: $search, type: ANIME) {
+      title {
+        romaji
+        english
+      }
+      synonyms
+    }
+  }
+}
+'''
+
+
+def format_for_mal_search(title):
+    return MAL_SEARCH_NORMALIZER.normalize(title).strip()
+
+
+def pick_anilist_title(titles, title_preference):
+    return titles.get(title_preference) or titles.get("english") or titles.get("romaji")
+
+
+def anilist_candidates(page):
+    """Candidates {"romaji", "english", "synonyms"} from an AniList Page result."""
+    return [
+        {"romaji": media["title"].get("romaji"), "english": media["title"].get("english"),
+         "synonyms": media.get("synonyms") or []}
+        for media in (page or {}).get("media") or []
+    ]
+
+
+def jikan_candidates(data):
+    """Candidates {"romaji", "english", "synonyms"} from a Jikan search result."""
+    return [
+        {"romaji": item.get("title"), "english": item.get("title_english"),
+         "synonyms": list(item.get("title_synonyms") or []) + [t.get("title") for t in item.get("titles") or []]}
+        for item in data.get("data") or []
+    ]
+
+
+class TitleResolver:
+    """Looks titles up on AniList and MAL through one pooled, keep-alive HTTP session.
+
+    Each search fetches a few candidates and takes the one scoring best against the query,
+    if it scores at least `min_confidence`.
+    """
+
+    def __init__(self, cache, log=print, pool_size=10, connect_timeout=5.0, read_timeout=20.0, retries=3,
+                 anilist_url=ANILIST_URL, jikan_url=JIKAN_URL, anilist_limit=ANILIST_LIMIT, jikan_limit=JIKAN_LIMIT,
+                 index=None, min_confidence=DEFAULT_MIN_CONFIDENCE, priority="auto"):
+        self.cache = cache
+        # Offline TitleIndex asked before any API, or None
+        self.index = index
+        # Records carry the looked-up title as their correlation key; a thread resolving for a
+        # run sends them to that run's log instead (see use_log)
+        self.default_log = as_event_log(log)
+        self._local = threading.local()
+        self.anilist_url = anilist_url
+        self.jikan_url = jikan_url
+        self.anilist_limit = anilist_limit
+        self.jikan_limit = jikan_limit
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.min_confidence = min_confidence
+        # api_priority: "anilist", "mal" or "auto"; see resolver_chain.backend_chain
+        self.priority = priority
+        self.health = {"anilist": BackendHealth(), "jikan": BackendHealth()}
+        # Cumulative over the resolver's life; a run takes its share with RunStats.track()
+        self.stats = RunStats()
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def log(self):
+        return getattr(self._local, "log", None) or self.default_log
+
+    def use_log(self, log):
+        """Send this thread's records to `log` (None for the resolver's own), e.g. as a pool initializer."""
+        self._local.log = as_event_log(log) if log is not None else None
+
+    @contextmanager
+    def logging_to(self, log):
+        """Send the calling thread's records to `log` for the duration of the block."""
+        previous = getattr(self._local, "log", None)
+        self.use_log(log)
+        try:
+            yield
+        finally:
+            self._local.log = previous
+
+    @property
+    def session(self):
+        """The HTTP session, set up on first use so that importing requests waits until a title is looked up."""
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def send(self, api, request, *args, **kwargs):
+        """Send one HTTP request, counting it and the bytes received under `api` and tracking its health."""
+        health = self.health[api]
+        if not health.available():
+            raise CircuitOpenError(f"{api} is paused after repeated failures")
+        self.stats.count("requests_" + api)
+        start = time.perf_counter()
+        try:
+            response = request(*args, timeout=self.timeout, **kwargs)
+        except Exception:
+            self.record(api, time.perf_counter() - start, False)
+            raise
+        self.record(api, time.perf_counter() - start, response.status_code != 429 and response.status_code < 500)
+        self.stats.count("bytes_received", int(response.headers.get("Content-Length") or len(response.content)))
+        return response
+
+    def record(self, api, seconds, ok):
+        self.stats.add_time(api + "_http", seconds)
+        if self.health[api].record(seconds, ok):
+            self.stats.count("circuit_opened")
+            self.log.warning(f"⚠️ {api} keeps failing; skipping it for {self.health[api].reset_seconds:.0f} s")
+
+    def cached(self, source, query, title_preference):
+        cached = self.cache.get(source, query, title_preference)
+        self.stats.count("cache_misses" if cached is MISS else "cache_hits")
+        return cached
+
+    def pick(self, api, query, candidates, title_preference):
+        """The preferred title of the best candidate for `query`, or None if none is good enough."""
+        candidate, score = best_candidate(query, candidates, self.min_confidence)
+        if candidate is None:
+            if candidates:
+                self.log.debug(f"No {api} candidate for {query} scored above {self.min_confidence}"
+                               f" (best {score:.2f})", title=query)
+            return None
+        return pick_anilist_title(candidate, title_preference)
+
+    def post_anilist(self, query_graphql, variables):
+        return send_with_backoff(
+            self.anilist_limit,
+            lambda: self.send(
+                "anilist", self.session.post, self.anilist_url, json={"query": query_graphql, "variables": variables}
+            ),
+            self.retries,
+            stats=self.stats,
+        )
+
+    def get_anime_title_anilist(self, query, title_preference):
+        cached = self.cached("anilist", query, title_preference)
+        if cached is not MISS:
+            return cached
+        return self.fetch_anilist(query, title_preference)
+
+    def fetch_anilist(self, query, title_preference):
+        try:
+            response = self.post_anilist(ANILIST_QUERY, {"search": query, "perPage": CANDIDATE_COUNT})
+            if response.status_code == 200:
+                data = response.json()
+                candidates = anilist_candidates((data.get("data") or {}).get("Page"))
+                title = self.pick("AniList", query, candidates, title_preference)
+                self.cache.put("anilist", query, title_preference, title)
+                return title
+            if response.status_code == 404:
+                # AniList answers 404 when nothing matches the search
+                self.cache.put("anilist", query, title_preference, None)
+        except CircuitOpenError as e:
+            # Already reported when the circuit opened
+            self.log.debug(str(e), title=query)
+        except Exception as e:
+            self.log.warning("⚠️ AniList request failed: " + str(e), title=query)
+        return None
+
+    def get_anime_titles_anilist(self, queries, title_preference):
+        """Look up several titles with one aliased AniList request; returns {query: title}."""
+        results = {}
+        pending = []
+        for query in queries:
+            cached = self.cached("anilist", query, title_preference)
+            if cached is MISS:
+                pending.append(query)
+            else:
+                results[query] = cached
+        if len(pending) <= 1:
+            for query in pending:
+                results[query] = self.fetch_anilist(query, title_preference)
+            return results
+        self.stats.count("anilist_batches")
+
+        aliases = {f"a{i}": query for i, query in enumerate(pending)}
+        declarations = ", ".join(f"$s{i}: String" for i in range(len(pending)))
+        fields = "\n".join(
+            f"  a{i}: Page(perPage: {CANDIDATE_COUNT}) {{ media(search: $s{i}, type: ANIME)"
+            " { title { romaji english } synonyms } }"
+            for i in range(len(pending))
+        )
+        query_graphql = f"query ({declarations}) {{\n{fields}\n}}"
+        variables = {f"s{i}": query for i, query in enumerate(pending)}
+        fallback = pending
+        try:
+            response = self.post_anilist(query_graphql, variables)
+            # Unmatched searches come back as null aliases plus a 404 error, so 404 can still carry data
+            data = response.json() if response.status_code in (200, 404) else {}
+            page_by_alias = data.get("data") or {}
+            if page_by_alias:
+                failed_aliases = set()
+                only_not_found = True
+                for error in data.get("errors") or []:
+                    if error.get("status") == 404:
+                        continue
+                    path = error.get("path") or []
+                    if path:
+                        failed_aliases.add(path[0])
+                    else:
+                        only_not_found = False
+                fallback = []
+                for alias, query in aliases.items():
+                    page = page_by_alias.get(alias)
+                    if not page and (alias in failed_aliases or not only_not_found):
+                        fallback.append(query)
+                        continue
+                    title = self.pick("AniList", query, anilist_candidates(page), title_preference)
+                    self.cache.put("anilist", query, title_preference, title)
+                    results[query] = title
+        except CircuitOpenError as e:
+            # Already reported when the circuit opened
+            self.log.debug(str(e))
+        except Exception as e:
+            self.log.warning("⚠️ AniList batch request failed: " + str(e))
+
+        # Titles the batch could not answer are retried one by one
+        for query in fallback:
+            results[query] = self.fetch_anilist(query, title_preference)
+        return results
+
+    def get_anime_title_index(self, query, title_preference):
+        if self.index is None:
+            return None
+        candidates = self.index.candidates(query)
+        # "Attack on Titan S2" may only be in the dump as "Attack on Titan Season 2", which shares
+        # too few trigrams; the names starting with the series name find it
+        key = name_key(query)
+        base, _ = split_season(key)
+        if base and base != key:
+            seen = {(c["romaji"], c["english"]) for c in candidates}
+            candidates += [c for c in self.index.candidates(base) if (c["romaji"], c["english"]) not in seen]
+        candidate, _ = best_candidate(query, candidates, self.min_confidence)
+        self.stats.count("index_hits" if candidate else "index_misses")
+        return pick_anilist_title(candidate, title_preference) if candidate else None
+
+    def get_anime_title_mal(self, query, title_preference):
+        cached = self.cached("mal", query, title_preference)
+        if cached is not MISS:
+            return cached
+        formatted_query = format_for_mal_search(query)
+        self.log.info("🔎 Searching MAL with: " + formatted_query, title=query)
+        try:
+            response = send_with_backoff(
+                self.jikan_limit,
+                lambda: self.send(
+                    "jikan", self.session.get, self.jikan_url, params={"q": formatted_query, "limit": CANDIDATE_COUNT}
+                ),
+                self.retries,
+                stats=self.stats,
+            )
+            if response.status_code == 200:
+                # Jikan lists the English title too, so no second AniList lookup is needed
+                title = self.pick("MAL", query, jikan_candidates(response.json()), title_preference)
+                self.cache.put("mal", query, title_preference, title)
+                return title
+        except CircuitOpenError as e:
+            # Already reported when the circuit opened
+            self.log.debug(str(e), title=query)
+        except Exception as e:
+            self.log.warning("⚠️ MAL request failed: " + str(e), title=query)
+        return None
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+        if self.index is not None:
+            self.index.close()